@@ -1,11 +1,17 @@
 import os
+import multiprocessing
 from flask import Flask
 from flask_session import Session
 
 from routes.web import web_bp
 from routes.analizar import analizar_bp
+from routes.jobs import jobs_bp
+from routes.metricas import metricas_bp
+from services import jobs, subidas
 
 app = Flask(__name__)
+# Subidas en una pasada: los archivos se escriben directo en uploads/.tmp con hash y límite
+app.request_class = subidas.RequestSubidas
 
 # Clave de la app Flask (lee de env si existe)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "1234abcd")
@@ -18,6 +24,8 @@ app.config.update(
     SESSION_COOKIE_SAMESITE="Lax",                      # "None" si vas cross-site con HTTPS
     SESSION_COOKIE_SECURE=False,                        # True en producción con HTTPS
     PERMANENT_SESSION_LIFETIME=60*60*8,                 # 8 horas
+    MAX_CONTENT_LENGTH=subidas.SUBIDA_MAX_TOTAL_BYTES,  # 413 si el request entero se pasa
+    USE_X_SENDFILE=os.environ.get("USE_X_SENDFILE") == "1",  # detrás de Apache (mod_xsendfile) o lighttpd
 )
 
 Session(app)
@@ -25,6 +33,18 @@ Session(app)
 # Blueprints
 app.register_blueprint(web_bp)
 app.register_blueprint(analizar_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(metricas_bp)
+
+# Cola OCR/LLM: reanuda trabajos pendientes al arrancar.
+# Con el reloader de debug solo el proceso hijo (WERKZEUG_RUN_MAIN) atiende peticiones.
+# Los workers 'spawn' del pool re-importan este módulo como __mp_main__: ahí no se
+# arranca nada (tienen parent_process). Con varios procesos servidor (gunicorn)
+# despacha solo el que tiene el lease de la base (ver services/jobs.py).
+_servidor = __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+if _servidor and multiprocessing.parent_process() is None:
+    jobs.iniciar()
+    subidas.limpiar_temporales()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,49 @@
+"""
+Tiempo de arranque y memoria residente de cada tipo de proceso:
+  app       -> proceso Flask (listados, auth): no debe cargar modelos
+  ocr_ai    -> importar el módulo OCR (sin modelos: carga perezosa)
+  calentar  -> worker OCR tras ocr_ai.calentar() (EasyOCR + Tesseract)
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_arranque
+Cada caso corre en un proceso Python nuevo; imprime JSON con segundos y RSS en MB.
+"""
+import json, os, subprocess, sys
+
+CASOS = {
+    "app": "import app",
+    "ocr_ai": "from services import ocr_ai",
+    "calentar": "from services import ocr_ai; ocr_ai.calentar()",
+}
+
+_SONDA = r"""
+import json, sys, time
+t0 = time.perf_counter()
+exec({codigo!r})
+seg = time.perf_counter() - t0
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+except ImportError:  # Windows
+    import psutil
+    rss_mb = psutil.Process().memory_info().peak_wset / (1024 * 1024)
+print(json.dumps({{"segundos": round(seg, 3), "rss_mb": round(rss_mb, 1), "torch_cargado": "torch" in sys.modules}}))
+"""
+
+def medir(codigo: str) -> dict:
+    env = dict(os.environ, OCR_WARMUP="0")
+    r = subprocess.run(
+        [sys.executable, "-c", _SONDA.format(codigo=codigo)],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "..")),
+    )
+    if r.returncode != 0:
+        return {"error": r.stderr.strip().splitlines()[-1] if r.stderr.strip() else "fallo"}
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+def main():
+    print(json.dumps({nombre: medir(codigo) for nombre, codigo in CASOS.items()}, indent=2))
+
+if __name__ == "__main__":
+    main()
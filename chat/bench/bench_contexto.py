@@ -0,0 +1,121 @@
+"""
+Selección de contexto para el LLM (services/contexto.py) vs. el texto completo
+(texto_ocr[:12000], lo que se enviaba antes).
+
+Fixtures sintéticos (bench/fixtures.py, semilla fija): RUT y los cuatro
+certificados de cada persona, rodeados de texto legal, encabezados y pies de
+página (bench.fixtures.ocr_largo), con el bloque útil al inicio, en el medio o
+al final, en dos conjuntos:
+  - limpio: fixtures.certificado(); las reglas (services/reglas.py) suelen
+    resolverlo solas y el LLM ni se llama;
+  - dificil: fixtures.certificado_dificil() (valores en la línea siguiente a su
+    etiqueta, confusiones de OCR); las reglas quedan por debajo de
+    REGLAS_MIN_CONFIANZA y el documento va al LLM, que es donde importa qué
+    texto se envía.
+Cada documento pasa por el camino real de llm_struct (reglas, contexto, prompt)
+contra el mock de Ollama en modo lector (bench/mock_ollama.py), que extrae los
+valores del texto que recibe sin usar las reglas. Los que van al LLM se envían
+dos veces: con selección de contexto y con el texto completo. Por conjunto,
+tipo y posición:
+  - documentos que fueron al LLM;
+  - tokens estimados del texto completo y del contexto elegido (reducción);
+  - campos correctos (contra los valores del fixture) en la respuesta del mock
+    con el contexto vs. con el texto completo.
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_contexto [--chars 16000] [--tasa-ocr 0.15]
+"""
+import os
+os.environ["LLM_CACHE"] = "0"  # antes de importar services: cada modo llama de verdad al mock
+
+import argparse, json
+
+import numpy as np
+
+from bench import fixtures
+from bench.mock_ollama import iniciar_mock
+from services import contexto, llm_client, llm_struct
+
+POSICIONES = ("inicio", "medio", "final")
+CONJUNTOS = ("limpio", "dificil")
+
+def _aciertos(datos: dict, esperado: dict) -> int:
+    return sum(1 for k, v in esperado.items() if (datos or {}).get(k) == v)
+
+def _extraer(campo: str, texto: str, con_contexto: bool) -> dict:
+    contexto.CONTEXTO_ACTIVO = con_contexto  # seleccionar_contexto lo lee en cada llamada
+    return llm_struct.ESTRUCTURADORES[campo](texto)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=16000, help="caracteres de texto de relleno por documento")
+    ap.add_argument("--tasa-ocr", type=float, default=0.15, help="confusiones de OCR en el conjunto 'dificil'")
+    args = ap.parse_args()
+
+    srv, url = iniciar_mock(latencia=0.0, lector=True)
+    llm_client._CLIENTE = llm_client.ClienteLLM(url=url)
+    activo = contexto.CONTEXTO_ACTIVO
+
+    rng = np.random.default_rng(1234)
+    filas = {}
+    try:
+        for conjunto in CONJUNTOS:
+            for tipo in ("rut", *fixtures.CERTIFICADOS):
+                campo = "rut" if tipo == "rut" else fixtures.CERTIFICADOS[tipo][0]
+                for posicion in POSICIONES:
+                    f = filas.setdefault(f"{conjunto}/{tipo}/{posicion}", {
+                        "docs": 0, "al_llm": 0, "tokens_completo": 0, "tokens_contexto": 0,
+                        "campos": 0, "ok_completo": 0, "ok_contexto": 0,
+                    })
+                    for nombre, cedula in fixtures.PERSONAS:
+                        if conjunto == "limpio":
+                            lineas, esperado = fixtures.certificado(tipo, nombre, cedula)
+                        else:
+                            lineas, esperado = fixtures.certificado_dificil(tipo, nombre, cedula, rng, args.tasa_ocr)
+                        texto = fixtures.ocr_largo(lineas, rng, args.chars, posicion)
+                        f["docs"] += 1
+
+                        con = _extraer(campo, texto, True)
+                        if con.get("metodo") != "llm":
+                            continue  # resuelto por reglas: el contexto no interviene
+                        sin = _extraer(campo, texto, False)
+                        f["al_llm"] += 1
+                        f["tokens_completo"] += sin["contexto"]["tokens_enviados"]
+                        f["tokens_contexto"] += con["contexto"]["tokens_enviados"]
+                        f["campos"] += len(esperado)
+                        f["ok_completo"] += _aciertos(sin, esperado)
+                        f["ok_contexto"] += _aciertos(con, esperado)
+    finally:
+        contexto.CONTEXTO_ACTIVO = activo
+        srv.shutdown()
+
+    out = {}
+    total = {c: {"docs": 0, "al_llm": 0, "tokens_completo": 0, "tokens_contexto": 0,
+                 "campos": 0, "ok_completo": 0, "ok_contexto": 0} for c in CONJUNTOS}
+    for clave, f in filas.items():
+        for k, v in f.items():
+            total[clave.split("/", 1)[0]][k] += v
+        out[clave] = _resumen(f)
+
+    print(json.dumps({
+        "relleno_chars": args.chars,
+        "tasa_ocr": args.tasa_ocr,
+        "peticiones_mock": srv.estado.peticiones,
+        "por_conjunto_tipo_y_posicion": out,
+        "total": {c: _resumen(t) for c, t in total.items()},
+    }, indent=2, ensure_ascii=False))
+
+def _resumen(f: dict) -> dict:
+    out = {"docs": f["docs"], "al_llm": f["al_llm"]}
+    if f["al_llm"]:
+        out.update(
+            tokens_completo=f["tokens_completo"] // f["al_llm"],
+            tokens_contexto=f["tokens_contexto"] // f["al_llm"],
+            reduccion=round(1 - f["tokens_contexto"] / f["tokens_completo"], 3),
+            campos_correctos_completo=round(f["ok_completo"] / f["campos"], 3),
+            campos_correctos_contexto=round(f["ok_contexto"] / f["campos"], 3),
+        )
+    return out
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Extracción LLM de un expediente contra el mock local de /api/chat:
+secuencial (una tras otra) vs estructurar_expediente (en paralelo, acotado, hilos)
+vs llm_async (asyncio contra el mock asyncio: resultados parciales y deadline).
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_llm [--latencia 0.5] [--max-en-vuelo 4] [--tasa-error 0.2]
+"""
+import os
+os.environ["LLM_CACHE"] = "0"  # antes de importar services: cada modo llama de verdad al mock
+
+import argparse, asyncio, json, time
+
+from bench.mock_ollama import iniciar_mock, iniciar_mock_async
+from services import llm_async, llm_client, llm_struct
+
+TEXTOS = {campo: f"Texto OCR de prueba para {campo}" for campo in llm_struct.ESTRUCTURADORES}
+
+async def _asincrono(args) -> dict:
+    srv, est, url = await iniciar_mock_async(latencia=args.latencia, tasa_error=args.tasa_error)
+    try:
+        async with llm_async.ClienteLLMAsync(url=url, max_en_vuelo=args.max_en_vuelo) as c:
+            t0 = time.perf_counter()
+            llegadas, resultados = [], {}
+            async for campo, datos in llm_async.estructurar_expediente_stream(TEXTOS, cliente=c):
+                llegadas.append(round(time.perf_counter() - t0, 3))
+                resultados[campo] = datos
+            t_async = time.perf_counter() - t0
+        max_en_vuelo = est.max_en_vuelo
+
+        # Deadline que solo alcanza para la primera tanda: el resto se cancela
+        deadline = args.latencia * 1.5
+        async with llm_async.ClienteLLMAsync(url=url, max_en_vuelo=args.max_en_vuelo, reintentos=0) as c:
+            t0 = time.perf_counter()
+            con_deadline = await llm_async.estructurar_expediente(TEXTOS, deadline_seg=deadline, cliente=c)
+            t_deadline = time.perf_counter() - t0
+    finally:
+        srv.close()
+        await srv.wait_closed()
+    return {
+        "async_seg": round(t_async, 3),
+        "async_llegadas_seg": llegadas,
+        "async_max_en_vuelo_observado": max_en_vuelo,
+        "async_resultados": resultados,
+        "deadline_seg": deadline,
+        "deadline_transcurrido_seg": round(t_deadline, 3),
+        "deadline_completos": sum(1 for r in con_deadline.values() if r.get("ok")),
+        "deadline_cancelados": sum(1 for r in con_deadline.values() if "llm_timeout" in r.get("missing_fields", [])),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latencia", type=float, default=0.5)
+    ap.add_argument("--max-en-vuelo", type=int, default=4)
+    ap.add_argument("--tasa-error", type=float, default=0.0)
+    args = ap.parse_args()
+
+    srv, url = iniciar_mock(latencia=args.latencia, tasa_error=args.tasa_error)
+    llm_client._CLIENTE = llm_client.ClienteLLM(url=url, max_en_vuelo=args.max_en_vuelo)
+    llm_struct.LLM_MAX_INFLIGHT = args.max_en_vuelo
+
+    t0 = time.perf_counter()
+    secuencial = {}
+    for campo, texto in TEXTOS.items():
+        try:
+            secuencial[campo] = llm_struct.ESTRUCTURADORES[campo](texto)
+        except Exception as e:
+            secuencial[campo] = {"ok": False, "error": str(e)}
+    t_seq = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    paralelo = llm_struct.estructurar_expediente(TEXTOS)
+    t_par = time.perf_counter() - t0
+    srv.shutdown()
+
+    asincrono = asyncio.run(_asincrono(args))
+    resultados_async = asincrono.pop("async_resultados")
+
+    print(json.dumps({
+        "documentos": len(TEXTOS),
+        "latencia_mock_seg": args.latencia,
+        "secuencial_seg": round(t_seq, 3),
+        "paralelo_seg": round(t_par, 3),
+        "max_en_vuelo_observado": srv.estado.max_en_vuelo,
+        "peticiones_mock": srv.estado.peticiones,
+        "ok_paralelo": sum(1 for r in paralelo.values() if r.get("ok")),
+        "mismos_resultados": secuencial == paralelo,
+        "aiohttp": llm_async.aiohttp is not None,
+        **asincrono,
+        "mismos_resultados_async": secuencial == resultados_async,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Perfiles de preprocesado (services/preprocesado.py): tiempo vs. aciertos.
+
+Fixtures sintéticos y deterministas (bench/fixtures.py, semilla fija):
+  - certificados de Procuraduría, Contraloría, Policía y RNMC renderizados como
+    escaneo a ~320 DPI, limpios y degradados (ruido + desenfoque, bajo contraste);
+    los campos se extraen con las reglas de services/reglas.py y se comparan con
+    los valores con que se generó cada página;
+  - cédulas con la MRZ TD1 dibujada (dígitos de control válidos), mismas
+    degradaciones; acierto = MRZ verificada e igual a la generada.
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_perfiles [--perfiles rapido,balanceado,preciso]
+Imprime JSON por perfil: ms de preprocesado, ms totales por documento y fracción
+de campos correctos (certificados) y de MRZ correctas.
+"""
+import argparse, json, time
+
+import numpy as np
+
+from bench import fixtures
+from services import ocr_ai, preprocesado, reglas
+
+def fixtures_certificados(rng):
+    for tipo in fixtures.CERTIFICADOS:
+        for nombre, cedula in fixtures.PERSONAS:
+            lineas, esperado = fixtures.certificado(tipo, nombre, cedula)
+            for nivel in fixtures.NIVELES:
+                yield tipo, nivel, fixtures.degradar(fixtures.pagina(lineas), nivel, rng), esperado
+
+def fixtures_mrz(rng):
+    for datos in fixtures.CEDULAS:
+        for nivel in fixtures.NIVELES:
+            img, mrz = fixtures.cedula(datos, nivel, rng)
+            yield nivel, img, mrz
+
+def _aciertos(datos: dict, esperado: dict) -> int:
+    return sum(1 for k, v in esperado.items() if (datos or {}).get(k) == v)
+
+def medir_perfil(perfil: str, certificados, mrzs) -> dict:
+    prep_ms, total_ms, ok, campos = [], [], 0, 0
+    por_nivel = {}
+    for tipo, nivel, bgr, esperado in certificados:
+        t0 = time.perf_counter()
+        preprocesado.aplicar(bgr, perfil, "texto")
+        prep_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        texto = ocr_ai._ocr_easy_ndarray(bgr, perfil)
+        total_ms.append((time.perf_counter() - t0) * 1000)
+        n = _aciertos(reglas.extraer_por_reglas(tipo, texto), esperado)
+        ok, campos = ok + n, campos + len(esperado)
+        a, b = por_nivel.get(nivel, (0, 0))
+        por_nivel[nivel] = (a + n, b + len(esperado))
+
+    out = {
+        "preprocesado_ms": round(float(np.mean(prep_ms)), 1),
+        "ocr_total_ms": round(float(np.mean(total_ms)), 1),
+        "campos_correctos": round(ok / max(campos, 1), 3),
+        "por_nivel": {k: round(a / max(b, 1), 3) for k, (a, b) in por_nivel.items()},
+    }
+
+    try:
+        ms, bien = [], 0
+        for _, bgr, mrz in mrzs:
+            t0 = time.perf_counter()
+            leida = ocr_ai.ocr_mrz_from_bgr(bgr, perfil)
+            ms.append((time.perf_counter() - t0) * 1000)
+            aciertos, normalizada = ocr_ai.validar_mrz_td1(leida)
+            bien += aciertos == 4 and normalizada.splitlines()[:2] == mrz.splitlines()[:2]
+        out["mrz_ms"] = round(float(np.mean(ms)), 1)
+        out["mrz_correctas"] = round(bien / max(len(mrzs), 1), 3)
+    except Exception as e:  # sin binario de Tesseract / tesserocr
+        out["mrz"] = f"no disponible: {type(e).__name__}: {e}"
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--perfiles", default=",".join(preprocesado.PERFILES))
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1234)
+    certificados = list(fixtures_certificados(rng))
+    mrzs = list(fixtures_mrz(rng))
+    ocr_ai._get_reader()  # la carga del modelo no cuenta en los tiempos
+
+    out = {
+        "documentos": len(certificados),
+        "mrz": len(mrzs),
+        "perfil_por_campo": {**preprocesado.PERFIL_POR_CAMPO, "*": preprocesado.PERFIL_DEFECTO},
+        "perfiles": {p: medir_perfil(p, certificados, mrzs) for p in args.perfiles.split(",")},
+    }
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
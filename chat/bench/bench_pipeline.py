@@ -0,0 +1,208 @@
+"""
+Suite offline del pipeline OCR + extracción, etapa por etapa, sin datos reales
+ni Ollama (fixtures de bench/fixtures.py + bench/mock_ollama.py):
+
+  render                  rasterizar una página escaneada (DPI adaptativo)
+  texto_nativo            leer la capa de texto de un PDF generado digitalmente
+  preprocesado            perfil por defecto de services/preprocesado.py (OCR_PERFIL)
+  easyocr                 reconocimiento de una página ya preprocesada
+  tesseract_mrz           localizar y leer la MRZ de una cédula
+  reglas                  services/reglas.py sobre el texto de un certificado
+  llm                     una llamada /api/chat (cliente compartido) al mock
+  verificar_consistencia  cruce de resultados de un expediente
+  expediente              RUT, cédula y los 4 antecedentes de punta a punta (ejecutor)
+
+Por etapa: n, p50/p95/media en ms y elementos por segundo. Además pico de RSS
+del proceso. Las caches OCR/LLM se desactivan para medir trabajo real.
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_pipeline [--repeticiones 3] [--salida actual.json]
+    python -m bench.bench_pipeline --comparar base.json [--umbral 1.2]
+Con --comparar se agrega la razón p50 actual/base por etapa y el proceso sale con
+código 1 si alguna etapa empeora más que el umbral (regresión entre commits).
+"""
+import os
+os.environ["OCR_CACHE"] = "0"  # antes de importar services: medir trabajo, no aciertos de cache
+os.environ["LLM_CACHE"] = "0"
+os.environ.setdefault("OCR_WARMUP", "0")
+
+import argparse, json, platform, statistics, subprocess, sys, tempfile, time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from bench import fixtures
+from bench.mock_ollama import iniciar_mock
+from services import ejecutor, llm_client, llm_struct, ocr_ai, preprocesado, reglas
+from services.verificacion import verificar_consistencia
+
+PROMPTS = {
+    "rut": llm_struct.PROMPT_RUT,
+    "contraloria": llm_struct.PROMPT_CONTRALORIA,
+    "procuraduria": llm_struct.PROMPT_PROCURADURIA,
+    "policia": llm_struct.PROMPT_POLICIA,
+    "rnmc": llm_struct.PROMPT_RNMC,
+}
+
+def _resumen(ms: List[float]) -> dict:
+    ms = sorted(ms)
+    total = sum(ms) / 1000
+    return {
+        "n": len(ms),
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[int(0.95 * (len(ms) - 1))], 3),
+        "media_ms": round(statistics.mean(ms), 3),
+        "por_seg": round(len(ms) / total, 2) if total > 0 else None,
+    }
+
+def _medir(fn: Callable, casos, repeticiones: int = 1) -> dict:
+    """Corre fn(caso) para cada caso 'repeticiones' veces; resumen de latencias."""
+    ms = []
+    for _ in range(repeticiones):
+        for caso in casos:
+            t0 = time.perf_counter()
+            fn(caso)
+            ms.append((time.perf_counter() - t0) * 1000)
+    return _resumen(ms)
+
+def _etapa(nombre: str, out: dict, fn: Callable, *args) -> None:
+    """Registra la etapa; si falta una dependencia (EasyOCR, Tesseract) lo deja anotado."""
+    try:
+        out[nombre] = fn(*args)
+    except Exception as e:
+        out[nombre] = {"no_disponible": f"{type(e).__name__}: {e}"}
+
+def _pico_rss_mb() -> float:
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+    except ImportError:  # Windows
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+def correr(tmp: str, repeticiones: int, latencia_mock: float) -> dict:
+    rng = np.random.default_rng(1234)
+    nombre, cedula = fixtures.PERSONAS[0]
+
+    escaneados, nativos, textos = [], [], {}
+    for tipo in ("rut", *fixtures.CERTIFICADOS):
+        lineas, _ = fixtures.certificado(tipo, nombre, cedula)
+        textos[tipo] = "\n".join(lineas)
+        nativos.append(fixtures.pdf_nativo(os.path.join(tmp, f"{tipo}_nativo.pdf"), lineas))
+        for nivel in fixtures.NIVELES:
+            escaneados.append(fixtures.pdf_escaneado(os.path.join(tmp, f"{tipo}_{nivel}.pdf"), lineas, nivel, rng))
+    cedulas = [fixtures.cedula(datos, nivel, rng)[0] for datos in fixtures.CEDULAS for nivel in fixtures.NIVELES]
+
+    etapas: Dict[str, dict] = {}
+    _etapa("render", etapas, _medir, lambda ruta: ocr_ai._rasterizar(ruta, 0, 320), escaneados, repeticiones)
+    _etapa("texto_nativo", etapas, _medir,
+           lambda ruta: ocr_ai._rasterizar(ruta, 0, 320, nativo=True), nativos, repeticiones)
+
+    paginas = [ocr_ai._rasterizar(ruta, 0, 320)[1] for ruta in escaneados]
+    perfil = preprocesado.PERFIL_DEFECTO
+    _etapa("preprocesado", etapas, _medir, lambda img: preprocesado.aplicar(img, perfil), paginas, repeticiones)
+    prep = [preprocesado.aplicar(img, perfil) for img in paginas]
+
+    def _easyocr():
+        ocr_ai._get_reader()  # la carga del modelo no cuenta
+        return _medir(lambda img: ocr_ai._readtext_lote([img]), prep)
+    _etapa("easyocr", etapas, _easyocr)
+    _etapa("tesseract_mrz", etapas, _medir,
+           lambda img: ocr_ai.ocr_mrz_from_bgr(img, preprocesado.perfil_para("cedula")), cedulas)
+
+    _etapa("reglas", etapas, _medir, lambda t: reglas.extraer_por_reglas(t, textos[t]), list(PROMPTS),
+           repeticiones * 20)
+
+    srv, url = iniciar_mock(latencia=latencia_mock)
+    llm_client._CLIENTE = llm_client.ClienteLLM(url=url)
+    try:
+        _etapa("llm", etapas, _medir,
+               lambda t: llm_struct._chat_json(llm_struct._con_texto(PROMPTS[t], textos[t])),
+               list(PROMPTS), repeticiones)
+        etapas["llm"]["latencia_mock_ms"] = latencia_mock * 1000
+
+        consolidado = {
+            f"resultado_{campo}": llm_struct._chat_json(llm_struct._con_texto(PROMPTS[t], textos[t]))
+            for t, campo in [("rut", "rut")] + [(t, c[0]) for t, c in fixtures.CERTIFICADOS.items()]
+        }
+        _etapa("verificar_consistencia", etapas, _medir, verificar_consistencia, [consolidado],
+               repeticiones * 100)
+
+        def _expediente():
+            ms, docs = [], 0
+            for i in range(repeticiones):
+                documentos = fixtures.expediente(os.path.join(tmp, f"expediente_{i}"), "ruido", rng)
+                t0 = time.perf_counter()
+                res = ejecutor.procesar_expediente(documentos)
+                ms.append((time.perf_counter() - t0) * 1000)
+                docs += len(documentos)
+                errores = {c: r["error"] for c, r in res.items() if r["error"]}
+                if errores:
+                    raise RuntimeError(f"documentos con error: {errores}")
+            out = _resumen(ms)
+            out["documentos_por_seg"] = round(docs / (sum(ms) / 1000), 2)
+            return out
+        _etapa("expediente", etapas, _expediente)
+    finally:
+        srv.shutdown()
+
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "ocr_pipeline_version": ocr_ai.OCR_PIPELINE_VERSION,
+        "perfil_defecto": perfil,
+        "repeticiones": repeticiones,
+        "fixtures": {"pdf_escaneados": len(escaneados), "pdf_nativos": len(nativos), "cedulas": len(cedulas)},
+        "etapas": etapas,
+        "pico_rss_mb": _pico_rss_mb(),
+    }
+
+def comparar(actual: dict, base: dict, umbral: float) -> dict:
+    """Razón p50 actual/base por etapa presente en ambos; 'regresiones' las que superan el umbral."""
+    out, regresiones = {}, []
+    for etapa, a in actual["etapas"].items():
+        b = base.get("etapas", {}).get(etapa) or {}
+        if "p50_ms" not in a or "p50_ms" not in b or not b["p50_ms"]:
+            continue
+        razon = round(a["p50_ms"] / b["p50_ms"], 3)
+        out[etapa] = {"base_p50_ms": b["p50_ms"], "p50_ms": a["p50_ms"], "razon": razon}
+        if razon > umbral:
+            regresiones.append(etapa)
+    if base.get("pico_rss_mb"):
+        out["pico_rss"] = {"base_mb": base["pico_rss_mb"], "mb": actual["pico_rss_mb"],
+                           "razon": round(actual["pico_rss_mb"] / base["pico_rss_mb"], 3)}
+    return {"base_commit": base.get("commit"), "umbral": umbral, "etapas": out, "regresiones": regresiones}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--latencia-mock", type=float, default=0.05, help="segundos por respuesta del mock Ollama")
+    ap.add_argument("--salida", help="además de imprimir, guardar el JSON en este archivo")
+    ap.add_argument("--comparar", help="JSON de una corrida anterior (otro commit)")
+    ap.add_argument("--umbral", type=float, default=1.2)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = correr(tmp, max(1, args.repeticiones), args.latencia_mock)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            out["comparacion"] = comparar(out, json.load(f), args.umbral)
+    texto = json.dumps(out, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    if out.get("comparacion", {}).get("regresiones"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Rasterización de páginas PDF a numpy: ida y vuelta por PNG (antes) vs lectura
+directa del buffer del pixmap, a 320 DPI fijo y con DPI adaptativo (ahora).
+
+Genera PDFs sintéticos (página escaneada = imagen incrustada, con letra normal
+y letra chica) y mide cada variante en un proceso aparte para que el pico de
+memoria (ru_maxrss) no se contamine entre ellas.
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_raster [--paginas 3] [--repeticiones 3]
+Imprime JSON con segundos por página, DPI usado, MB del array y pico de RSS.
+"""
+import argparse, json, os, resource, sys, tempfile, time
+import multiprocessing as mp
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from services import ocr_ai
+
+TEXTO = "REPUBLICA DE COLOMBIA  CERTIFICADO No. 0123456789  Nombre: JUAN CARLOS PEREZ GOMEZ"
+
+def pdf_escaneado(ruta: str, paginas: int, escala_letra: float) -> None:
+    """PDF carta con una imagen de 200 DPI por página (como un escáner), texto dibujado."""
+    doc = fitz.open()
+    w, h = int(8.5 * 200), int(11 * 200)
+    for _ in range(paginas):
+        img = np.full((h, w), 255, np.uint8)
+        for i, y in enumerate(range(120, h - 120, int(70 * escala_letra))):
+            cv2.putText(img, f"{TEXTO} {i}", (100, y), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.9 * escala_letra, 0, max(1, int(2 * escala_letra)), cv2.LINE_AA)
+        ok, png = cv2.imencode(".png", img)
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(page.rect, stream=png.tobytes())
+    doc.save(ruta)
+    doc.close()
+
+def _antes(page):
+    pix = page.get_pixmap(dpi=320)
+    return cv2.imdecode(np.frombuffer(pix.tobytes("png"), np.uint8), cv2.IMREAD_COLOR), 320
+
+def _directo_320(page):
+    return ocr_ai._page_to_ndarray(page, 320), 320
+
+def _ahora(page):
+    dpi = ocr_ai._dpi_pagina(page, 320)
+    return ocr_ai._page_to_ndarray(page, dpi), dpi
+
+def _medir(variante: str, ruta: str, repeticiones: int, cola) -> None:
+    fn = {"antes": _antes, "directo_320": _directo_320, "ahora": _ahora}[variante]
+    tiempos, dpis, mb = [], [], 0.0
+    with fitz.open(ruta) as doc:
+        for _ in range(repeticiones):
+            for page in doc:
+                t0 = time.perf_counter()
+                arr, dpi = fn(page)
+                tiempos.append(time.perf_counter() - t0)
+                dpis.append(dpi)
+                mb = max(mb, arr.nbytes / 1e6)
+                del arr
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    maxrss_mb = maxrss / 1e6 if sys.platform == "darwin" else maxrss / 1024  # bytes en macOS, KB en Linux
+    cola.put({
+        "seg_por_pagina": round(sum(tiempos) / len(tiempos), 4),
+        "dpi": sorted(set(dpis)),
+        "mb_array": round(mb, 1),
+        "pico_rss_mb": round(maxrss_mb, 1),
+    })
+
+def _en_proceso(variante: str, ruta: str, repeticiones: int) -> dict:
+    ctx = mp.get_context("spawn")  # proceso limpio: el pico de RSS es solo de esta variante
+    cola = ctx.Queue()
+    p = ctx.Process(target=_medir, args=(variante, ruta, repeticiones, cola))
+    p.start()
+    res = cola.get()
+    p.join()
+    return res
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--paginas", type=int, default=3)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args()
+
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, escala in (("letra_normal", 1.0), ("letra_chica", 0.6), ("letra_grande", 1.6)):
+            ruta = os.path.join(tmp, f"{nombre}.pdf")
+            pdf_escaneado(ruta, args.paginas, escala)
+            antes = _en_proceso("antes", ruta, args.repeticiones)
+            directo = _en_proceso("directo_320", ruta, args.repeticiones)
+            ahora = _en_proceso("ahora", ruta, args.repeticiones)
+            out[nombre] = {
+                "antes_png": antes,
+                "directo_320": directo,  # solo sin PNG, mismo DPI: aísla ese efecto
+                "ahora_directo": ahora,
+                "aceleracion": round(antes["seg_por_pagina"] / max(ahora["seg_por_pagina"], 1e-9), 2),
+            }
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Latencia por llamada de Tesseract sobre un recorte MRZ:
+pool en proceso (tesserocr) vs subproceso (pytesseract).
+
+Uso (desde la carpeta chat):
+    python -m bench.bench_tesseract [--n 50] [--hilos 4]
+Imprime JSON con p50/p95/media en ms por backend.
+"""
+import argparse, json, time, statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from services import ocr_ai, tesseract_pool
+
+MRZ_EJEMPLO = (
+    "ICCOL0123456784<<<<<<<<<<<<<<<",
+    "8501017M3001015COL1234567890<4",
+    "PEREZ<GOMEZ<<JUAN<CARLOS<<<<<<",
+)
+
+def imagen_mrz(escala: float = 1.0) -> np.ndarray:
+    """Recorte sintético de MRZ (3 líneas negras sobre blanco), ya binarizado."""
+    h, w = int(150 * escala), int(1000 * escala)
+    img = np.full((h, w), 255, np.uint8)
+    for i, linea in enumerate(MRZ_EJEMPLO):
+        cv2.putText(img, linea, (int(15 * escala), int((40 + 45 * i) * escala)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0 * escala, 0, max(1, int(2 * escala)), cv2.LINE_AA)
+    return ocr_ai._enhance_for_mrz(img)
+
+def _medir(fn, img, n: int, hilos: int) -> dict:
+    fn(img, 6)  # calentamiento (carga del modelo / primer proceso)
+    tiempos = []
+
+    def una(_):
+        t0 = time.perf_counter()
+        fn(img, 6)
+        return (time.perf_counter() - t0) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ex:
+        tiempos = list(ex.map(una, range(n)))
+    total = time.perf_counter() - inicio
+    tiempos.sort()
+    return {
+        "llamadas": n,
+        "hilos": hilos,
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[int(0.95 * (n - 1))], 2),
+        "media_ms": round(statistics.mean(tiempos), 2),
+        "llamadas_por_seg": round(n / total, 1),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=50)
+    ap.add_argument("--hilos", type=int, default=1)
+    args = ap.parse_args()
+
+    img = imagen_mrz()
+    out = {"subproceso": _medir(ocr_ai._tess_subproceso, img, args.n, args.hilos)}
+    if tesseract_pool.tesserocr is not None:
+        pool = tesseract_pool.PoolTesseract(tamano=args.hilos)
+        out["pool"] = _medir(pool.leer, img, args.n, args.hilos)
+        out["aceleracion_p50"] = round(out["subproceso"]["p50_ms"] / max(out["pool"]["p50_ms"], 1e-6), 1)
+    else:
+        out["pool"] = "tesserocr no instalado"
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
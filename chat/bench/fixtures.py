@@ -0,0 +1,198 @@
+"""
+Fixtures sintéticos y deterministas para los benchmarks (sin datos reales):
+  - certificados (Procuraduría, Contraloría, Policía, RNMC, RUT) como texto,
+    como PDF nativo (capa de texto, PyMuPDF) y como PDF escaneado (imagen);
+  - cédulas (anverso + reverso apilados) con la MRZ TD1 dibujada y dígitos de
+    control válidos;
+  - degradaciones de escaneo: 'limpio', 'ruido' (desenfoque + ruido) y
+    'contraste' (gris lavado);
+  - texto OCR largo: el certificado rodeado de texto legal, encabezados y pies
+    de página, con las líneas partidas como las devuelve el OCR;
+  - certificados "difíciles" para las reglas: valores en la línea siguiente a
+    su etiqueta y confusiones de OCR (0/O, 1/I, 5/S, 8/B).
+"""
+import os, textwrap
+from typing import Dict, List, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from services import ocr_ai
+
+PERSONAS = (
+    ("PEREZ GOMEZ JUAN CARLOS", "1020304050"),
+    ("RODRIGUEZ MARTINEZ ANA MARIA", "52123456"),
+    ("CASTRO RUIZ LUIS FERNANDO", "79876543"),
+)
+
+# tipo de reglas -> (campo del expediente, emisor, clave booleana, frase "no reportado")
+CERTIFICADOS = {
+    "procuraduria": ("antecedentes_procuraduria", "PROCURADURIA GENERAL DE LA NACION",
+                     "antecedentes_disciplinarios", "NO REGISTRA SANCIONES NI INHABILIDADES VIGENTES"),
+    "contraloria": ("antecedentes_contraloria", "CONTRALORIA GENERAL DE LA REPUBLICA",
+                    "responsabilidad_fiscal", "NO SE ENCUENTRA REPORTADO COMO RESPONSABLE FISCAL"),
+    "policia": ("antecedentes_policia", "POLICIA NACIONAL DE COLOMBIA",
+                "antecedentes_judiciales", "NO TIENE ASUNTOS PENDIENTES CON LAS AUTORIDADES JUDICIALES"),
+    "rnmc": ("antecedentes_rnmc", "REGISTRO NACIONAL DE MEDIDAS CORRECTIVAS",
+             "medidas_correctivas", "NO TIENE MEDIDAS CORRECTIVAS PENDIENTES POR CUMPLIR"),
+}
+
+NIVELES = ("limpio", "ruido", "contraste")
+
+def certificado(tipo: str, nombre: str, cedula: str) -> Tuple[List[str], Dict]:
+    """(líneas del certificado, campos esperados) para un tipo de services/reglas.py."""
+    if tipo == "rut":
+        lineas = ["FORMULARIO DEL REGISTRO UNICO TRIBUTARIO", "DIAN",
+                  f"NUMERO DE IDENTIFICACION TRIBUTARIA {cedula}",
+                  "PRIMER APELLIDO SEGUNDO APELLIDO PRIMER NOMBRE OTROS NOMBRES", nombre,
+                  f"CEDULA DE CIUDADANIA NUMERO {cedula}"]
+        return lineas, {"nombre": nombre, "cedula": cedula}
+    _, emisor, clave, frase = CERTIFICADOS[tipo]
+    lineas = [emisor, "CERTIFICADO DE ANTECEDENTES", "",
+              f"APELLIDOS Y NOMBRES: {nombre}",
+              f"CEDULA DE CIUDADANIA NUMERO {cedula}", "", frase,
+              "ESTE CERTIFICADO SE EXPIDE A SOLICITUD DEL INTERESADO"]
+    return lineas, {"nombre": nombre, "cedula": cedula, clave: False}
+
+_CONFUSIONES = {"O": "0", "I": "1", "S": "5", "B": "8", "0": "O", "1": "I", "5": "S", "8": "B"}
+
+def _confundir(linea: str, rng, tasa: float) -> str:
+    return "".join(_CONFUSIONES[ch] if ch in _CONFUSIONES and rng.random() < tasa else ch for ch in linea)
+
+def certificado_dificil(tipo: str, nombre: str, cedula: str, rng, tasa: float = 0.15) -> Tuple[List[str], Dict]:
+    """
+    Como certificado(), pero como lo deja un mal escaneo: el valor va en la línea
+    siguiente a su etiqueta ('APELLIDOS Y NOMBRES:' / nombre, '... NUMERO' / cédula)
+    y una fracción 'tasa' de los caracteres confundibles cambia (O->0, 1->I...).
+    Las reglas suelen quedar por debajo de REGLAS_MIN_CONFIANZA. Mismos campos esperados.
+    """
+    lineas, esperado = certificado(tipo, nombre, cedula)
+    partidas = []
+    for ln in lineas:
+        etiqueta, sep, valor = ln.partition(": ")
+        if sep:
+            partidas += [etiqueta + ":", valor]
+        elif ln.endswith(" " + cedula):
+            partidas += [ln[:-len(cedula) - 1], cedula]
+        else:
+            partidas.append(ln)
+    return [_confundir(ln, rng, tasa) for ln in partidas], esperado
+
+_RELLENO = (
+    "DE CONFORMIDAD CON LO ESTABLECIDO EN EL ARTICULO 174 DE LA LEY 734 DE 2002 Y EL DECRETO 019 DE 2012, "
+    "LA PRESENTE CERTIFICACION SE EXPIDE CON BASE EN LA INFORMACION QUE REPOSA EN LAS BASES DE DATOS DE LA ENTIDAD.",
+    "LA INFORMACION CONTENIDA EN ESTE DOCUMENTO ES DE CARACTER RESERVADO Y SOLO PUEDE SER UTILIZADA PARA LOS FINES "
+    "PREVISTOS EN LA LEY 1581 DE 2012 SOBRE PROTECCION DE DATOS PERSONALES.",
+    "EL TITULAR PODRA SOLICITAR LA ACTUALIZACION O RECTIFICACION DE SUS DATOS ANTE LA OFICINA DE ATENCION AL "
+    "CIUDADANO, DE LUNES A VIERNES DE 8:00 A 17:00, O A TRAVES DE LOS CANALES VIRTUALES DISPUESTOS PARA TAL FIN.",
+    "ESTE CERTIFICADO TIENE UNA VIGENCIA DE 30 DIAS CALENDARIO CONTADOS A PARTIR DE LA FECHA DE SU EXPEDICION Y "
+    "PUEDE SER VERIFICADO EN EL PORTAL WEB DE LA ENTIDAD CON EL CODIGO QUE APARECE AL PIE DE PAGINA.",
+    "ADVERTENCIA: LA ALTERACION, FALSIFICACION O USO INDEBIDO DE ESTE DOCUMENTO CONSTITUYE DELITO SEGUN EL CODIGO "
+    "PENAL COLOMBIANO (LEY 599 DE 2000), ARTICULOS 286 A 296.",
+)
+
+def ocr_largo(lineas, rng, chars: int = 16000, posicion: str = "final", ancho: int = 60) -> str:
+    """
+    Texto como lo entrega el OCR de un certificado largo: ~'chars' caracteres de texto
+    legal, encabezados y pies de página alrededor de 'lineas' ('inicio' | 'medio' | 'final'),
+    todo partido a 'ancho' caracteres por línea.
+    """
+    relleno, pag = [], 1
+    while sum(len(x) for x in relleno) < chars:
+        if len(relleno) % 8 == 0:
+            relleno += [f"PAGINA {pag} DE 9", f"CODIGO DE VERIFICACION {int(rng.integers(10**9, 10**10))}",
+                        f"BOGOTA D.C., {int(rng.integers(1, 28))} DE MARZO DE 2025 {int(rng.integers(0, 24))}:15:07"]
+            pag += 1
+        relleno.append(_RELLENO[int(rng.integers(len(_RELLENO)))])
+    corte = {"inicio": 0, "medio": len(relleno) // 2, "final": len(relleno)}[posicion]
+    bloques = relleno[:corte] + list(lineas) + relleno[corte:]
+    return "\n".join(ln for b in bloques for ln in (textwrap.wrap(b, ancho) or [""]))
+
+def pagina(lineas, alto_letra: float = 1.6) -> np.ndarray:
+    """Página carta a ~320 DPI (gris) con las líneas dadas."""
+    h, w = 3520, 2720
+    img = np.full((h, w), 255, np.uint8)
+    for i, ln in enumerate(lineas):
+        cv2.putText(img, ln, (160, 300 + i * 110), cv2.FONT_HERSHEY_SIMPLEX, alto_letra, 0, 3, cv2.LINE_AA)
+    return img
+
+def degradar(img: np.ndarray, nivel: str, rng) -> np.ndarray:
+    """Gris -> BGR con la degradación de escaneo indicada."""
+    if nivel == "ruido":
+        img = cv2.GaussianBlur(img, (5, 5), 0)
+        img = np.clip(img.astype(np.int16) + rng.normal(0, 28, img.shape), 0, 255).astype(np.uint8)
+    elif nivel == "contraste":
+        img = (img.astype(np.float32) * 0.35 + 110).astype(np.uint8)
+        img = np.clip(img.astype(np.int16) + rng.normal(0, 10, img.shape), 0, 255).astype(np.uint8)
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+def pdf_nativo(ruta: str, lineas) -> str:
+    """PDF generado digitalmente (capa de texto), como los certificados descargados."""
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    for i, ln in enumerate(lineas):
+        page.insert_text((54, 72 + i * 18), ln, fontsize=11)
+    doc.save(ruta)
+    doc.close()
+    return ruta
+
+def pdf_escaneado(ruta: str, lineas, nivel: str, rng) -> str:
+    """PDF con una sola imagen por página (escáner), sin capa de texto."""
+    bgr = degradar(pagina(lineas), nivel, rng)
+    ok, jpg = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    page.insert_image(page.rect, stream=jpg.tobytes())
+    doc.save(ruta)
+    doc.close()
+    return ruta
+
+def mrz_td1(numero: str, nacimiento: str, vence: str, nombre: str) -> str:
+    """Tres líneas TD1 con los dígitos de control ICAO correctos."""
+    dc = ocr_ai._digito_control
+    l1 = f"ICCOL{numero}{dc(numero)}".ljust(30, "<")
+    l2 = f"{nacimiento}{dc(nacimiento)}M{vence}{dc(vence)}COL".ljust(29, "<")
+    l2 += str(dc(l1[5:30] + l2[0:7] + l2[8:15] + l2[18:29]))
+    return "\n".join((l1, l2, nombre.ljust(30, "<")))
+
+CEDULAS = (
+    ("012345678", "850101", "300101", "PEREZ<GOMEZ<<JUAN<CARLOS"),
+    ("098765432", "920315", "320315", "RUIZ<CASTRO<<ANA<MARIA"),
+)
+
+def cedula(datos, nivel: str, rng) -> Tuple[np.ndarray, str]:
+    """(imagen BGR de anverso + reverso apilados, MRZ esperada)."""
+    numero, nac, vence, nombre = datos
+    mrz = mrz_td1(numero, nac, vence, nombre)
+    anverso = np.full((640, 1400), 255, np.uint8)
+    for i, ln in enumerate(("REPUBLICA DE COLOMBIA", "IDENTIFICACION PERSONAL", "CEDULA DE CIUDADANIA",
+                            f"NUMERO {int(numero):,}".replace(",", "."),
+                            nombre.split("<<")[0].replace("<", " "),
+                            nombre.split("<<")[1].replace("<", " "))):
+        cv2.putText(anverso, ln, (60, 90 + i * 90), cv2.FONT_HERSHEY_SIMPLEX, 1.4, 0, 3, cv2.LINE_AA)
+    reverso = np.full((900, 1400), 255, np.uint8)
+    for i, ln in enumerate(mrz.splitlines()):
+        cv2.putText(reverso, ln, (40, 620 + i * 80), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 0, 3, cv2.LINE_AA)
+    return degradar(np.vstack([anverso, reverso]), nivel, rng), mrz
+
+def expediente(carpeta: str, nivel: str, rng, persona=PERSONAS[0]) -> Dict[str, str]:
+    """
+    Escribe en 'carpeta' un expediente completo y devuelve {campo: ruta}:
+    RUT y Procuraduría nativos, los demás certificados escaneados y la cédula como JPEG.
+    """
+    nombre, num = persona
+    os.makedirs(carpeta, exist_ok=True)
+    docs = {}
+    for tipo in ("rut", *CERTIFICADOS):
+        campo = "rut" if tipo == "rut" else CERTIFICADOS[tipo][0]
+        lineas, _ = certificado(tipo, nombre, num)
+        ruta = os.path.join(carpeta, f"{campo}.pdf")
+        if tipo in ("rut", "procuraduria"):
+            docs[campo] = pdf_nativo(ruta, lineas)
+        else:
+            docs[campo] = pdf_escaneado(ruta, lineas, nivel, rng)
+    img, _ = cedula(CEDULAS[0], nivel, rng)
+    docs["cedula"] = os.path.join(carpeta, "cedula.jpg")
+    cv2.imwrite(docs["cedula"], img)
+    return docs
@@ -0,0 +1,275 @@
+"""
+Servidor local que imita POST /api/chat de Ollama (sin modelo real).
+
+- Responde {"message": {"role": "assistant", "content": "<json>"}} con un JSON
+  acorde al tipo de documento detectado en el prompt.
+- Latencia y tasa de errores 503 configurables, para probar concurrencia,
+  reintentos y deadlines del cliente.
+- Cuenta peticiones y el máximo de peticiones simultáneas observadas.
+- Modo lector (lector=True / --lector): en vez de la respuesta fija, "lee" el
+  texto del documento que trae el prompt y extrae nombre, cédula y la frase de
+  estado, tolerando confusiones típicas del OCR (0/O, 1/I, 5/S, 8/B) y valores
+  en la línea siguiente a su etiqueta. No usa services/reglas.py: sirve para
+  comparar qué extraería el modelo con el texto completo vs. el contexto elegido
+  (bench/bench_contexto.py). Solo ve lo que se le envía.
+- Dos servidores con el mismo comportamiento: uno con hilos (http.server) y otro
+  asyncio (iniciar_mock_async), que atiende cientos de peticiones lentas a la vez
+  en un solo hilo, para probar services/llm_async.py.
+
+Uso (desde la carpeta chat):
+    python -m bench.mock_ollama --puerto 11435 --latencia 0.5 [--async]
+    OLLAMA_URL=http://127.0.0.1:11435/api/chat python app.py
+"""
+import argparse, asyncio, json, random, re, threading, time, unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+RESPUESTAS = {
+    "CÉDULAS": {"ok": True, "missing_fields": [], "nuip": "1234567890", "nombres": "Juan Carlos",
+                "apellidos": "Perez Gomez", "fecha_nacimiento": "1985-01-01", "lugar_expedicion": "Bogota",
+                "fecha_expedicion": "2003-02-03", "encabezados_validos": True,
+                "republica_detectada": True, "mrz_detectada": True},
+    "RUT": {"ok": True, "missing_fields": [], "nombre": "Juan Carlos Perez Gomez", "cedula": "1234567890"},
+    "Contraloría": {"ok": True, "missing_fields": [], "nombre": "Juan Carlos Perez Gomez",
+                    "cedula": "1234567890", "responsabilidad_fiscal": False},
+    "Procuraduría": {"ok": True, "missing_fields": [], "nombre": "Juan Carlos Perez Gomez",
+                     "cedula": "1234567890", "antecedentes_disciplinarios": False},
+    "Policía": {"ok": True, "missing_fields": [], "nombre": "Juan Carlos Perez Gomez",
+                "cedula": "1234567890", "antecedentes_judiciales": False},
+    "RNMC": {"ok": True, "missing_fields": [], "nombre": "Juan Carlos Perez Gomez",
+             "cedula": "1234567890", "medidas_correctivas": False},
+}
+
+def respuesta_para(prompt: str) -> dict:
+    for clave, resp in RESPUESTAS.items():
+        if clave in prompt:
+            return resp
+    return {"ok": False, "missing_fields": ["tipo_desconocido"]}
+
+# -------------------- Modo lector -------------------------------
+_A_LETRA = str.maketrans("0158", "OISB")
+_A_DIGITO = str.maketrans("OISBL", "01581")
+_ETIQUETAS = {"APELLIDOS", "APELLIDO", "NOMBRES", "NOMBRE", "Y", "PRIMER", "SEGUNDO", "OTROS",
+              "CEDULA", "CIUDADANIA", "NUMERO", "SENOR", "SENORA", "IDENTIFICADO", "IDENTIFICADA"}
+_RE_ETIQUETA_ID = re.compile(r"CEDULA|\bC\.?C\b|IDENTIFICACION|\bNIT\b|DOCUMENTO")
+_RE_ETIQUETA_NOMBRE = re.compile(r"APELLIDO|NOMBRE|\bSENOR")
+# clave booleana -> frase que la activa (precedida de "NO" = false)
+_FRASES = {
+    "responsabilidad_fiscal": "RESPONSABLE FISCAL",
+    "antecedentes_disciplinarios": "SANCIONES",
+    "antecedentes_judiciales": "ASUNTOS PENDIENTES",
+    "medidas_correctivas": "CORRECTIVAS PENDIENTES",  # "MEDIDAS CORRECTIVAS" va en el encabezado
+}
+
+def _corregir_ocr(linea: str) -> str:
+    """Palabra con más dígitos que letras -> número; si no -> palabra (0->O, 1->I...)."""
+    linea = "".join(ch for ch in unicodedata.normalize("NFKD", linea.upper()) if not unicodedata.combining(ch))
+    out = []
+    for p in linea.split():
+        digitos = sum(ch.isdigit() for ch in p)
+        out.append(p.translate(_A_DIGITO) if digitos > len(p) - digitos else p.translate(_A_LETRA))
+    return " ".join(out)
+
+def _leer_cedula(lineas) -> str:
+    for i, ln in enumerate(lineas):
+        if _RE_ETIQUETA_ID.search(ln):
+            for sig in lineas[i:i + 3]:
+                for m in re.finditer(r"\d[\d.,]*\d", sig):
+                    num = re.sub(r"\D", "", m.group(0))
+                    if 6 <= len(num) <= 10:
+                        return num
+    return ""
+
+def _leer_nombre(lineas) -> str:
+    for i, ln in enumerate(lineas):
+        if not _RE_ETIQUETA_NOMBRE.search(ln):
+            continue
+        for sig in [ln.split(":", 1)[1] if ":" in ln else ln] + lineas[i + 1:i + 4]:
+            palabras = re.findall(r"[A-Z]+", sig)
+            if 2 <= len(palabras) <= 6 and not _ETIQUETAS.intersection(palabras):
+                return " ".join(palabras)
+    return ""
+
+def _leer_estado(texto: str, frase: str) -> Optional[bool]:
+    m = re.search(r"\s+".join(frase.split()), texto)
+    if not m:
+        return None
+    return not re.search(r"\bNO\b", texto[max(0, m.start() - 40):m.start()])
+
+def respuesta_leyendo(prompt: str) -> dict:
+    """JSON con el esquema de RESPUESTAS para el tipo del prompt, leído del texto enviado."""
+    instruccion, _, resto = prompt.partition('\n"""\n')
+    plantilla = respuesta_para(instruccion)
+    if not plantilla.get("ok"):
+        return plantilla
+    lineas = [_corregir_ocr(ln) for ln in resto.rpartition('\n"""\n')[0].splitlines()]
+    texto = " ".join(lineas)
+    out, faltan = {}, []
+    for campo in plantilla:
+        if campo in ("ok", "missing_fields"):
+            continue
+        if campo == "nombre":
+            valor = _leer_nombre(lineas)
+        elif campo == "cedula":
+            valor = _leer_cedula(lineas)
+        elif campo in _FRASES:
+            valor = _leer_estado(texto, _FRASES[campo])
+        else:  # cédula de ciudadanía: fuera del alcance del lector
+            valor = None
+        if valor in ("", None):
+            faltan.append(campo)
+        out[campo] = valor if valor is not None else ""
+    return {"ok": not faltan, "missing_fields": faltan, **out}
+
+class _Estado:
+    def __init__(self, latencia: float, tasa_error: float, lector: bool = False):
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.lector = lector
+        self.peticiones = 0
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.lock = threading.Lock()
+
+def _responder(est: _Estado, payload: dict):
+    """(código, cuerpo) para un POST /api/chat ya esperada la latencia."""
+    if random.random() < est.tasa_error:
+        return 503, {"error": "servidor ocupado"}
+    prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+    contenido = json.dumps(respuesta_leyendo(prompt) if est.lector else respuesta_para(prompt), ensure_ascii=False)
+    return 200, {
+        "model": payload.get("model"),
+        "message": {"role": "assistant", "content": contenido},
+        "done": True,
+        "prompt_eval_count": len(prompt) // 4,
+        "eval_count": len(contenido) // 4,
+    }
+
+def _entra(est: _Estado) -> None:
+    with est.lock:
+        est.peticiones += 1
+        est.en_vuelo += 1
+        est.max_en_vuelo = max(est.max_en_vuelo, est.en_vuelo)
+
+def _sale(est: _Estado) -> None:
+    with est.lock:
+        est.en_vuelo -= 1
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como Ollama
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar(self, codigo: int, cuerpo: dict) -> None:
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_POST(self):
+        est: _Estado = self.server.estado
+        largo = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(largo) or b"{}")
+        if self.path != "/api/chat":
+            return self._enviar(404, {"error": "not found"})
+
+        _entra(est)
+        try:
+            time.sleep(est.latencia)
+            self._enviar(*_responder(est, payload))
+        finally:
+            _sale(est)
+
+def iniciar_mock(puerto: int = 0, latencia: float = 0.2, tasa_error: float = 0.0, lector: bool = False):
+    """
+    Arranca el mock en un hilo. Devuelve (servidor, url_api_chat).
+    servidor.estado expone peticiones y max_en_vuelo; servidor.shutdown() lo detiene.
+    """
+    srv = ThreadingHTTPServer(("127.0.0.1", puerto), _Handler)
+    srv.daemon_threads = True
+    srv.estado = _Estado(latencia, tasa_error, lector)
+    threading.Thread(target=srv.serve_forever, name="mock-ollama", daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/api/chat"
+
+# -------------------- Variante asyncio --------------------------
+_RAZONES = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}
+
+async def _atender(est: _Estado, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """HTTP/1.1 mínimo con keep-alive: línea de petición, cabeceras y cuerpo por Content-Length."""
+    try:
+        while True:
+            linea = await reader.readline()
+            if not linea.strip():
+                break
+            _, ruta, _ = linea.decode("latin-1").split(" ", 2)
+            cabeceras = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = h.decode("latin-1").partition(":")
+                cabeceras[k.strip().lower()] = v.strip()
+            cuerpo = await reader.readexactly(int(cabeceras.get("content-length") or 0))
+
+            if ruta != "/api/chat":
+                codigo, resp = 404, {"error": "not found"}
+            else:
+                _entra(est)
+                try:
+                    await asyncio.sleep(est.latencia)
+                    codigo, resp = _responder(est, json.loads(cuerpo or b"{}"))
+                finally:
+                    _sale(est)
+            datos = json.dumps(resp, ensure_ascii=False).encode("utf-8")
+            writer.write(f"HTTP/1.1 {codigo} {_RAZONES[codigo]}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(datos)}\r\n\r\n".encode("latin-1") + datos)
+            await writer.drain()
+            if cabeceras.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+        pass  # el cliente cortó (p.ej. petición cancelada por deadline) o se cerró el servidor
+    finally:
+        writer.close()
+
+async def iniciar_mock_async(puerto: int = 0, latencia: float = 0.2, tasa_error: float = 0.0):
+    """
+    Arranca el mock asyncio en el loop actual. Devuelve (servidor, estado, url_api_chat);
+    servidor.close() lo detiene.
+    """
+    est = _Estado(latencia, tasa_error)
+    srv = await asyncio.start_server(lambda r, w: _atender(est, r, w), "127.0.0.1", puerto)
+    return srv, est, f"http://127.0.0.1:{srv.sockets[0].getsockname()[1]}/api/chat"
+
+async def _servir_async(puerto: int, latencia: float, tasa_error: float) -> None:
+    srv, _, url = await iniciar_mock_async(puerto, latencia, tasa_error)
+    print("mock Ollama (asyncio) en", url)
+    async with srv:
+        await srv.serve_forever()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--puerto", type=int, default=11435)
+    ap.add_argument("--latencia", type=float, default=0.5)
+    ap.add_argument("--tasa-error", type=float, default=0.0)
+    ap.add_argument("--async", dest="asincrono", action="store_true", help="servidor asyncio")
+    ap.add_argument("--lector", action="store_true", help="extrae del texto del prompt (solo con hilos)")
+    args = ap.parse_args()
+    if args.asincrono:
+        try:
+            asyncio.run(_servir_async(args.puerto, args.latencia, args.tasa_error))
+        except KeyboardInterrupt:
+            pass
+        return
+    srv, url = iniciar_mock(args.puerto, args.latencia, args.tasa_error, args.lector)
+    print("mock Ollama en", url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
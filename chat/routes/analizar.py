@@ -1,163 +1,128 @@
+import io
 import os
 import re
-import shutil
-from typing import Dict, List, Optional
+import hashlib
+from typing import Dict, List, Optional, Sequence
 
-from flask import Blueprint, jsonify, request, session, send_file
+from flask import Blueprint, Response, jsonify, request, session, send_file
 from werkzeug.utils import secure_filename
 
 from auth import login_required, role_required
+from services import blobs, indice, jobs, meta_usuarios, metricas, previews, subidas
+from services.cache import estadisticas_caches
+from services.zip_stream import zip_en_stream
+from services.indice import (
+    UPLOAD_ROOT, STATES, parse_field_from_name,
+)
 
 # ------------------------ Blueprint -------------------------
 analizar_bp = Blueprint("analizar", __name__, url_prefix="/api")
 
-# -------------------- Constantes y paths --------------------
-UPLOAD_ROOT = os.path.join(os.getcwd(), "uploads")
-STATES = ("pendientes", "revisados", "validados")
-META_DIR = os.path.join(UPLOAD_ROOT, "meta")
-
 # -------------------- Utilidades básicas --------------------
 def ensure_dirs() -> None:
-    """Crea la estructura base de carpetas si no existe."""
+    """Crea la estructura base de carpetas si no existe (los archivos van en uploads/blobs)."""
     os.makedirs(UPLOAD_ROOT, exist_ok=True)
-    os.makedirs(META_DIR, exist_ok=True)
-    for s in STATES:
-        os.makedirs(os.path.join(UPLOAD_ROOT, s), exist_ok=True)
-
-def user_dir(user_id: str, state: str) -> str:
-    """Devuelve (y crea si hace falta) la carpeta de un usuario en un estado."""
-    d = os.path.join(UPLOAD_ROOT, state, str(user_id))
-    os.makedirs(d, exist_ok=True)
-    return d
 
 def set_user_email_meta(user_id: str, email: str) -> None:
     """Guarda el email del usuario para mostrarlo en listados de Admin/Comité."""
-    ensure_dirs()
-    with open(os.path.join(META_DIR, f"{user_id}.txt"), "w", encoding="utf-8") as f:
-        f.write(email or "")
+    meta_usuarios.guardar_email(user_id, email)
 
 def get_user_email_meta(user_id: str) -> str:
     """Lee el email del usuario; si no existe, devuelve un alias neutro."""
-    p = os.path.join(META_DIR, f"{user_id}.txt")
-    if os.path.exists(p):
-        try:
-            return open(p, "r", encoding="utf-8").read().strip() or f"user_{user_id}"
-        except Exception:
-            return f"user_{user_id}"
-    return f"user_{user_id}"
-
-# -------------------- Nombres y tipos de doc ----------------
-HEX_RE = re.compile(r"^[0-9a-f]{16,}$", re.IGNORECASE)
+    return meta_usuarios.email(user_id)
 
-def clean_original_name(fname: str) -> str:
-    """
-    Si el archivo viene como '<hash>_NombreOriginal.pdf', devuelve 'NombreOriginal.pdf'.
-    Si ya viene como 'campo__Nombre.pdf' lo deja igual.
-    """
-    # Mantén primero el formato 'campo__archivo'
-    if "__" in fname:
-        return fname.split("__", 1)[1] if fname.count("__") >= 1 else fname
-
-    parts = fname.split("_", 1)
-    if len(parts) == 2 and HEX_RE.match(parts[0]):
-        return parts[1]
-    return fname
-
-def infer_doc_type(name: str) -> str:
-    n = name.lower()
-    if "rut" in n: return "RUT"
-    if "cámara" in n or "camara" in n: return "Cámara de Comercio"
-    if "cédula" in n or "cedula" in n or "nuip" in n: return "Cédula"
-    if "contralor" in n: return "Contraloría"
-    if "procuradur" in n: return "Procuraduría"
-    if "polic" in n: return "Policía"
-    if "rnmc" in n: return "RNMC"
-    if "intenci" in n: return "Carta de Intención"
-    if "estatuto" in n or "aceptaci" in n: return "Carta de Aceptación"
-    return "Documento"
-
-def parse_field_from_name(fname: str) -> Optional[str]:
-    """Extrae el 'campo' si el nombre es 'campo__archivo'. Si no, intenta inferir."""
-    if "__" in fname:
-        return fname.split("__", 1)[0]
-    t = infer_doc_type(fname).lower()
-    mapa = {
-        "rut": "rut",
-        "cámara de comercio": "camara_comercio",
-        "cédula": "cedula",
-        "contraloría": "antecedentes_contraloria",
-        "procuraduría": "antecedentes_procuraduria",
-        "policía": "antecedentes_policia",
-        "rnmc": "antecedentes_rnmc",
-        "carta de intención": "carta_intencion",
-        "carta de aceptación": "carta_aceptacion",
+# -------------------- Listados / Movimientos ----------------
+def _item_desde_fila(fila: Dict, email: str) -> Dict:
+    """Fila del índice -> item que consumen las vistas de Admin/Comité."""
+    state, user_id, fname = fila["state"], fila["user_id"], fila["name"]
+    return {
+        "id": f"{state}/{user_id}/{fname}",
+        "userId": user_id,
+        "userEmail": email,
+        "name": fname,
+        "originalName": fila["original_name"],
+        "docType": fila["doc_type"],
+        "displayName": f"{fila['doc_type']} — {fila['original_name']}",
+        "state": state,
+        "field": fila["field"],
+        "sha256": fila["sha256"],
     }
-    return mapa.get(t)
 
-# -------------------- Listados / Movimientos ----------------
 def list_items_by_state(state: str) -> List[Dict]:
-    """Lista todos los archivos en un estado, de todos los usuarios."""
-    ensure_dirs()
-    out: List[Dict] = []
-    base = os.path.join(UPLOAD_ROOT, state)
-    if not os.path.isdir(base):
-        return out
-
-    for user_id in os.listdir(base):
-        udir = os.path.join(base, user_id)
-        if not os.path.isdir(udir):
-            continue
-        email = get_user_email_meta(user_id)
-        for fname in os.listdir(udir):
-            fpath = os.path.join(udir, fname)
-            if os.path.isfile(fpath):
-                original = clean_original_name(fname)
-                doc_type = infer_doc_type(original)
-                display = f"{doc_type} — {original}"
-                out.append({
-                    "id": f"{state}/{user_id}/{fname}",
-                    "userId": user_id,
-                    "userEmail": email,
-                    "name": fname,
-                    "originalName": original,
-                    "docType": doc_type,
-                    "displayName": display,
-                    "state": state,
-                    "field": parse_field_from_name(fname),
-                })
-    return out
+    """Lista todos los archivos en un estado, de todos los usuarios (consulta al índice)."""
+    filas = indice.listar(state=state)
+    emails = meta_usuarios.emails({f["user_id"] for f in filas})
+    return [_item_desde_fila(f, emails[f["user_id"]]) for f in filas]
 
 def list_items_by_state_for_user(state: str, user_id: str) -> List[Dict]:
-    """Lista archivos de un usuario en un estado."""
-    ensure_dirs()
-    out: List[Dict] = []
-    base = os.path.join(UPLOAD_ROOT, state, str(user_id))
-    if not os.path.isdir(base):
-        return out
+    """Lista archivos de un usuario en un estado (consulta al índice)."""
     email = get_user_email_meta(user_id)
-    for fname in os.listdir(base):
-        fpath = os.path.join(base, fname)
-        if os.path.isfile(fpath):
-            original = clean_original_name(fname)
-            doc_type = infer_doc_type(original)
-            display = f"{doc_type} — {original}"
-            out.append({
-                "id": f"{state}/{user_id}/{fname}",
-                "userId": user_id,
-                "userEmail": email,
-                "name": fname,
-                "originalName": original,
-                "docType": doc_type,
-                "displayName": display,
-                "state": state,
-                "field": parse_field_from_name(fname),
-            })
-    return out
+    return [_item_desde_fila(f, email) for f in indice.listar(state=state, user_id=user_id)]
+
+HEX_SHA_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+
+# Paginación de listados: ?limit=&cursor=&order=usuario|reciente|tipo
+# filtros: ?docType=&field=&user=&state=
+LIMITE_DEFECTO = 100
+LIMITE_MAX = 500
+
+def _listado_paginado(states: Sequence[str], user_id: Optional[str] = None, extra=None):
+    """
+    Responde un listado del índice paginado por cursor y con ETag.
+    El ETag sale de las generaciones del índice y de los emails + la query:
+    si nada cambió, If-None-Match devuelve 304 sin consultar ni serializar.
+    """
+    args = request.args
+    state = (args.get("state") or "all").lower()
+    if state != "all":
+        if state not in states:
+            return jsonify({"ok": False, "error": "Estado inválido"}), 400
+        states = (state,)
+    if user_id is None:
+        user_id = args.get("user") or None
+    orden = (args.get("order") or "usuario").lower()
+    if orden not in indice.ORDENES:
+        return jsonify({"ok": False, "error": "Orden inválido"}), 400
+    try:
+        limite = min(max(int(args.get("limit") or LIMITE_DEFECTO), 1), LIMITE_MAX)
+    except ValueError:
+        return jsonify({"ok": False, "error": "limit inválido"}), 400
+
+    firma = "|".join([
+        str(indice.generacion()), str(meta_usuarios.generacion()), ",".join(states), str(user_id),
+        args.get("docType") or "", args.get("field") or "", orden, str(limite), args.get("cursor") or "",
+    ])
+    etag = hashlib.sha1(firma.encode("utf-8")).hexdigest()
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    try:
+        with metricas.span("indice_consulta"):
+            filas, siguiente = indice.consultar(
+                states=states, user_id=user_id,
+                doc_type=args.get("docType") or None, field=args.get("field") or None,
+                orden=orden, cursor=args.get("cursor") or None, limite=limite,
+            )
+    except indice.CursorInvalido as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    emails = meta_usuarios.emails({f["user_id"] for f in filas})
+    items = [_item_desde_fila(f, emails[f["user_id"]]) for f in filas]
+    if extra:
+        for it in items:
+            extra(it)
+    resp = jsonify({"items": items, "next_cursor": siguiente})
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"  # el navegador revalida con If-None-Match
+    return resp
 
 def move_item(rel_id: str, dst_state: str) -> bool:
     """
     Mueve 'pendientes/<user>/<file>' -> 'revisados/<user>/<file>' (etc).
     rel_id: 'estado/userId/fichero...'
+    Es un cambio de metadatos en el índice: el blob no se mueve.
     """
     try:
         parts = rel_id.split("/")
@@ -165,13 +130,9 @@ def move_item(rel_id: str, dst_state: str) -> bool:
             return False
         src_state, user_id = parts[0], parts[1]
         fname = "/".join(parts[2:])
-        src = os.path.join(UPLOAD_ROOT, src_state, user_id, fname)
-        dst = os.path.join(UPLOAD_ROOT, dst_state, user_id, fname)
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        if not os.path.exists(src):
+        if src_state not in STATES or dst_state not in STATES:
             return False
-        shutil.move(src, dst)
-        return True
+        return indice.mover(src_state, user_id, fname, dst_state)
     except Exception as e:
         print("move_item error:", e)
         return False
@@ -184,7 +145,8 @@ def move_item(rel_id: str, dst_state: str) -> bool:
 def api_upload_files():
     """
     Recibe múltiples inputs file desde fetch/form-data.
-    Guarda en 'pendientes/<userId>' con prefijo 'campo__archivo'.
+    Guarda en 'pendientes/<userId>' con prefijo 'campo__archivo'
+    y encola el análisis OCR/LLM (consultar en /api/jobs/<job_id>).
     """
     ensure_dirs()
     user = session.get("user") or {}
@@ -193,6 +155,9 @@ def api_upload_files():
     set_user_email_meta(user_id, email)
 
     saved = []
+    errors = []
+    duplicates = {}
+    documentos = {}
     for field, storage in request.files.items():
         if not storage:
             continue
@@ -200,11 +165,20 @@ def api_upload_files():
         if not fname:
             continue
         final_name = f"{field}__{fname}"  # clave: conserva el campo
-        dst = os.path.join(user_dir(user_id, "pendientes"), final_name)
-        storage.save(dst)
-        saved.append(final_name)
+        try:
+            with metricas.span("subida"):
+                info = subidas.guardar(storage, "pendientes", user_id, final_name)
+        except subidas.ArchivoRechazado as e:
+            errors.append(str(e))
+            continue
+        saved.append(info["name"])
+        if info["duplicateOf"]:
+            duplicates[final_name] = info["duplicateOf"]
+        documentos[field] = info["path"]
 
-    return jsonify({"ok": True, "saved": saved})
+    job_id = jobs.encolar(user_id, documentos) if documentos else None
+    return jsonify({"ok": not errors, "saved": saved, "errors": errors,
+                    "duplicates": duplicates, "job_id": job_id})
 
 # ---------------------- ADMIN: usuarios ---------------------
 @analizar_bp.get("/admin/users")
@@ -212,20 +186,8 @@ def api_upload_files():
 @role_required("admin")
 def admin_users():
     """Lista IDs y emails de usuarios que tienen meta o archivos."""
-    ensure_dirs()
-    users = set()
-
-    # meta
-    for fn in os.listdir(META_DIR):
-        if fn.endswith(".txt"):
-            users.add(fn[:-4])  # str
-
-    # carpetas por estado
-    for st in STATES:
-        base = os.path.join(UPLOAD_ROOT, st)
-        for uid in os.listdir(base):
-            if os.path.isdir(os.path.join(base, uid)):
-                users.add(uid)  # ya es str por os.listdir
+    users = set(meta_usuarios.usuarios())
+    users.update(indice.usuarios())  # usuarios con archivos
 
     items = []
 
@@ -234,11 +196,20 @@ def admin_users():
         return (0, int(s)) if s.isdigit() else (1, s.lower())
 
     # Fuerza a str y usa key uniforme
+    emails = meta_usuarios.emails(users)
     for uid in sorted((str(u) for u in users), key=_key):
-        items.append({"id": uid, "email": get_user_email_meta(uid)})
+        items.append({"id": uid, "email": emails[uid]})
 
     return jsonify({"items": items})
 
+# ------------------ ADMIN: estadísticas cache ---------------
+@analizar_bp.get("/admin/cache")
+@login_required
+@role_required("admin")
+def admin_cache_stats():
+    """Aciertos/fallos, tamaño y expulsiones de las caches OCR, LLM y vistas previas."""
+    return jsonify(dict(estadisticas_caches(), previews=previews.estadisticas()))
+
 # -------------- ADMIN: listar por usuario/estado ------------
 @analizar_bp.get("/admin/user/<user_id>/files")
 @login_required
@@ -247,15 +218,9 @@ def admin_user_files(user_id):
     """
     Lista archivos de un usuario.
     ?state=pendientes|revisados|validados|all (default: all)
+    Paginado: ?limit=&cursor=&order=; filtros ?docType=&field=
     """
-    state = (request.args.get("state") or "all").lower()
-    states = STATES if state == "all" else (state,)
-    out: List[Dict] = []
-    for st in states:
-        if st not in STATES:
-            continue
-        out.extend(list_items_by_state_for_user(st, user_id))
-    return jsonify({"items": out})
+    return _listado_paginado(STATES, user_id=str(user_id))
 
 # ------------------ ADMIN: agregar archivo ------------------
 @analizar_bp.post("/admin/user/<user_id>/files")
@@ -280,13 +245,18 @@ def admin_user_upload(user_id):
 
     safe = secure_filename(f.filename)
     final_name = f"{field}__{safe}" if field else safe
-    dst = os.path.join(user_dir(user_id, state), final_name)
-    f.save(dst)
+    try:
+        with metricas.span("subida"):
+            info = subidas.guardar(f, state, str(user_id), final_name)
+    except subidas.ArchivoRechazado as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
     return jsonify({"ok": True, "saved": {
         "id": f"{state}/{user_id}/{final_name}",
         "name": final_name,
-        "state": state
+        "state": state,
+        "sha256": info["sha256"],
+        "duplicateOf": info["duplicateOf"],
     }})
 
 # ------------------ ADMIN: eliminar archivo -----------------
@@ -301,31 +271,111 @@ def admin_user_delete(user_id, fname):
     state = (request.args.get("state") or "").lower()
     if state not in STATES:
         return jsonify({"ok": False, "error": "Estado inválido"}), 400
-    path = os.path.join(UPLOAD_ROOT, state, str(user_id), fname)
-    if not os.path.exists(path):
+    if not indice.eliminar(state, user_id, fname):
         return jsonify({"ok": False, "error": "No existe"}), 404
-    os.remove(path)
     return jsonify({"ok": True})
 
 # ---------------- (Opcional) descargar archivo --------------
+_MIMETYPES = {"pdf": "application/pdf", "png": "image/png", "jpg": "image/jpeg"}
+
 @analizar_bp.get("/admin/user/<user_id>/files/<path:fname>/download")
 @login_required
 @role_required("admin")
 def admin_user_download(user_id, fname):
+    """
+    Descarga (o ?inline=1 para el visor PDF) con Range, ETag (sha256) e
+    If-Modified-Since. send_file entrega el archivo con wsgi.file_wrapper
+    (sendfile en gunicorn) o X-Sendfile si USE_X_SENDFILE está activo.
+    """
     state = (request.args.get("state") or "pendientes").lower()
-    fpath = os.path.join(UPLOAD_ROOT, state, str(user_id), fname)
-    if not os.path.exists(fpath):
+    with metricas.span("descarga"):  # búsqueda + apertura; el envío lo hace el servidor WSGI
+        fila = indice.obtener(state, str(user_id), fname)
+        if not fila or not os.path.exists(fila["path"]):
+            return "Not found", 404
+        ext = fila["blob"].rsplit(".", 1)[-1]
+        resp = send_file(
+            fila["path"],
+            mimetype=_MIMETYPES.get(ext, "application/octet-stream"),
+            as_attachment=request.args.get("inline") != "1",
+            download_name=fila["original_name"],
+            conditional=True,
+            etag=fila["sha256"],
+            last_modified=fila["mtime"],
+            max_age=0,
+        )
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+# ---------------- Vistas previas / miniaturas ---------------
+@analizar_bp.get("/previews/<sha256>")
+@login_required
+@role_required("admin", "comite")
+def file_preview(sha256):
+    """
+    JPEG de baja resolución de una página: ?page=0 (default) &w=<px>
+    (default miniatura 240; 'w=page' = 900). La URL va por hash de contenido,
+    así que la respuesta es inmutable y se cachea un año en el navegador.
+    """
+    if not HEX_SHA_RE.match(sha256 or ""):
+        return "Not found", 404
+    ruta = indice.ruta_por_hash(sha256.lower())
+    if not ruta or not os.path.exists(ruta):
         return "Not found", 404
-    return send_file(fpath, as_attachment=True)
+    w = request.args.get("w")
+    try:
+        pagina = int(request.args.get("page") or 0)
+        ancho = previews.ANCHO_PAGINA if w == "page" else previews.ajustar_ancho(w)
+        with metricas.span("preview"):
+            jpg = previews.obtener(ruta, sha256.lower(), pagina, ancho)
+    except (ValueError, IndexError):
+        return "Not found", 404
+    resp = send_file(io.BytesIO(jpg), mimetype="image/jpeg", max_age=365 * 24 * 3600,
+                     conditional=True, etag=f"{sha256.lower()}-{ancho}-{pagina}")
+    resp.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return resp
+
+# ------------- ADMIN: exportar expediente en ZIP ------------
+def _medido(etapa: str, gen):
+    """Span alrededor de todo el envío de un generador (Response en streaming)."""
+    with metricas.span(etapa):
+        yield from gen
+
+@analizar_bp.get("/admin/user/<user_id>/export.zip")
+@login_required
+@role_required("admin")
+def admin_user_export_zip(user_id):
+    """
+    ZIP con todos los archivos del usuario en ?state= (default: validados),
+    generado al vuelo mientras se envía (ni en memoria ni en disco).
+    """
+    state = (request.args.get("state") or "validados").lower()
+    if state not in STATES:
+        return jsonify({"ok": False, "error": "Estado inválido"}), 400
+    filas = [f for f in indice.listar(state=state, user_id=str(user_id))
+             if f["blob"] and os.path.exists(blobs.ruta_blob(f["blob"]))]
+    if not filas:
+        return jsonify({"ok": False, "error": "Sin archivos"}), 404
+    archivos = [(f["name"], blobs.ruta_blob(f["blob"]), f["mtime"]) for f in filas]
+    nombre = secure_filename(f"expediente_{user_id}_{state}.zip")
+    return Response(
+        _medido("export_zip", zip_en_stream(archivos)),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}"',
+            "Cache-Control": "private, no-store",
+        },
+    )
 
 # -------- ADMIN: listado general (compatibilidad vieja) -----
 @analizar_bp.get("/admin/files")
 @login_required
 @role_required("admin")
 def admin_list_files():
-    """Lista global de pendientes + revisados (para compatibilidad con código antiguo)."""
-    items = list_items_by_state("pendientes") + list_items_by_state("revisados")
-    return jsonify({"items": items})
+    """
+    Lista global de pendientes + revisados (para compatibilidad con código antiguo).
+    Paginado: ?limit=&cursor=&order=; filtros ?state=&user=&docType=&field=
+    """
+    return _listado_paginado(("pendientes", "revisados"))
 
 # ------- ADMIN: enviar seleccionados a Comité (revisados) ---
 @analizar_bp.post("/admin/submit-to-committee")
@@ -334,22 +384,22 @@ def admin_list_files():
 def admin_submit_to_committee():
     """
     Body JSON: { ids: ["pendientes/<uid>/<fname>", ...] }
-    Mueve cada id desde 'pendientes' a 'revisados'.
+    Mueve los ids desde 'pendientes' a 'revisados' en una sola transacción:
+    si alguno ya no existe no se mueve ninguno (409 con la lista 'missing').
     """
     data = request.get_json(silent=True) or {}
     ids = data.get("ids") or []
     if not isinstance(ids, list) or not ids:
         return jsonify({"ok": False, "error": "ids vacíos"}), 400
 
-    moved = 0
-    for rel_id in ids:
-        if not isinstance(rel_id, str):
-            continue
-        if not rel_id.startswith("pendientes/"):
-            # solo permitimos mover desde pendientes
-            continue
-        if move_item(rel_id, "revisados"):
-            moved += 1
+    # solo permitimos mover desde pendientes
+    validos = [i for i in ids if isinstance(i, str) and i.startswith("pendientes/")]
+    try:
+        moved = indice.mover_lote(validos, "revisados")
+    except indice.NoEncontrado as e:
+        return jsonify({"ok": False, "error": "Algunos archivos no existen", "missing": e.faltantes}), 409
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
     return jsonify({"ok": True, "moved": moved})
 
@@ -358,11 +408,13 @@ def admin_submit_to_committee():
 @login_required
 @role_required("comite")
 def committee_queue():
-    """Lista elementos en 'revisados' para decisión del Comité."""
-    items = list_items_by_state("revisados")
-    for it in items:
+    """
+    Lista elementos en 'revisados' para decisión del Comité.
+    Paginado: ?limit=&cursor=&order=; filtros ?user=&docType=&field=
+    """
+    def _expediente(it):
         it["expediente"] = it["id"].split("/")[1]  # userId como identificador de expediente
-    return jsonify({"items": items})
+    return _listado_paginado(("revisados",), extra=_expediente)
 
 # ------------------- COMITÉ: tomar decisión -----------------
 @analizar_bp.post("/committee/reviews/<path:rid>/decision")
@@ -382,3 +434,53 @@ def committee_decide(rid):
     dst = "validados" if decision == "aprobado" else "pendientes"
     ok = move_item(rid, dst)
     return jsonify({"ok": bool(ok)})
+
+# ---------------- COMITÉ: decisiones en lote ----------------
+_DESTINO_DECISION = {"aprobado": "validados", "rechazado": "pendientes"}
+
+@analizar_bp.post("/committee/decisions")
+@login_required
+@role_required("comite")
+def committee_decide_batch():
+    """
+    Varias decisiones en una sola transacción (todo o nada).
+    Body JSON, cualquiera de las dos formas (se pueden combinar):
+      { decision: "aprobado"|"rechazado", ids: ["revisados/<uid>/<fname>", ...], expedientes: ["<uid>", ...] }
+      { items: [ {id: "...", decision: "..."} | {expediente: "<uid>", decision: "..."} ] }
+    Un expediente mueve todos los archivos del usuario que están en 'revisados'.
+    Respuesta: { ok, applied, results: [{id|expediente, decision, ok, moved}] }.
+    Si algún item no tiene qué mover no se aplica ninguno (409, applied=false).
+    """
+    data = request.get_json(silent=True) or {}
+    items = list(data.get("items") or [])
+    general = (data.get("decision") or "").lower()
+    items += [{"id": i, "decision": general} for i in data.get("ids") or []]
+    items += [{"expediente": e, "decision": general} for e in data.get("expedientes") or []]
+    if not items:
+        return jsonify({"ok": False, "error": "items vacíos"}), 400
+
+    ops, claves = [], []
+    for it in items:
+        decision = (it.get("decision") or "").lower() if isinstance(it, dict) else ""
+        if decision not in _DESTINO_DECISION:
+            return jsonify({"ok": False, "error": "decision inválida", "item": it}), 400
+        dst = _DESTINO_DECISION[decision]
+        rel_id, exp = it.get("id"), it.get("expediente")
+        if isinstance(rel_id, str) and rel_id.startswith("revisados/"):
+            ops.append({"id": rel_id, "to": dst})
+            claves.append({"id": rel_id, "decision": decision})
+        elif exp is not None and str(exp):
+            ops.append({"user": str(exp), "from": "revisados", "to": dst})
+            claves.append({"expediente": str(exp), "decision": decision})
+        else:
+            return jsonify({"ok": False, "error": "item sin id de 'revisados' ni expediente", "item": it}), 400
+
+    try:
+        resultados, applied = indice.mover_varios(ops), True
+    except indice.NoEncontrado as e:
+        resultados, applied = e.resultados, False
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    results = [dict(c, ok=r["ok"], moved=r["moved"]) for c, r in zip(claves, resultados)]
+    return jsonify({"ok": applied, "applied": applied, "results": results}), (200 if applied else 409)
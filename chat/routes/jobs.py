@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, session
+
+from auth import login_required
+from services import jobs
+
+# ------------------------ Blueprint -------------------------
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/api")
+
+# ------------------ Estado de un trabajo --------------------
+@jobs_bp.get("/jobs/<job_id>")
+@login_required
+def job_status(job_id):
+    """
+    Progreso y resultados por documento de un trabajo OCR/LLM.
+    El usuario solo ve sus trabajos; admin y comité ven todos.
+    """
+    job = jobs.obtener_job(job_id)
+    if not job:
+        return jsonify({"ok": False, "error": "No existe"}), 404
+    user = session.get("user") or {}
+    if user.get("role") not in ("admin", "comite") and job["userId"] != str(user.get("id")):
+        return jsonify({"ok": False, "error": "No existe"}), 404
+    return jsonify({"ok": True, "job": job})
@@ -0,0 +1,21 @@
+import hmac, os
+
+from flask import Blueprint, Response, request
+
+from services import metricas
+
+# ------------------------ Blueprint -------------------------
+metricas_bp = Blueprint("metricas", __name__)
+
+# Si está definido, Prometheus debe enviar "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# -------------------- Exposición /metrics --------------------
+@metricas_bp.get("/metrics")
+def metrics():
+    """Contadores e histogramas por etapa (services/metricas.py) en formato Prometheus."""
+    if METRICS_TOKEN:
+        recibido = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(recibido, f"Bearer {METRICS_TOKEN}"):
+            return Response("no autorizado\n", status=401, mimetype="text/plain")
+    return Response(metricas.texto_prometheus(), mimetype="text/plain; version=0.0.4")
@@ -3,22 +3,13 @@ import os
 from flask import Blueprint, render_template, session, request, redirect, url_for, current_app
 
 from auth import consume_sso_token, login_required, role_required  # asumiendo que ya existen
+from services import jobs, meta_usuarios, subidas
 
 web_bp = Blueprint("web", __name__)
 
-# --- Paths consistentes (no dependen del cwd) ---
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # carpeta del proyecto "chat"
-UPLOAD_ROOT = os.path.join(BASE_DIR, "uploads")
-META_DIR = os.path.join(UPLOAD_ROOT, "meta")
-os.makedirs(META_DIR, exist_ok=True)
-
 def _save_user_meta(user: dict):
-    """Guarda email del usuario en uploads/meta/<id>.txt para que Admin/Comité lo vean."""
-    uid = str(user.get("id"))
-    email = user.get("email") or ""
-    os.makedirs(META_DIR, exist_ok=True)
-    with open(os.path.join(META_DIR, f"{uid}.txt"), "w", encoding="utf-8") as f:
-        f.write(email)
+    """Guarda email del usuario (services/meta_usuarios) para que Admin/Comité lo vean."""
+    meta_usuarios.guardar_email(str(user.get("id")), user.get("email") or "")
 
 @web_bp.get("/auth/consume")
 def auth_consume():
@@ -62,20 +53,17 @@ def index():
 # ---------- Procesa el FORM del usuario (subidas) ----------
 from werkzeug.utils import secure_filename
 
-def _ensure_dir(p): os.makedirs(p, exist_ok=True)
-
 @web_bp.post("/analizar")
 @login_required
 @role_required("user", "admin")
 def analizar_form():
-    """Guarda los archivos subidos por el usuario en uploads/pendientes/<id>/campo__archivo.ext"""
+    """
+    Guarda los archivos subidos por el usuario en uploads/pendientes/<id>/campo__archivo.ext
+    y encola el análisis OCR/LLM; la página consulta el progreso en /api/jobs/<id>.
+    """
     user = session.get("user") or {}
     user_id = str(user.get("id"))
-    email = user.get("email") or ""
 
-    pendientes_dir = os.path.join(UPLOAD_ROOT, "pendientes", user_id)
-    _ensure_dir(pendientes_dir)
-    _ensure_dir(META_DIR)
     _save_user_meta(user)  # asegura meta con email
 
     campos = [
@@ -85,17 +73,27 @@ def analizar_form():
         "antecedentes_policia", "antecedentes_rnmc",
     ]
     guardados = []
+    rechazados = []
+    documentos = {}
     for campo in campos:
         f = request.files.get(campo)
         if f and f.filename:
             fname = f"{campo}__{secure_filename(f.filename)}"
-            f.save(os.path.join(pendientes_dir, fname))
-            guardados.append(fname)
+            try:
+                info = subidas.guardar(f, "pendientes", user_id, fname)
+            except subidas.ArchivoRechazado as e:
+                rechazados.append(str(e))
+                continue
+            guardados.append(info["name"])
+            documentos[campo] = info["path"]
+
+    job_id = jobs.encolar(user_id, documentos) if documentos else None
 
-    # (mock) resultado mínimo para que se renderice el bloque "ultimo"
+    # resultado mínimo para que se renderice el bloque "ultimo" mientras corre el trabajo
     session["ultimo_analisis"] = {
         "usuario_id": user_id,
-        "estado": "pendiente de análisis",
+        "job_id": job_id,
+        "estado": "en cola" if job_id else "pendiente de análisis",
         "completo": False,
         "faltan_documentos": [],
         "resultados": {
@@ -109,4 +107,6 @@ def analizar_form():
     }
 
     session["mensaje_estado"] = f"Se cargaron {len(guardados)} archivo(s) a pendientes."
+    if rechazados:
+        session["mensaje_estado"] += " Rechazados: " + "; ".join(rechazados)
     return redirect(url_for("web.index"))
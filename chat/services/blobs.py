@@ -0,0 +1,72 @@
+import os, shutil
+from typing import Optional
+
+# =========================================================
+# Almacén de contenido por hash: cada archivo se guarda una sola vez en
+#   uploads/blobs/<sha[0:2]>/<sha[2:4]>/<sha>.<ext>
+# (dos niveles de 256 carpetas: ningún directorio crece sin límite).
+# Estado, usuario y campo viven en el índice (services/indice.py).
+# La extensión se conserva porque el OCR decide PDF vs imagen por ella.
+# =========================================================
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # carpeta "chat"
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(BASE_DIR, "uploads", "blobs"))
+
+# Tipos aceptados por contenido (coinciden con utils.EXTENSIONES_PERMITIDAS)
+_MAGIA = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+)
+LARGO_MAGIA = 8
+
+def tipo_por_magia(cabecera: bytes) -> Optional[str]:
+    """'pdf' | 'png' | 'jpg' según los primeros bytes; None si no es un tipo aceptado."""
+    for firma, tipo in _MAGIA:
+        if cabecera.startswith(firma):
+            return tipo
+    return None
+
+def rel_blob(sha256: str, ext: str) -> str:
+    """Ruta relativa a BLOB_DIR (es lo que guarda el índice)."""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{ext}"
+
+def ruta_blob(rel: str) -> str:
+    return os.path.join(BLOB_DIR, *rel.split("/"))
+
+def guardar_desde(tmp: str, sha256: str, ext: str) -> str:
+    """
+    Mueve un temporal ya hasheado a su lugar (os.replace, mismo disco).
+    Si el blob ya existe el temporal se descarta: mismo contenido, mismo archivo.
+    Devuelve la ruta relativa.
+    """
+    rel = rel_blob(sha256, ext)
+    dst = ruta_blob(rel)
+    if os.path.exists(dst):
+        os.remove(tmp)
+        try:
+            os.utime(dst)  # reutilizado ahora: fuera del alcance de indice.recolectar_huerfanos
+        except OSError:
+            pass
+        return rel
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(tmp, dst)
+    return rel
+
+def enlazar_desde(origen: str, sha256: str, ext: str) -> str:
+    """Como guardar_desde pero sin quitar el origen (hard link, o copia si no se puede)."""
+    rel = rel_blob(sha256, ext)
+    dst = ruta_blob(rel)
+    if not os.path.exists(dst):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        try:
+            os.link(origen, dst)
+        except OSError:
+            shutil.copy2(origen, dst)
+    return rel
+
+def eliminar(rel: str) -> None:
+    try:
+        os.remove(ruta_blob(rel))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,242 @@
+import os, json, time, atexit, threading
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from services import metricas
+from services.db import conectar, lectura, transaccion
+from services.utils import hash_sha256
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # carpeta "chat"
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, "uploads", "cache"))
+RUTA_CACHE_OCR = os.path.join(CACHE_DIR, "ocr.sqlite3")
+RUTA_CACHE_LLM = os.path.join(CACHE_DIR, "llm.sqlite3")
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_MB", "256")) * 1024 * 1024
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_HORAS", "720")) * 3600  # 30 días
+# Las lecturas no escriben: 'accedido' (LRU) y aciertos/fallos se acumulan en
+# memoria y se vuelcan en una sola transacción cada VOLCAR_SEG o VOLCAR_CADA consultas.
+VOLCAR_SEG = float(os.getenv("CACHE_VOLCAR_SEG", "5"))
+VOLCAR_CADA = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    tam INTEGER NOT NULL,
+    creado REAL NOT NULL,
+    accedido REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entradas_accedido ON entradas (accedido);
+CREATE TABLE IF NOT EXISTS stats (
+    nombre TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fallas (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    intentos INTEGER NOT NULL,
+    ultimo REAL NOT NULL
+);
+"""
+
+class CacheDisco:
+    """
+    Cache clave -> valor JSON en SQLite, compartida entre procesos.
+    - Acotada por tamaño (max_bytes): al pasarse expulsa lo menos usado (LRU por 'accedido').
+    - ttl (segundos, opcional): una entrada más vieja cuenta como fallo y se borra.
+    - Resultados inválidos (p.ej. JSON no parseable) van a la tabla 'fallas': nunca se
+      sirven, así la siguiente llamada reintenta, pero quedan registrados para diagnóstico.
+    - Contadores de aciertos/fallos persistidos en la tabla 'stats'.
+    - obtener() solo lee; el 'accedido' de los aciertos y los contadores se
+      escriben en lote (ver _volcar), así las consultas no compiten por el
+      lock de escritura de SQLite.
+    """
+
+    def __init__(self, ruta: str, max_bytes: int, ttl: Optional[float] = None):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._lista = False
+        self._accesos: dict = {}    # clave -> último acceso sin volcar
+        self._cuentas: dict = {}    # nombre de contador -> incremento sin volcar
+        self._volcado = time.time()
+        self._atexit = False
+
+    def _init(self) -> None:
+        with self._lock:
+            if self._lista:
+                return
+            conn = conectar(self.ruta)
+            try:
+                conn.executescript(_SCHEMA)
+            finally:
+                conn.close()
+            self._lista = True
+
+    def _contar(self, conn, nombre: str, n: int = 1) -> None:
+        conn.execute(
+            "INSERT INTO stats (nombre, valor) VALUES (?, ?) "
+            "ON CONFLICT(nombre) DO UPDATE SET valor = valor + excluded.valor",
+            (nombre, n),
+        )
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Devuelve el valor guardado o None (y cuenta acierto/fallo)."""
+        self._init()
+        ahora = time.time()
+        with lectura(self.ruta) as conn:
+            fila = conn.execute("SELECT valor, creado FROM entradas WHERE clave = ?", (clave,)).fetchone()
+        if fila is not None and self.ttl is not None and ahora - fila["creado"] > self.ttl:
+            with transaccion(self.ruta) as conn:  # raro: solo al vencer una entrada
+                # 'creado' en el WHERE: si otro proceso ya la reemplazó, esa no se borra
+                if conn.execute("DELETE FROM entradas WHERE clave = ? AND creado = ?",
+                                (clave, fila["creado"])).rowcount:
+                    self._contar(conn, "vencidas")
+            fila = None
+        self._anotar(None if fila is None else clave, ahora)
+        return None if fila is None else json.loads(fila["valor"])
+
+    def _anotar(self, clave: Optional[str], ahora: float) -> None:
+        """Acierto (clave) o fallo (None) pendiente de volcar; vuelca si ya toca."""
+        with self._lock:
+            nombre = "fallos" if clave is None else "aciertos"
+            self._cuentas[nombre] = self._cuentas.get(nombre, 0) + 1
+            if clave is not None:
+                self._accesos[clave] = ahora
+            if not self._atexit:  # lo pendiente al cerrar el proceso no se pierde
+                atexit.register(self._volcar)
+                self._atexit = True
+            toca = sum(self._cuentas.values()) >= VOLCAR_CADA or ahora - self._volcado >= VOLCAR_SEG
+        if toca:
+            self._volcar()
+
+    def _volcar(self, conn=None) -> None:
+        """Escribe los accesos y contadores pendientes (en 'conn' si ya hay una transacción)."""
+        with self._lock:
+            accesos, cuentas = self._accesos, self._cuentas
+            self._accesos, self._cuentas = {}, {}
+            self._volcado = time.time()
+        if not accesos and not cuentas:
+            return
+
+        def escribir(c) -> None:
+            c.executemany(
+                "UPDATE entradas SET accedido = MAX(accedido, ?) WHERE clave = ?",
+                [(t, clave) for clave, t in accesos.items()],
+            )
+            for nombre, n in cuentas.items():
+                self._contar(c, nombre, n)
+
+        if conn is not None:
+            escribir(conn)
+            return
+        try:
+            with transaccion(self.ruta) as c:
+                escribir(c)
+        except Exception as e:  # solo se pierde orden LRU y estadística
+            print("cache volcado error:", e)
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        """Guarda el valor y expulsa entradas LRU si se supera max_bytes."""
+        self._init()
+        texto = json.dumps(valor, ensure_ascii=False)
+        tam = len(texto.encode("utf-8"))
+        ahora = time.time()
+        with transaccion(self.ruta) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entradas (clave, valor, tam, creado, accedido) VALUES (?, ?, ?, ?, ?)",
+                (clave, texto, tam, ahora, ahora),
+            )
+            self._volcar(conn)  # LRU al día antes de elegir qué expulsar
+            total = conn.execute("SELECT COALESCE(SUM(tam), 0) FROM entradas").fetchone()[0]
+            expulsadas = 0
+            while total > self.max_bytes:
+                fila = conn.execute(
+                    "SELECT clave, tam FROM entradas WHERE clave != ? ORDER BY accedido LIMIT 1", (clave,)
+                ).fetchone()
+                if fila is None:
+                    break
+                conn.execute("DELETE FROM entradas WHERE clave = ?", (fila["clave"],))
+                total -= fila["tam"]
+                expulsadas += 1
+            if expulsadas:
+                self._contar(conn, "expulsiones", expulsadas)
+            conn.execute("DELETE FROM fallas WHERE clave = ?", (clave,))
+
+    def registrar_falla(self, clave: str, valor: Any) -> None:
+        """Guarda un resultado inválido aparte (no se sirve como acierto)."""
+        self._init()
+        texto = json.dumps(valor, ensure_ascii=False)
+        with transaccion(self.ruta) as conn:
+            conn.execute(
+                "INSERT INTO fallas (clave, valor, intentos, ultimo) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(clave) DO UPDATE SET valor = excluded.valor, "
+                "intentos = intentos + 1, ultimo = excluded.ultimo",
+                (clave, texto, time.time()),
+            )
+            self._contar(conn, "fallas_registradas")
+
+    def estadisticas(self) -> dict:
+        """Tamaño, límites y contadores (aciertos, fallos, expulsiones, vencidas, fallas)."""
+        self._init()
+        self._volcar()
+        with lectura(self.ruta) as conn:
+            n, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(tam), 0) FROM entradas").fetchone()
+            n_fallas = conn.execute("SELECT COUNT(*) FROM fallas").fetchone()[0]
+            stats = {f["nombre"]: f["valor"] for f in conn.execute("SELECT nombre, valor FROM stats")}
+        consultas = stats.get("aciertos", 0) + stats.get("fallos", 0)
+        return {
+            "entradas": n,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "aciertos": stats.get("aciertos", 0),
+            "fallos": stats.get("fallos", 0),
+            "tasa_aciertos": round(stats.get("aciertos", 0) / consultas, 3) if consultas else None,
+            "expulsiones": stats.get("expulsiones", 0),
+            "vencidas": stats.get("vencidas", 0),
+            "fallas": n_fallas,
+        }
+
+def cache_por_archivo(cache: Optional[CacheDisco], tipo: str, version: str) -> Callable:
+    """
+    Decorador para funciones f(path, ...) cuyo resultado depende solo del contenido
+    del archivo y de los demás argumentos: la clave es '<tipo>:<version>:<sha256>'
+    más ':<arg>' por cada argumento extra (p.ej. el perfil de preprocesado).
+    Cambiar 'version' invalida todo lo anterior (usar al modificar el pipeline OCR
+    o su configuración).
+    Con cache=None el decorador no hace nada.
+    """
+    def deco(fn):
+        if cache is None:
+            return fn
+
+        @wraps(fn)
+        def wrapper(path: str, *args, **kwargs):
+            try:
+                extra = "".join(f":{v}" for v in (*args, *(kwargs[k] for k in sorted(kwargs))) if v is not None)
+                clave = f"{tipo}:{version}:{hash_sha256(path)}{extra}"
+                valor = cache.obtener(clave)
+            except Exception as e:
+                print("cache error:", e)
+                return fn(path, *args, **kwargs)
+            metricas.contar("cache", cache=tipo, resultado="acierto" if valor is not None else "fallo")
+            if valor is not None:
+                return valor
+            valor = fn(path, *args, **kwargs)
+            try:
+                cache.guardar(clave, valor)
+            except Exception as e:
+                print("cache error:", e)
+            return valor
+        return wrapper
+    return deco
+
+def estadisticas_caches() -> dict:
+    """Estadísticas de las caches OCR y LLM (sin importar los módulos que las usan)."""
+    out = {}
+    for nombre, cache in (("ocr", CacheDisco(RUTA_CACHE_OCR, OCR_CACHE_MAX_BYTES)),
+                          ("llm", CacheDisco(RUTA_CACHE_LLM, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL))):
+        out[nombre] = cache.estadisticas() if os.path.exists(cache.ruta) else None
+    return out
@@ -0,0 +1,162 @@
+import os, re
+from typing import Dict, List, Optional, Tuple
+
+from services import metricas
+from services.reglas import TIPOS, _sin_acentos
+
+# =========================================================
+# Selección de contexto para el LLM: en vez de mandar el volcado OCR entero
+# (texto legal, encabezados, pies de página), se puntúa cada línea contra
+# anclas del tipo de documento ("C.C.", "NIT", "APELLIDOS", la frase de
+# "no registra antecedentes"...) y se envían solo las ventanas de líneas
+# alrededor de las mejores anclas, hasta un presupuesto de tokens.
+#
+#   texto, info = seleccionar_contexto("policia", texto_ocr)
+#
+# Si el texto ya cabe en el presupuesto o no aparece ninguna ancla, se envía
+# como antes (los primeros MAX_CHARS_COMPLETO caracteres).
+# Comparar tamaño y aciertos contra el texto completo: python -m bench.bench_contexto
+# =========================================================
+
+CONTEXTO_ACTIVO = os.getenv("LLM_CONTEXTO", "1") != "0"
+MAX_CHARS_COMPLETO = 12000  # lo que se enviaba siempre: texto_ocr[:12000]
+PRESUPUESTO_DEFECTO = int(os.getenv("LLM_CONTEXTO_TOKENS", "500"))
+# Cédula: muchos campos cortos repartidos en anverso, reverso y MRZ
+PRESUPUESTO_POR_TIPO: Dict[str, int] = {"cedula": 900}
+SEPARADOR = "\n[...]\n"
+# Una ventana con solo un número largo (fechas, códigos de verificación) no se envía
+PUNTAJE_MIN = 2
+
+def _desde_env(valor: str) -> Dict[str, int]:
+    """LLM_CONTEXTO_PRESUPUESTOS="cedula=900,rut=400" -> {"cedula": 900, "rut": 400}"""
+    out = {}
+    for par in filter(None, (p.strip() for p in valor.split(","))):
+        tipo, _, n = par.partition("=")
+        out[tipo.strip()] = int(n)
+    return out
+
+PRESUPUESTO_POR_TIPO.update(_desde_env(os.getenv("LLM_CONTEXTO_PRESUPUESTOS", "")))
+
+def presupuesto_para(tipo: str) -> int:
+    return PRESUPUESTO_POR_TIPO.get(tipo, PRESUPUESTO_DEFECTO)
+
+def tokens(texto: str) -> int:
+    """Estimación barata (~4 caracteres por token en español con modelos tipo Mistral)."""
+    return (len(texto) + 3) // 4
+
+# ---- Anclas ----
+# (regex sobre la línea en mayúsculas y sin acentos, peso, líneas antes, líneas después)
+Ancla = Tuple[str, float, int, int]
+
+_IDENTIFICACION: List[Ancla] = [
+    (r"\bC\s?\.?\s?C\b|CEDULA\s+DE\s+CIUDADANIA|IDENTIFICACION|DOCUMENTO\s+DE\s+IDENTIDAD|\bNUIP\b", 3, 0, 1),
+    (r"APELLIDOS|NOMBRES|SENOR|IDENTIFICAD[OA]", 3, 0, 2),
+    (r"\d[\d.,]{5,}\d", 1, 0, 0),  # números largos: cédula, NIT (también fechas y códigos)
+]
+
+def _de_reglas(tipo: str) -> List[Ancla]:
+    """Encabezado del emisor y frases de estado, las mismas que usa services/reglas.py."""
+    cfg = TIPOS[tipo]
+    out: List[Ancla] = [(cfg["encabezado"], 2, 0, 0)]
+    if cfg["booleano"]:
+        _, negativo, positivo = cfg["booleano"]
+        out += [(negativo, 5, 1, 1), (positivo, 5, 1, 2)]
+    return out
+
+ANCLAS: Dict[str, List[Ancla]] = {
+    "rut": _de_reglas("rut") + _IDENTIFICACION + [
+        (r"\bNIT\b|IDENTIFICACION\s+TRIBUTARIA", 4, 0, 1),
+        (r"PRIMER\s+APELLIDO|RAZON\s+SOCIAL", 4, 0, 3),  # los valores van en las líneas siguientes
+    ],
+    "contraloria": _de_reglas("contraloria") + _IDENTIFICACION,
+    "procuraduria": _de_reglas("procuraduria") + _IDENTIFICACION,
+    "policia": _de_reglas("policia") + _IDENTIFICACION,
+    "rnmc": _de_reglas("rnmc") + _IDENTIFICACION,
+    "cedula": _IDENTIFICACION + [
+        (r"REPUBLICA\s+DE\s+COLOMBIA|IDENTIFICACION\s+PERSONAL", 3, 0, 0),
+        (r"FECHA\s+(?:Y\s+LUGAR\s+)?DE\s+(?:NACIMIENTO|EXPEDICION)|LUGAR\s+DE\s+(?:NACIMIENTO|EXPEDICION)", 3, 0, 1),
+        (r"[A-Z0-9<]{5,}<<", 5, 0, 0),  # líneas MRZ
+    ],
+}
+_COMPILADAS = {t: [(re.compile(rx), p, a, d) for rx, p, a, d in anclas] for t, anclas in ANCLAS.items()}
+
+# Confusiones típicas del OCR: en una palabra (más letras que dígitos) 0->O, 1->I...;
+# en un número, al revés. Mismo largo: las posiciones de la línea no cambian.
+_A_LETRA = str.maketrans("0158", "OISB")
+_A_DIGITO = str.maketrans("OISB", "0158")
+
+def _palabra(m: "re.Match") -> str:
+    p = m.group(0)
+    digitos = sum(ch.isdigit() for ch in p)
+    return p.translate(_A_DIGITO if digitos > len(p) - digitos else _A_LETRA)
+
+def _normalizar(linea: str) -> str:
+    return re.sub(r"\S+", _palabra, _sin_acentos(linea.upper()))
+
+def _ventanas(tipo: str, lineas: List[str]) -> List[Tuple[int, int, float]]:
+    """
+    (inicio, fin inclusive, puntaje) por cada ancla encontrada. Cada línea se busca
+    unida a la siguiente (el OCR parte las frases), pero solo cuenta para la línea
+    donde empieza la coincidencia, y con las confusiones O/0, I/1, S/5, B/8 corregidas.
+    """
+    normal = [_normalizar(ln) for ln in lineas]
+    out = []
+    for i, ln in enumerate(normal):
+        unida = ln + " " + normal[i + 1] if i + 1 < len(normal) else ln
+        for rx, peso, antes, despues in _COMPILADAS[tipo]:
+            m = rx.search(unida)
+            if m and m.start() < len(ln):
+                fin = i + max(despues, 1 if m.end() > len(ln) else 0)
+                out.append((max(0, i - antes), min(len(lineas) - 1, fin), peso))
+    return out
+
+def _fusionar(ventanas: List[Tuple[int, int, float]]) -> List[Tuple[int, int, float]]:
+    """Une ventanas que se solapan o se tocan; el puntaje se suma."""
+    out: List[list] = []
+    for ini, fin, p in sorted(ventanas):
+        if out and ini <= out[-1][1] + 1:
+            out[-1][1] = max(out[-1][1], fin)
+            out[-1][2] += p
+        else:
+            out.append([ini, fin, p])
+    return [tuple(v) for v in out]
+
+def seleccionar_contexto(tipo: str, texto_ocr: str, presupuesto: Optional[int] = None) -> Tuple[str, dict]:
+    """
+    (texto a enviar al LLM, info). Con anclas, las ventanas se eligen por puntaje
+    hasta 'presupuesto' tokens y se envían en el orden del documento, separadas por
+    "[...]". info: metodo ("anclas" | "completo" | "sin_anclas"), tokens_original
+    (lo que se enviaba antes), tokens_enviados y ventanas.
+    """
+    completo = (texto_ocr or "")[:MAX_CHARS_COMPLETO]
+    presupuesto = presupuesto or presupuesto_para(tipo)
+    info = {"metodo": "completo", "tokens_original": tokens(completo),
+            "tokens_enviados": tokens(completo), "ventanas": 0}
+    if not CONTEXTO_ACTIVO or tipo not in ANCLAS or tokens(completo) <= presupuesto:
+        return _registrar(tipo, completo, info)
+
+    lineas = (texto_ocr or "").splitlines()
+    ventanas = [v for v in _fusionar(_ventanas(tipo, lineas)) if v[2] >= PUNTAJE_MIN]
+    if not ventanas:
+        info["metodo"] = "sin_anclas"
+        return _registrar(tipo, completo, info)
+
+    texto_de = lambda v: "\n".join(lineas[v[0]:v[1] + 1])
+    elegidas, usados = [], 0
+    # Mejores ventanas primero; a igual puntaje, la más corta
+    for v in sorted(ventanas, key=lambda v: (-v[2], v[1] - v[0])):
+        costo = tokens(texto_de(v) + SEPARADOR)
+        if usados + costo <= presupuesto:
+            elegidas.append(v)
+            usados += costo
+    if not elegidas:  # ni la mejor ventana cabe: se recorta esa
+        elegidas = [max(ventanas, key=lambda v: v[2])]
+
+    texto = SEPARADOR.join(texto_de(v) for v in sorted(elegidas))[:presupuesto * 4]
+    info.update(metodo="anclas", tokens_enviados=tokens(texto), ventanas=len(elegidas))
+    return _registrar(tipo, texto, info)
+
+def _registrar(tipo: str, texto: str, info: dict) -> Tuple[str, dict]:
+    metricas.contar("llm_contexto_tokens", info["tokens_original"], tipo=tipo, texto="original")
+    metricas.contar("llm_contexto_tokens", info["tokens_enviados"], tipo=tipo, texto="enviado")
+    return texto, info
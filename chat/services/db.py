@@ -0,0 +1,43 @@
+import os, sqlite3
+from contextlib import contextmanager
+
+def conectar(ruta: str) -> sqlite3.Connection:
+    """
+    Abre una conexión SQLite lista para usarse desde varios hilos/procesos.
+    - WAL: los lectores no bloquean al escritor.
+    - timeout: si otro proceso tiene el lock, espera en vez de fallar.
+    - autocommit: las transacciones se abren explícitamente con `transaccion()`.
+    """
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+@contextmanager
+def lectura(ruta: str):
+    """Conexión de solo lectura que se cierra al salir del bloque."""
+    conn = conectar(ruta)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@contextmanager
+def transaccion(ruta: str):
+    """
+    Transacción de escritura (BEGIN IMMEDIATE): todo o nada.
+    Si el bloque lanza excepción se hace ROLLBACK y se propaga.
+    """
+    conn = conectar(ruta)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
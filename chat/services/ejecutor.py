@@ -0,0 +1,106 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from services import metricas
+
+# =========================================================
+# Ejecución concurrente dentro de un proceso worker: documentos de un
+# expediente y páginas de un documento. Hilos (no procesos): OpenCV, Torch
+# y Tesseract (tesserocr) sueltan el GIL, y todos los hilos alimentan el
+# mismo loteador de EasyOCR (services/ocr_lotes.py) y el mismo modelo.
+#
+# Dos pools acotados por proceso. Un documento espera a sus páginas, así que
+# las páginas no pueden compartir pool con los documentos (se bloquearía con
+# todos los hilos esperando páginas que no tienen hilo).
+# Los resultados siempre vuelven en el orden de entrada.
+# =========================================================
+
+def _cpu_por_worker() -> int:
+    workers = max(1, int(os.getenv("JOBS_WORKERS", "2")))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+# Los documentos pasan buena parte del tiempo esperando (LLM, loteador): más hilos que CPUs.
+# 9 = campos de un expediente.
+HILOS_DOCUMENTOS = int(os.getenv("EJECUTOR_DOCUMENTOS", str(min(9, max(2, 2 * _cpu_por_worker())))))
+HILOS_PAGINAS = int(os.getenv("EJECUTOR_PAGINAS", str(min(4, max(2, _cpu_por_worker())))))
+
+_lock = threading.Lock()
+_pools: Dict[str, ThreadPoolExecutor] = {}
+
+# PyMuPDF no es thread-safe: todo acceso a fitz en el proceso (OCR y vistas
+# previas) va serializado con este lock. Vive aquí y no en ocr_ai para que el
+# proceso Flask pueda usarlo sin importar OpenCV/Tesseract.
+FITZ_LOCK = threading.Lock()
+
+def _pool(nombre: str, hilos: int) -> ThreadPoolExecutor:
+    with _lock:
+        if nombre not in _pools:
+            _pools[nombre] = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix=f"ejecutor-{nombre}")
+        return _pools[nombre]
+
+def _en_orden(nombre: str, hilos: int, fn: Callable, items: Iterable,
+              hasta: Optional[Callable] = None) -> List:
+    items = list(items)
+    if len(items) <= 1 or hilos <= 1:
+        out = []
+        for it in items:
+            out.append(fn(it))
+            if hasta is not None and hasta(out[-1]):
+                break
+        return out
+
+    # Cada hilo corre con una copia del contexto: los spans van a la traza del llamador
+    futs = [_pool(nombre, hilos).submit(metricas.en_contexto(fn), it) for it in items]
+    out = []
+    try:
+        for fut in futs:
+            out.append(fut.result())
+            if hasta is not None and hasta(out[-1]):
+                break
+    finally:
+        for fut in futs[len(out):]:
+            fut.cancel()  # las que aún no empezaron; las que corren terminan solas
+    return out
+
+def paginas(fn: Callable, items: Iterable, hasta: Optional[Callable] = None) -> List:
+    """
+    [fn(item) for item in items] en el pool de páginas, en el mismo orden.
+    Con 'hasta', se detiene en el primer resultado (en orden) que lo cumpla:
+    lo incluye, y las páginas siguientes que no habían empezado se cancelan.
+    """
+    return _en_orden("paginas", HILOS_PAGINAS, fn, items, hasta)
+
+def procesar_expediente(documentos: Dict[str, str],
+                        al_terminar: Optional[Callable[[str, Optional[dict], Optional[str]], None]] = None,
+                        procesar: Optional[Callable[[str, str], dict]] = None) -> Dict[str, dict]:
+    """
+    Procesa todos los documentos ({campo: ruta}) a la vez en el pool de documentos.
+    al_terminar(campo, resultado, error) se llama apenas termina cada uno (progreso).
+    Devuelve {campo: {"resultado", "error"}} en el orden de 'documentos'; un documento
+    que falla no detiene a los demás. Cada resultado lleva su traza en "traza"
+    (spans por etapa, ver services/metricas.py).
+    """
+    if procesar is None:
+        from services.pipeline import procesar_documento as procesar  # carga OCR/LLM solo aquí
+
+    def _uno(par):
+        campo, ruta = par
+        with metricas.traza() as spans:
+            try:
+                with metricas.span("documento", campo=campo):
+                    resultado, error = procesar(campo, ruta), None
+            except Exception as e:
+                resultado, error = None, f"{type(e).__name__}: {e}"
+        if isinstance(resultado, dict) and spans:
+            resultado["traza"] = spans
+        metricas.contar("documentos", campo=campo, estado="error" if error else "ok")
+        if al_terminar is not None:
+            try:
+                al_terminar(campo, resultado, error)
+            except Exception as e:
+                print("ejecutor al_terminar error:", e)
+        return {"resultado": resultado, "error": error}
+
+    salida = _en_orden("documentos", HILOS_DOCUMENTOS, _uno, documentos.items())
+    return dict(zip(documentos, salida))
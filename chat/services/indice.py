@@ -0,0 +1,575 @@
+import os, re, json, base64, time, threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services import blobs
+from services.db import conectar, lectura, transaccion
+from services.utils import hash_sha256
+
+# =========================================================
+# Índice SQLite de archivos subidos: una fila por archivo lógico
+# (estado, usuario, nombre 'campo__archivo') que apunta a un blob por hash
+# (services/blobs.py). El estado es solo metadato: pasar de 'pendientes' a
+# 'revisados' es un UPDATE, y un lote de cambios va en una única transacción.
+# El layout viejo uploads/<estado>/<userId>/<archivo> se migra solo.
+# =========================================================
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # carpeta "chat"
+UPLOAD_ROOT = os.path.join(BASE_DIR, "uploads")
+STATES = ("pendientes", "revisados", "validados")
+DB_PATH = os.getenv("INDICE_DB", os.path.join(UPLOAD_ROOT, "indice.sqlite3"))
+# Un blob sin fila más nuevo que esto puede ser una subida en curso (blob escrito,
+# fila aún no registrada): la recolección de huérfanos no lo toca.
+BLOBS_GRACIA_SEG = float(os.getenv("BLOBS_GRACIA_SEG", str(6 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    state TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    field TEXT,
+    original_name TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    blob TEXT,
+    PRIMARY KEY (state, user_id, name)
+);
+CREATE INDEX IF NOT EXISTS archivos_user ON archivos (user_id, state);
+CREATE INDEX IF NOT EXISTS archivos_state_mtime ON archivos (state, mtime);
+CREATE INDEX IF NOT EXISTS archivos_user_sha ON archivos (user_id, sha256);
+CREATE INDEX IF NOT EXISTS archivos_sha ON archivos (sha256);
+CREATE TABLE IF NOT EXISTS indice_meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+# -------------------- Nombres y tipos de doc ----------------
+HEX_RE = re.compile(r"^[0-9a-f]{16,}$", re.IGNORECASE)
+
+def clean_original_name(fname: str) -> str:
+    """
+    Si el archivo viene como '<hash>_NombreOriginal.pdf', devuelve 'NombreOriginal.pdf'.
+    Si ya viene como 'campo__Nombre.pdf' lo deja igual.
+    """
+    # Mantén primero el formato 'campo__archivo'
+    if "__" in fname:
+        return fname.split("__", 1)[1] if fname.count("__") >= 1 else fname
+
+    parts = fname.split("_", 1)
+    if len(parts) == 2 and HEX_RE.match(parts[0]):
+        return parts[1]
+    return fname
+
+def infer_doc_type(name: str) -> str:
+    n = name.lower()
+    if "rut" in n: return "RUT"
+    if "cámara" in n or "camara" in n: return "Cámara de Comercio"
+    if "cédula" in n or "cedula" in n or "nuip" in n: return "Cédula"
+    if "contralor" in n: return "Contraloría"
+    if "procuradur" in n: return "Procuraduría"
+    if "polic" in n: return "Policía"
+    if "rnmc" in n: return "RNMC"
+    if "intenci" in n: return "Carta de Intención"
+    if "estatuto" in n or "aceptaci" in n: return "Carta de Aceptación"
+    return "Documento"
+
+def parse_field_from_name(fname: str) -> Optional[str]:
+    """Extrae el 'campo' si el nombre es 'campo__archivo'. Si no, intenta inferir."""
+    if "__" in fname:
+        return fname.split("__", 1)[0]
+    t = infer_doc_type(fname).lower()
+    mapa = {
+        "rut": "rut",
+        "cámara de comercio": "camara_comercio",
+        "cédula": "cedula",
+        "contraloría": "antecedentes_contraloria",
+        "procuraduría": "antecedentes_procuraduria",
+        "policía": "antecedentes_policia",
+        "rnmc": "antecedentes_rnmc",
+        "carta de intención": "carta_intencion",
+        "carta de aceptación": "carta_aceptacion",
+    }
+    return mapa.get(t)
+
+# -------------------- Esquema / rutas -----------------------
+_lock = threading.Lock()
+_listo = False
+
+class NoEncontrado(LookupError):
+    """Algún id de un lote no existe: el lote completo se descarta."""
+    def __init__(self, faltantes: List[str]):
+        super().__init__(", ".join(faltantes))
+        self.faltantes = faltantes
+
+def _init() -> None:
+    """
+    Crea/actualiza el esquema; la primera vez migra el layout por carpetas.
+    Los demás hilos esperan en el lock hasta que la migración termina. La limpieza
+    de blobs huérfanos no corre aquí: solo con python -m services.indice.
+    """
+    global _listo
+    if _listo:
+        return
+    with _lock:
+        if _listo:
+            return
+        conn = conectar(DB_PATH)
+        try:
+            conn.executescript(_SCHEMA)
+            columnas = {r["name"] for r in conn.execute("PRAGMA table_info(archivos)")}
+            if "blob" not in columnas:  # índice creado antes del almacén por hash
+                conn.execute("ALTER TABLE archivos ADD COLUMN blob TEXT")
+            hecho = conn.execute("SELECT valor FROM indice_meta WHERE clave = 'blobs_migrado'").fetchone()
+        finally:
+            conn.close()
+        if not hecho:
+            _migrar_carpetas()
+        _listo = True
+
+_INSERT = (
+    "INSERT OR REPLACE INTO archivos "
+    "(state, user_id, name, field, original_name, doc_type, size, sha256, mtime, blob) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def _fila(state: str, user_id: str, name: str, sha256: str, size: int, blob: str, mtime: float) -> tuple:
+    original = clean_original_name(name)
+    return (
+        state, str(user_id), name, parse_field_from_name(name), original, infer_doc_type(original),
+        size, sha256, mtime, blob,
+    )
+
+def _subir_generacion(conn) -> None:
+    """Cada escritura cambia la generación: sirve de ETag barato para los listados."""
+    conn.execute(
+        "INSERT INTO indice_meta (clave, valor) VALUES ('generacion', '1') "
+        "ON CONFLICT(clave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+    )
+
+def _partir_id(rel_id: str) -> Tuple[str, str, str]:
+    """'estado/userId/archivo' -> (estado, userId, archivo)."""
+    parts = rel_id.split("/")
+    if len(parts) < 3:
+        raise ValueError(f"id inválido: {rel_id}")
+    return parts[0], parts[1], "/".join(parts[2:])
+
+def obtener(state: str, user_id: str, name: str) -> Optional[Dict]:
+    """Fila del índice (con 'path' = ruta del blob en disco), o None."""
+    _init()
+    with lectura(DB_PATH) as conn:
+        fila = conn.execute(
+            "SELECT * FROM archivos WHERE state = ? AND user_id = ? AND name = ?",
+            (state, str(user_id), name),
+        ).fetchone()
+    if fila is None or not fila["blob"]:
+        return None
+    return dict(fila, path=blobs.ruta_blob(fila["blob"]))
+
+# -------------------- Escrituras ----------------------------
+def registrar(state: str, user_id: str, name: str, sha256: str, size: int, blob: str) -> None:
+    """
+    Indexa un archivo cuyo contenido ya está en el almacén de blobs. Si reemplaza
+    a un archivo del mismo nombre con otro contenido, el blob viejo se borra tras
+    el COMMIT cuando ninguna otra fila lo usa.
+    """
+    _init()
+    with transaccion(DB_PATH) as conn:
+        previo = conn.execute(
+            "SELECT blob FROM archivos WHERE state = ? AND user_id = ? AND name = ?",
+            (state, str(user_id), name),
+        ).fetchone()
+        conn.execute(_INSERT, _fila(state, user_id, name, sha256, size, blob, time.time()))
+        _subir_generacion(conn)
+        huerfanos = _huerfanos(conn, [previo["blob"]] if previo else [])
+    _borrar_blobs(huerfanos)
+
+def _blob_huerfano(conn, blob: str) -> bool:
+    return conn.execute("SELECT 1 FROM archivos WHERE blob = ? LIMIT 1", (blob,)).fetchone() is None
+
+def _huerfanos(conn, candidatos: Iterable[Optional[str]]) -> List[str]:
+    """De los blobs de filas recién borradas, los que ya no usa ninguna fila."""
+    return [b for b in set(filter(None, candidatos)) if _blob_huerfano(conn, b)]
+
+def _borrar_blobs(rels: Iterable[str]) -> None:
+    # Después del COMMIT: un blob sin fila es inofensivo, una fila sin blob no
+    for rel in rels:
+        blobs.eliminar(rel)
+
+def _mover_en(conn, state: str, user_id: str, name: str, dst_state: str,
+              reemplazados: Optional[List[str]] = None) -> bool:
+    """
+    Cambia el estado de una fila. Un archivo con el mismo nombre en el destino queda
+    reemplazado (como el move de antes); su blob se agrega a 'reemplazados' para
+    borrarlo tras el COMMIT si ninguna otra fila lo usa.
+    """
+    if state == dst_state:
+        return conn.execute(
+            "SELECT 1 FROM archivos WHERE state = ? AND user_id = ? AND name = ?",
+            (state, str(user_id), name),
+        ).fetchone() is not None
+    existe = conn.execute(
+        "SELECT 1 FROM archivos WHERE state = ? AND user_id = ? AND name = ?", (state, str(user_id), name),
+    ).fetchone()
+    if existe is None:
+        return False
+    previa = conn.execute(
+        "SELECT blob FROM archivos WHERE state = ? AND user_id = ? AND name = ?", (dst_state, str(user_id), name),
+    ).fetchone()
+    if previa is not None:
+        conn.execute(
+            "DELETE FROM archivos WHERE state = ? AND user_id = ? AND name = ?", (dst_state, str(user_id), name),
+        )
+    conn.execute(
+        "UPDATE archivos SET state = ? WHERE state = ? AND user_id = ? AND name = ?",
+        (dst_state, state, str(user_id), name),
+    )
+    if previa is not None and reemplazados is not None:
+        reemplazados.append(previa["blob"])
+    return True
+
+def mover(state: str, user_id: str, name: str, dst_state: str) -> bool:
+    """Cambia el estado de un archivo: un UPDATE, el blob no se toca."""
+    _init()
+    reemplazados: List[str] = []
+    with transaccion(DB_PATH) as conn:
+        ok = _mover_en(conn, state, user_id, name, dst_state, reemplazados)
+        if ok:
+            _subir_generacion(conn)
+        huerfanos = _huerfanos(conn, reemplazados)
+    _borrar_blobs(huerfanos)
+    return ok
+
+def mover_lote(rel_ids: Iterable[str], dst_state: str) -> int:
+    """
+    Cambia el estado de varios 'estado/userId/archivo' en una transacción.
+    Todo o nada: si alguno no existe lanza NoEncontrado y no se mueve ninguno.
+    """
+    return len(mover_varios([{"id": i, "to": dst_state} for i in rel_ids]))
+
+def mover_varios(operaciones: List[Dict]) -> List[Dict]:
+    """
+    Aplica varias transiciones en una transacción. Cada operación es
+      {"id": "estado/userId/archivo", "to": destino}   (un archivo) o
+      {"user": userId, "from": origen, "to": destino}  (todo el expediente en 'origen').
+    Devuelve una copia de cada operación con "ok" y "moved" (archivos movidos).
+    Todo o nada: si alguna no encuentra archivos lanza NoEncontrado (con los
+    resultados en .resultados) y la transacción se revierte.
+    """
+    _init()
+    resultados, reemplazados = [], []
+    with transaccion(DB_PATH) as conn:
+        for op in operaciones:
+            if "id" in op:
+                n = int(_mover_en(conn, *_partir_id(op["id"]), op["to"], reemplazados))
+            else:
+                nombres = [r["name"] for r in conn.execute(
+                    "SELECT name FROM archivos WHERE state = ? AND user_id = ?", (op["from"], str(op["user"]))
+                )]
+                n = sum(_mover_en(conn, op["from"], op["user"], nombre, op["to"], reemplazados)
+                        for nombre in nombres)
+            resultados.append(dict(op, ok=n > 0, moved=n))
+        fallidas = [r for r in resultados if not r["ok"]]
+        if fallidas:
+            err = NoEncontrado([r.get("id") or f"{r['from']}/{r['user']}" for r in fallidas])
+            err.resultados = resultados
+            raise err  # transaccion() hace ROLLBACK
+        if resultados:
+            _subir_generacion(conn)
+        huerfanos = _huerfanos(conn, reemplazados)
+    _borrar_blobs(huerfanos)
+    return resultados
+
+def mover_usuario(user_id: str, state: str, dst_state: str) -> int:
+    """Todos los archivos de un usuario de un estado a otro (un UPDATE)."""
+    _init()
+    if state == dst_state:
+        return 0
+    with transaccion(DB_PATH) as conn:
+        donde = ("WHERE state = ? AND user_id = ? AND name IN "
+                 "(SELECT name FROM archivos WHERE state = ? AND user_id = ?)")
+        args = (dst_state, str(user_id), state, str(user_id))
+        reemplazados = [r["blob"] for r in conn.execute(f"SELECT blob FROM archivos {donde}", args)]
+        conn.execute(f"DELETE FROM archivos {donde}", args)
+        n = conn.execute(
+            "UPDATE archivos SET state = ? WHERE state = ? AND user_id = ?",
+            (dst_state, state, str(user_id)),
+        ).rowcount
+        if n:
+            _subir_generacion(conn)
+        huerfanos = _huerfanos(conn, reemplazados)
+    _borrar_blobs(huerfanos)
+    return n
+
+def eliminar(state: str, user_id: str, name: str) -> bool:
+    """Quita el archivo del índice; el blob se borra si nadie más lo usa."""
+    _init()
+    with transaccion(DB_PATH) as conn:
+        fila = conn.execute(
+            "SELECT blob FROM archivos WHERE state = ? AND user_id = ? AND name = ?",
+            (state, str(user_id), name),
+        ).fetchone()
+        if fila is None:
+            return False
+        conn.execute(
+            "DELETE FROM archivos WHERE state = ? AND user_id = ? AND name = ?",
+            (state, str(user_id), name),
+        )
+        _subir_generacion(conn)
+        huerfanos = _huerfanos(conn, [fila["blob"]])
+    _borrar_blobs(huerfanos)
+    return True
+
+def _migrar_carpetas() -> int:
+    """
+    Importa uploads/<estado>/<userId>/<archivo> (layout viejo) al almacén de blobs.
+    Primero enlaza cada archivo en su blob, luego confirma el índice y recién
+    entonces borra el original: si algo falla a mitad se puede reintentar.
+    """
+    conn = conectar(DB_PATH)
+    try:
+        previas = {
+            (r["state"], r["user_id"], r["name"]): (r["size"], r["sha256"])
+            for r in conn.execute("SELECT state, user_id, name, size, sha256 FROM archivos")
+        }
+    finally:
+        conn.close()
+
+    filas, originales = [], []
+    for state in STATES:
+        base = os.path.join(UPLOAD_ROOT, state)
+        if not os.path.isdir(base):
+            continue
+        for user_id in os.listdir(base):
+            udir = os.path.join(base, user_id)
+            if not os.path.isdir(udir):
+                continue
+            for name in os.listdir(udir):
+                path = os.path.join(udir, name)
+                if not os.path.isfile(path):
+                    continue
+                st = os.stat(path)
+                prev = previas.get((state, user_id, name))
+                sha = prev[1] if prev and prev[0] == st.st_size else hash_sha256(path)
+                with open(path, "rb") as f:
+                    ext = blobs.tipo_por_magia(f.read(blobs.LARGO_MAGIA))
+                ext = ext or (name.rsplit(".", 1)[-1].lower() if "." in name else "bin")
+                rel = blobs.enlazar_desde(path, sha, ext)
+                filas.append(_fila(state, user_id, name, sha, st.st_size, rel, st.st_mtime))
+                originales.append(path)
+
+    with transaccion(DB_PATH) as conn:
+        conn.executemany(_INSERT, filas)
+        conn.execute("INSERT OR REPLACE INTO indice_meta (clave, valor) VALUES ('blobs_migrado', ?)",
+                     (str(time.time()),))
+        _subir_generacion(conn)
+
+    for path in originales:
+        os.remove(path)
+    for state in STATES:  # carpetas vacías del layout viejo
+        base = os.path.join(UPLOAD_ROOT, state)
+        if os.path.isdir(base):
+            for user_id in os.listdir(base):
+                try:
+                    os.rmdir(os.path.join(base, user_id))
+                except OSError:
+                    pass
+    return len(filas)
+
+def recolectar_huerfanos(gracia_seg: float = BLOBS_GRACIA_SEG) -> int:
+    """
+    Borra blobs que ninguna fila referencia y que no se tocaron en 'gracia_seg'
+    (services/subidas.py escribe el blob antes de registrar la fila, y
+    blobs.guardar_desde renueva el mtime al reutilizar uno existente). Cada blob se
+    vuelve a comprobar contra el índice y se borra con el lock de escritura tomado,
+    así ningún registrar() puede apuntarlo entre la comprobación y el borrado.
+    """
+    if not os.path.isdir(blobs.BLOB_DIR):
+        return 0
+    limite = time.time() - gracia_seg
+    candidatos = []
+    for raiz, _, archivos in os.walk(blobs.BLOB_DIR):
+        for fn in archivos:
+            path = os.path.join(raiz, fn)
+            try:
+                if os.path.getmtime(path) < limite:
+                    candidatos.append(os.path.relpath(path, blobs.BLOB_DIR).replace(os.sep, "/"))
+            except OSError:
+                pass
+    borrados = 0
+    for rel in candidatos:
+        with transaccion(DB_PATH) as conn:
+            try:
+                viejo = os.path.getmtime(blobs.ruta_blob(rel)) < limite
+            except OSError:
+                continue
+            if viejo and _blob_huerfano(conn, rel):
+                blobs.eliminar(rel)
+                borrados += 1
+    return borrados
+
+def reconstruir() -> Dict[str, int]:
+    """
+    Mantenimiento del índice (solo con python -m services.indice):
+    - migra archivos que aparezcan en el layout viejo por carpetas,
+    - quita filas cuyo blob ya no existe,
+    - borra blobs que ninguna fila referencia (ver recolectar_huerfanos).
+    """
+    conn = conectar(DB_PATH)
+    try:
+        conn.executescript(_SCHEMA)
+    finally:
+        conn.close()
+    migrados = _migrar_carpetas()
+
+    with lectura(DB_PATH) as conn:
+        referenciados = {r[0] for r in conn.execute("SELECT DISTINCT blob FROM archivos WHERE blob IS NOT NULL")}
+    sin_blob = [b for b in referenciados if not os.path.exists(blobs.ruta_blob(b))]
+    with transaccion(DB_PATH) as conn:
+        # filas del layout viejo cuyo archivo ya no estaba, y filas cuyo blob desapareció
+        n_sin_blob = conn.execute("DELETE FROM archivos WHERE blob IS NULL").rowcount
+        for b in sin_blob:
+            n_sin_blob += conn.execute("DELETE FROM archivos WHERE blob = ?", (b,)).rowcount
+        if n_sin_blob:
+            _subir_generacion(conn)
+
+    return {"migrados": migrados, "filas_sin_blob": n_sin_blob, "blobs_huerfanos": recolectar_huerfanos()}
+
+# -------------------- Consultas -----------------------------
+# Órdenes estables: la clave primaria desempata, así el cursor nunca salta ni repite filas.
+ORDENES = {
+    "usuario": (("user_id", "ASC"), ("state", "ASC"), ("name", "ASC")),
+    "reciente": (("mtime", "DESC"), ("user_id", "ASC"), ("state", "ASC"), ("name", "ASC")),
+    "tipo": (("doc_type", "ASC"), ("user_id", "ASC"), ("state", "ASC"), ("name", "ASC")),
+}
+
+class CursorInvalido(ValueError):
+    pass
+
+def _codificar_cursor(orden: str, valores: list) -> str:
+    crudo = json.dumps([orden] + valores, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decodificar_cursor(orden: str, cursor: str) -> list:
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(crudo)
+    except Exception:
+        raise CursorInvalido("cursor inválido")
+    if not isinstance(valores, list) or len(valores) != len(ORDENES[orden]) + 1 or valores[0] != orden:
+        raise CursorInvalido("cursor no corresponde al orden pedido")
+    return valores[1:]
+
+def _despues_de(columnas, valores) -> Tuple[str, list]:
+    """
+    Condición keyset 'fila > cursor' respetando ASC/DESC por columna:
+    (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    """
+    partes, args = [], []
+    for i, (col, sentido) in enumerate(columnas):
+        iguales = [f"{c} = ?" for c, _ in columnas[:i]]
+        op = "<" if sentido == "DESC" else ">"
+        partes.append("(" + " AND ".join(iguales + [f"{col} {op} ?"]) + ")")
+        args.extend(valores[:i] + [valores[i]])
+    return "(" + " OR ".join(partes) + ")", args
+
+def consultar(
+    states: Optional[Iterable[str]] = None,
+    user_id: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    field: Optional[str] = None,
+    orden: str = "usuario",
+    cursor: Optional[str] = None,
+    limite: Optional[int] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Listado filtrado con paginación por cursor (keyset, sin OFFSET).
+    Devuelve (filas, cursor_siguiente); cursor_siguiente es None en la última página.
+    """
+    _init()
+    if orden not in ORDENES:
+        raise ValueError(f"orden inválido: {orden}")
+    columnas = ORDENES[orden]
+    conds, args = [], []
+    if states:
+        states = list(states)
+        conds.append(f"state IN ({', '.join('?' * len(states))})")
+        args.extend(states)
+    if user_id is not None:
+        conds.append("user_id = ?")
+        args.append(str(user_id))
+    if doc_type:
+        conds.append("doc_type = ?")
+        args.append(doc_type)
+    if field:
+        conds.append("field = ?")
+        args.append(field)
+    if cursor:
+        cond, extra = _despues_de(columnas, _decodificar_cursor(orden, cursor))
+        conds.append(cond)
+        args.extend(extra)
+
+    sql = "SELECT * FROM archivos"
+    if conds:
+        sql += " WHERE " + " AND ".join(conds)
+    sql += " ORDER BY " + ", ".join(f"{c} {s}" for c, s in columnas)
+    if limite is not None:
+        sql += " LIMIT ?"
+        args.append(limite + 1)  # una fila de más para saber si hay otra página
+    with lectura(DB_PATH) as conn:
+        filas = [dict(r) for r in conn.execute(sql, args)]
+
+    siguiente = None
+    if limite is not None and len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = _codificar_cursor(orden, [filas[-1][c] for c, _ in columnas])
+    return filas, siguiente
+
+def listar(state: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict]:
+    """Filas del índice filtradas por estado y/o usuario (orden estable, sin paginar)."""
+    return consultar(states=[state] if state else None, user_id=user_id)[0]
+
+def buscar_por_hash(user_id: str, sha256: str, state: Optional[str] = None,
+                    campo: Optional[str] = None) -> Optional[Dict]:
+    """
+    Un archivo del usuario con ese contenido (para deduplicar subidas), o None.
+    Con state/campo, solo uno en ese estado y de ese campo (columna field).
+    """
+    _init()
+    sql, args = "SELECT * FROM archivos WHERE user_id = ? AND sha256 = ?", [str(user_id), sha256]
+    if state:
+        sql += " AND state = ?"
+        args.append(state)
+    if campo:
+        sql += " AND field = ? AND blob IS NOT NULL"
+        args.append(campo)
+    with lectura(DB_PATH) as conn:
+        fila = conn.execute(sql + " ORDER BY mtime DESC LIMIT 1", args).fetchone()
+    return dict(fila) if fila else None
+
+def ruta_por_hash(sha256: str) -> Optional[str]:
+    """Ruta del blob con ese contenido si algún archivo indexado lo usa, o None."""
+    _init()
+    with lectura(DB_PATH) as conn:
+        fila = conn.execute(
+            "SELECT blob FROM archivos WHERE sha256 = ? AND blob IS NOT NULL LIMIT 1", (sha256,)
+        ).fetchone()
+    return blobs.ruta_blob(fila["blob"]) if fila else None
+
+def generacion() -> int:
+    """Contador que cambia con cada escritura del índice."""
+    _init()
+    with lectura(DB_PATH) as conn:
+        fila = conn.execute("SELECT valor FROM indice_meta WHERE clave = 'generacion'").fetchone()
+    return int(fila[0]) if fila else 0
+
+def usuarios() -> List[str]:
+    """IDs de usuarios con al menos un archivo indexado."""
+    _init()
+    with lectura(DB_PATH) as conn:
+        return [r[0] for r in conn.execute("SELECT DISTINCT user_id FROM archivos")]
+
+if __name__ == "__main__":
+    # python -m services.indice  -> migra/verifica índice y blobs
+    print(reconstruir())
@@ -0,0 +1,431 @@
+import os, json, time, uuid, atexit, socket, threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from services import metricas
+from services.db import conectar, lectura, transaccion
+from services.verificacion import verificar_consistencia
+
+# -------------------- Configuración -------------------------
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # carpeta "chat"
+DB_PATH = os.getenv("JOBS_DB", os.path.join(BASE_DIR, "uploads", "jobs.sqlite3"))
+MAX_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))   # procesos OCR/LLM en paralelo (un expediente cada uno)
+POLL_SEG = float(os.getenv("JOBS_POLL_SEG", "2"))   # respaldo si nadie despierta al despachador
+# Veces que un documento puede tumbar el worker (o quedar a medias por un reinicio) antes de darlo por fallido
+MAX_INTENTOS = int(os.getenv("JOBS_MAX_INTENTOS", "2"))
+# Un solo despachador por base de datos: lo es quien tiene el lease (fila única en
+# 'despachador'), que se renueva en cada vuelta y vence si el proceso muere o se cuelga.
+LEASE_SEG = float(os.getenv("JOBS_LEASE_SEG", "30"))
+# Identidad de este proceso como despachador (y dueño de los documentos que reclama)
+_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Estados de un documento/trabajo
+EN_COLA, PROCESANDO, COMPLETADO, ERROR = "en_cola", "procesando", "completado", "error"
+# Solo trabajos: terminó, pero algún documento (no todos) falló
+PARCIAL = "parcial"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    consistencia TEXT
+);
+CREATE TABLE IF NOT EXISTS job_docs (
+    job_id TEXT NOT NULL,
+    campo TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    resultado TEXT,
+    error TEXT,
+    inicio REAL,
+    fin REAL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    dueno TEXT,
+    PRIMARY KEY (job_id, campo)
+);
+CREATE TABLE IF NOT EXISTS despachador (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    dueno TEXT NOT NULL,
+    vence REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_docs_estado ON job_docs (estado);
+CREATE INDEX IF NOT EXISTS job_docs_ruta ON job_docs (ruta, campo);
+"""
+
+_lock = threading.Lock()
+_despertar = threading.Event()
+_hilo: Optional[threading.Thread] = None
+_pool: Optional[ProcessPoolExecutor] = None
+_en_vuelo = 0
+_db_lista = False
+
+# Columnas agregadas después de crear la tabla (bases viejas)
+_COLUMNAS_NUEVAS = {"intentos": "INTEGER NOT NULL DEFAULT 0", "dueno": "TEXT"}
+
+def _init_db() -> None:
+    global _db_lista
+    with _lock:
+        if _db_lista:
+            return
+        conn = conectar(DB_PATH)
+        try:
+            conn.executescript(_SCHEMA)
+            columnas = {f[1] for f in conn.execute("PRAGMA table_info(job_docs)")}
+            for nombre, tipo in _COLUMNAS_NUEVAS.items():
+                if nombre not in columnas:
+                    conn.execute(f"ALTER TABLE job_docs ADD COLUMN {nombre} {tipo}")
+            conn.commit()
+        finally:
+            conn.close()
+        _db_lista = True
+
+# -------------------- Trabajo en el proceso hijo ------------
+def _inicializar_worker() -> None:
+    """Al arrancar cada worker: precarga EasyOCR/Tesseract (OCR_WARMUP=0 lo desactiva)."""
+    if os.getenv("OCR_WARMUP", "1") != "0":
+        try:
+            from services import ocr_ai
+            ocr_ai.calentar()
+        except Exception as e:  # sin precarga: el primer documento cargará los modelos
+            print("jobs warm-up error:", e)
+
+def _ejecutar_expediente(job_id: str, documentos: list) -> dict:
+    """
+    Corre en el pool de procesos: todos los documentos ([(campo, ruta)]) del
+    expediente a la vez en hilos (services/ejecutor.py), así el tiempo total se
+    acerca al del documento más lento. Cada resultado se guarda apenas termina
+    (el progreso se ve documento a documento). Devuelve las métricas acumuladas
+    en el worker desde el expediente anterior, para sumarlas en el proceso Flask.
+    El import va aquí para que el proceso Flask no cargue EasyOCR/Torch solo por
+    encolar trabajos.
+    """
+    from services import ejecutor
+    ejecutor.procesar_expediente(
+        dict(documentos),
+        al_terminar=lambda campo, resultado, error: _guardar_documento(job_id, campo, resultado, error),
+    )
+    return metricas.exportar(reiniciar=True)
+
+# -------------------- API pública ---------------------------
+def encolar(user_id: str, documentos: Dict[str, str]) -> str:
+    """
+    Registra un trabajo con un documento por campo ({campo: ruta}) y
+    devuelve su ID de inmediato. El procesamiento ocurre en segundo plano.
+    Un documento que el usuario ya analizó con éxito en el mismo campo y con el
+    mismo contenido (la ruta del blob es por sha256) no se vuelve a encolar:
+    entra completado con ese resultado.
+    Solo escribe en la base: el despachador (jobs.iniciar, en el proceso servidor)
+    lo toma en su próxima vuelta (enseguida si corre en este mismo proceso).
+    """
+    _init_db()
+    job_id = uuid.uuid4().hex
+    ahora = time.time()
+    with transaccion(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user_id, estado, creado, actualizado) VALUES (?, ?, ?, ?, ?)",
+            (job_id, str(user_id), EN_COLA, ahora, ahora),
+        )
+        reutilizados = 0
+        for campo, ruta in documentos.items():
+            previo = conn.execute(
+                "SELECT d.resultado FROM job_docs d JOIN jobs j ON j.id = d.job_id "
+                "WHERE j.user_id = ? AND d.campo = ? AND d.ruta = ? AND d.estado = ? "
+                "ORDER BY d.fin DESC LIMIT 1",
+                (str(user_id), campo, ruta, COMPLETADO),
+            ).fetchone()
+            if previo:
+                reutilizados += 1
+                conn.execute(
+                    "INSERT INTO job_docs (job_id, campo, ruta, estado, resultado, fin) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, campo, ruta, COMPLETADO, previo["resultado"], ahora),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO job_docs (job_id, campo, ruta, estado) VALUES (?, ?, ?, ?)",
+                    (job_id, campo, ruta, EN_COLA),
+                )
+        if reutilizados:
+            metricas.contar("jobs_documentos_reutilizados", reutilizados)
+        if documentos and reutilizados == len(documentos):  # nada que analizar: se cierra ya
+            _cerrar_si_termino(conn, job_id, ahora)
+    _despertar.set()
+    return job_id
+
+def obtener_job(job_id: str) -> Optional[dict]:
+    """Estado del trabajo con progreso y resultado por documento."""
+    _init_db()
+    with lectura(DB_PATH) as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not job:
+            return None
+        docs = conn.execute(
+            "SELECT * FROM job_docs WHERE job_id = ? ORDER BY rowid", (job_id,)
+        ).fetchall()
+
+    documentos = []
+    for d in docs:
+        documentos.append({
+            "campo": d["campo"],
+            "estado": d["estado"],
+            "resultado": json.loads(d["resultado"]) if d["resultado"] else None,
+            "error": d["error"],
+            "duracion": round(d["fin"] - d["inicio"], 3) if d["inicio"] and d["fin"] else None,
+        })
+    terminados = sum(1 for d in documentos if d["estado"] in (COMPLETADO, ERROR))
+    return {
+        "id": job["id"],
+        "userId": job["user_id"],
+        "estado": job["estado"],
+        "creado": job["creado"],
+        "actualizado": job["actualizado"],
+        "progreso": {"total": len(documentos), "terminados": terminados},
+        "documentos": documentos,
+        "consistencia": json.loads(job["consistencia"]) if job["consistencia"] else None,
+    }
+
+def iniciar() -> None:
+    """
+    Arranca (una sola vez por proceso) el hilo despachador. Solo desde el proceso
+    servidor (ver app.py), nunca en los workers del pool.
+    Varios procesos pueden llamarlo (p.ej. workers de gunicorn): despacha solo el
+    que tiene el lease de la base; los demás esperan por si ese muere. Al tomar el
+    lease, los documentos que el dueño anterior dejó 'procesando' vuelven a la
+    cola, salvo los que ya agotaron MAX_INTENTOS (se marcan como error).
+    """
+    global _hilo
+    _init_db()
+    with _lock:
+        if _hilo is not None:
+            return
+        _hilo = threading.Thread(target=_despachar, name="jobs-despachador", daemon=True)
+        _hilo.start()
+    atexit.register(_soltar_lease)
+    _despertar.set()
+
+# -------------------- Lease del despachador -----------------
+def _proceso_vivo(dueno: str) -> bool:
+    """Si el dueño es de esta máquina y su PID ya no existe, está muerto sin esperar al vencimiento."""
+    partes = dueno.rsplit(":", 2)  # host:pid:sufijo
+    if len(partes) != 3 or partes[0] != socket.gethostname() or os.name == "nt":
+        return True  # otra máquina, o Windows (os.kill terminaría el proceso): se espera al vencimiento
+    try:
+        os.kill(int(partes[1]), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+def _tomar_lease() -> bool:
+    """
+    Renueva el lease o lo toma si está libre, vencido o su dueño murió.
+    True si este proceso es el despachador. Al tomarlo de otro dueño, re-encola
+    lo que ese dejó 'procesando' (este proceso no tiene nada en vuelo todavía).
+    """
+    ahora = time.time()
+    with transaccion(DB_PATH) as conn:
+        fila = conn.execute("SELECT dueno, vence FROM despachador WHERE id = 1").fetchone()
+        if fila and fila["dueno"] != _ID and fila["vence"] > ahora and _proceso_vivo(fila["dueno"]):
+            return False
+        conn.execute(
+            "INSERT INTO despachador (id, dueno, vence) VALUES (1, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET dueno = excluded.dueno, vence = excluded.vence",
+            (_ID, ahora + LEASE_SEG),
+        )
+    if not fila or fila["dueno"] != _ID:
+        for job_id, campo, error in _reencolar(None):
+            _guardar_documento(job_id, campo, None, error)
+    return True
+
+def _soltar_lease() -> None:
+    """Al salir: libera el lease para que otro proceso despache sin esperar a que venza."""
+    try:
+        with transaccion(DB_PATH) as conn:
+            conn.execute("UPDATE despachador SET vence = 0 WHERE id = 1 AND dueno = ?", (_ID,))
+    except Exception as e:
+        print("jobs soltar lease error:", e)
+
+# -------------------- Despachador ---------------------------
+def _get_pool() -> ProcessPoolExecutor:
+    """Pool de procesos 'spawn' (igual en Windows y Linux, sin fork con hilos vivos)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicializar_worker,
+        )
+    return _pool
+
+def _reclamar(n: int) -> list:
+    """
+    Marca como 'procesando' los documentos en cola de hasta n expedientes (FIFO
+    por el documento más antiguo) y devuelve [(job_id, [(campo, ruta), ...])].
+    """
+    ahora = time.time()
+    out = []
+    with transaccion(DB_PATH) as conn:
+        jobs_ids = [f["job_id"] for f in conn.execute(
+            "SELECT job_id FROM job_docs WHERE estado = ? GROUP BY job_id ORDER BY MIN(rowid) LIMIT ?",
+            (EN_COLA, n),
+        )]
+        for job_id in jobs_ids:
+            filas = conn.execute(
+                "SELECT campo, ruta FROM job_docs WHERE job_id = ? AND estado = ? ORDER BY rowid",
+                (job_id, EN_COLA),
+            ).fetchall()
+            conn.execute(
+                "UPDATE job_docs SET estado = ?, inicio = ?, intentos = intentos + 1, dueno = ? "
+                "WHERE job_id = ? AND estado = ?",
+                (PROCESANDO, ahora, _ID, job_id, EN_COLA),
+            )
+            conn.execute(
+                "UPDATE jobs SET estado = ?, actualizado = ? WHERE id = ? AND estado = ?",
+                (PROCESANDO, ahora, job_id, EN_COLA),
+            )
+            out.append((job_id, [(f["campo"], f["ruta"]) for f in filas]))
+    return out
+
+def _futuro_fallido(exc: BaseException) -> Future:
+    """Future ya resuelto con error (para reutilizar el mismo camino de _al_terminar)."""
+    fut: Future = Future()
+    fut.set_exception(exc)
+    return fut
+
+def _despachar() -> None:
+    """
+    Bucle: mantiene el pool ocupado (2 expedientes por worker) con documentos en
+    cola, mientras este proceso tenga el lease (se renueva en cada vuelta).
+    """
+    global _en_vuelo
+    lider = False
+    while True:
+        _despertar.wait(POLL_SEG)
+        _despertar.clear()
+        try:
+            if not _tomar_lease():
+                if lider:
+                    print("jobs: otro proceso tomó el despacho")
+                lider = False
+                continue
+            lider = True
+            with _lock:
+                libres = MAX_WORKERS * 2 - _en_vuelo
+            if libres <= 0:
+                continue
+            for job_id, documentos in _reclamar(libres):
+                with _lock:
+                    _en_vuelo += 1
+                pool = _get_pool()
+                try:
+                    fut = pool.submit(_ejecutar_expediente, job_id, documentos)
+                except BrokenProcessPool as e:
+                    fut = _futuro_fallido(e)
+                fut.add_done_callback(lambda f, j=job_id, p=pool: _al_terminar(j, f, p))
+        except Exception as e:
+            print("jobs despachador error:", e)
+
+def _reencolar(job_id: Optional[str]) -> list:
+    """
+    Devuelve a la cola los documentos 'procesando' que aún tienen intentos: los
+    de job_id (pool roto en este proceso) o, con None, los de dueños anteriores
+    (solo al tomar el lease; nunca los que este proceso tiene en vuelo). Los que
+    agotaron MAX_INTENTOS quedan como están y se devuelven [(job_id, campo, error)]
+    para cerrarlos con _guardar_documento (que también cierra el trabajo si era el último).
+    """
+    if job_id:
+        filtro, args = "AND job_id = ?", (job_id,)
+    else:
+        filtro, args = "AND (dueno IS NULL OR dueno != ?)", (_ID,)
+    with transaccion(DB_PATH) as conn:
+        agotados = conn.execute(
+            f"SELECT job_id, campo, intentos FROM job_docs WHERE estado = ? AND intentos >= ? {filtro}",
+            (PROCESANDO, MAX_INTENTOS, *args),
+        ).fetchall()
+        conn.execute(
+            f"UPDATE job_docs SET estado = ?, inicio = NULL WHERE estado = ? AND intentos < ? {filtro}",
+            (EN_COLA, PROCESANDO, MAX_INTENTOS, *args),
+        )
+    if agotados:
+        metricas.contar("jobs_documentos_agotados", len(agotados))
+    return [(f["job_id"], f["campo"], f"el procesamiento se interrumpió {f['intentos']} veces (worker caído)")
+            for f in agotados]
+
+def _al_terminar(job_id: str, fut, pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Fin de un expediente en el pool. Los resultados ya los guardó el worker;
+    aquí solo se atienden los documentos que quedaron 'procesando' si falló.
+    """
+    global _en_vuelo, _pool
+    with _lock:
+        _en_vuelo -= 1
+    try:
+        metricas.fusionar(fut.result())  # /metrics del proceso Flask incluye lo de los workers
+    except BrokenProcessPool:
+        # Un worker murió (p.ej. sin memoria): se descarta el pool roto (el próximo
+        # despacho crea otro) y lo que no terminó vuelve a la cola, salvo los
+        # documentos que ya lo tumbaron MAX_INTENTOS veces.
+        with _lock:
+            roto = pool is not None and _pool is pool
+            if roto:
+                _pool = None
+        if roto:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for j, campo, error in _reencolar(job_id):
+            _guardar_documento(j, campo, None, error)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        with lectura(DB_PATH) as conn:
+            pendientes = [f["campo"] for f in conn.execute(
+                "SELECT campo FROM job_docs WHERE job_id = ? AND estado = ?", (job_id, PROCESANDO)
+            )]
+        for campo in pendientes:
+            _guardar_documento(job_id, campo, None, error)
+    _despertar.set()
+
+def _guardar_documento(job_id: str, campo: str, resultado: Optional[dict], error: Optional[str]) -> None:
+    """
+    Guarda el resultado (o el error) de un documento y cierra el trabajo si ya no
+    quedan pendientes. Se llama desde el worker (SQLite WAL admite varios procesos).
+    """
+    ahora = time.time()
+    estado = ERROR if error else COMPLETADO
+    resultado = json.dumps(resultado, ensure_ascii=False) if error is None else None
+    try:
+        with transaccion(DB_PATH) as conn:
+            conn.execute(
+                "UPDATE job_docs SET estado = ?, resultado = ?, error = ?, fin = ? WHERE job_id = ? AND campo = ?",
+                (estado, resultado, error, ahora, job_id, campo),
+            )
+            _cerrar_si_termino(conn, job_id, ahora)
+    except Exception as e:
+        print("jobs guardar resultado error:", e)
+
+def _cerrar_si_termino(conn, job_id: str, ahora: float) -> None:
+    """Sin documentos pendientes: estado final del trabajo y verificación de consistencia."""
+    pendientes = conn.execute(
+        "SELECT COUNT(*) FROM job_docs WHERE job_id = ? AND estado IN (?, ?)",
+        (job_id, EN_COLA, PROCESANDO),
+    ).fetchone()[0]
+    if pendientes:
+        conn.execute("UPDATE jobs SET actualizado = ? WHERE id = ?", (ahora, job_id))
+        return
+    filas = conn.execute(
+        "SELECT campo, estado, resultado FROM job_docs WHERE job_id = ?", (job_id,)
+    ).fetchall()
+    fallidos = sum(1 for f in filas if f["estado"] == ERROR)
+    final = ERROR if fallidos == len(filas) else PARCIAL if fallidos else COMPLETADO
+    consolidado = {
+        f"resultado_{f['campo']}": json.loads(f["resultado"]).get("datos") or {}
+        for f in filas if f["resultado"]
+    }
+    consistencia = json.dumps(verificar_consistencia(consolidado), ensure_ascii=False)
+    conn.execute(
+        "UPDATE jobs SET estado = ?, actualizado = ?, consistencia = ? WHERE id = ?",
+        (final, ahora, consistencia, job_id),
+    )
@@ -0,0 +1,199 @@
+import asyncio, time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+# aiohttp es opcional: sin él, cada llamada usa el cliente síncrono compartido
+# (services/llm_client.py) en un hilo con asyncio.to_thread.
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from services import llm_client, llm_struct, metricas
+from services.llm_client import (
+    LLM_KEEP_ALIVE, LLM_MAX_INFLIGHT, LLM_RETRIES, LLM_TIMEOUT, OLLAMA_URL, _REINTENTABLES,
+    ClienteLLM, ErrorLLM,
+)
+
+# =========================================================
+# Variante asyncio de llm_struct: las extracciones de un expediente se esperan
+# a la vez (acotadas por un semáforo), los resultados salen a medida que
+# terminan y, al vencer el deadline, lo que sigue en vuelo se cancela.
+#
+#   async for campo, datos in llm_async.estructurar_expediente_stream(textos, deadline_seg=60):
+#       ...
+#
+# Mismo camino que la versión síncrona: reglas primero, selección de contexto,
+# cache de respuestas, mismo prompt y mismo JSON (ver services/llm_struct.py).
+# =========================================================
+
+class ClienteLLMAsync:
+    """
+    /api/chat de Ollama desde asyncio:
+    - Con aiohttp: una ClientSession (keep-alive) por cliente, máximo `max_en_vuelo`
+      peticiones simultáneas, reintentos con backoff+jitter ante red/429/5xx y
+      deadline por llamada (incluye la espera del semáforo), como ClienteLLM.
+    - Sin aiohttp: ClienteLLM.chat en un hilo. Cancelar la tarea no corta la petición
+      ya enviada, pero el deadline que recibe el cliente síncrono sí la acota.
+    La sesión pertenece al event loop donde se usa: un cliente por loop
+    (`async with ClienteLLMAsync() as c:`).
+    """
+
+    def __init__(self, url: str = OLLAMA_URL, max_en_vuelo: int = LLM_MAX_INFLIGHT,
+                 reintentos: int = LLM_RETRIES, timeout: float = LLM_TIMEOUT):
+        self.url = url
+        self.max_en_vuelo = max(1, max_en_vuelo)
+        self.reintentos = max(0, reintentos)
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(self.max_en_vuelo)
+        self._sesion: Optional["aiohttp.ClientSession"] = None
+        self._sincrono: Optional[ClienteLLM] = None
+
+    async def __aenter__(self) -> "ClienteLLMAsync":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
+
+    async def cerrar(self) -> None:
+        if self._sesion is not None:
+            await self._sesion.close()
+            self._sesion = None
+
+    def _session(self) -> "aiohttp.ClientSession":
+        if self._sesion is None:
+            self._sesion = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_en_vuelo))
+        return self._sesion
+
+    async def chat(self, payload: dict, deadline: Optional[float] = None) -> str:
+        """POST a /api/chat y devuelve message.content (deadline: instante time.monotonic())."""
+        if aiohttp is None:
+            if self._sincrono is None:  # el compartido si apunta al mismo servidor
+                compartido = llm_client.cliente()
+                self._sincrono = compartido if compartido.url == self.url else ClienteLLM(
+                    self.url, self.max_en_vuelo, self.reintentos, self.timeout)
+            async with self._sem:
+                return await asyncio.to_thread(self._sincrono.chat, payload, deadline)
+
+        payload = dict(payload)
+        payload.setdefault("keep_alive", LLM_KEEP_ALIVE)
+        ultimo: Optional[Exception] = None
+
+        for intento in range(self.reintentos + 1):
+            if intento:
+                await asyncio.sleep(ClienteLLM._pausa(intento - 1, deadline))
+            restante = ClienteLLM._restante(deadline)
+            if restante is not None and restante <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._sem.acquire(), restante)
+            except asyncio.TimeoutError:
+                break
+            try:
+                restante = ClienteLLM._restante(deadline)
+                timeout = self.timeout if restante is None else max(0.001, min(self.timeout, restante))
+                limite = aiohttp.ClientTimeout(total=timeout, connect=min(5.0, timeout))
+                async with self._session().post(self.url, json=payload, timeout=limite) as r:
+                    if r.status in _REINTENTABLES:
+                        metricas.contar("llm_llamadas", resultado=f"http_{r.status}")
+                        ultimo = ErrorLLM(f"HTTP {r.status}")
+                        continue
+                    r.raise_for_status()
+                    datos = await r.json(content_type=None)
+                metricas.contar("llm_llamadas", resultado="ok")
+                metricas.contar("llm_tokens", datos.get("prompt_eval_count") or 0, tipo="prompt")
+                metricas.contar("llm_tokens", datos.get("eval_count") or 0, tipo="respuesta")
+                return datos["message"]["content"]
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                metricas.contar("llm_llamadas", resultado="red")
+                ultimo = e
+            finally:
+                self._sem.release()
+
+        if ultimo is None:
+            raise ErrorLLM("deadline agotado")
+        raise ErrorLLM(f"sin respuesta tras {self.reintentos + 1} intento(s): {ultimo}")
+
+# -------------------- Estructuración ---------------------------
+async def _chat_json(cliente: ClienteLLMAsync, prompt: str, deadline: Optional[float]) -> dict:
+    payload = llm_struct._payload(prompt)
+    clave = llm_struct._clave_cache(payload)
+    # La cache es SQLite (bloquea): en un hilo, para no frenar el event loop
+    cacheado = await asyncio.to_thread(llm_struct._de_cache, clave)
+    if cacheado is not None:
+        return cacheado
+    with metricas.span("llm", modelo=llm_struct.TEXT_MODEL):
+        content = await cliente.chat(payload, deadline)
+    out = llm_struct._extract_json(content)
+    await asyncio.to_thread(llm_struct._a_cache, clave, out)
+    return out
+
+async def estructurar(cliente: ClienteLLMAsync, campo: str, texto_ocr: str,
+                      deadline: Optional[float] = None) -> dict:
+    """Equivalente async de llm_struct.ESTRUCTURADORES[campo](texto_ocr, deadline)."""
+    tipo, prompt = llm_struct.PROMPTS_POR_CAMPO[campo]
+    reglas, suficiente = llm_struct._por_reglas(tipo, texto_ocr)
+    if suficiente:
+        return reglas
+    texto, contexto = llm_struct.seleccionar_contexto(tipo, texto_ocr)
+    out = await _chat_json(cliente, llm_struct._con_texto(prompt, texto), deadline)
+    return llm_struct._marcar_llm(out, reglas, contexto)
+
+def _vencido() -> dict:
+    return {"ok": False, "missing_fields": ["llm_timeout"], "error": "deadline agotado"}
+
+async def estructurar_expediente_stream(textos: Dict[str, str], deadline_seg: Optional[float] = None,
+                                        cliente: Optional[ClienteLLMAsync] = None
+                                        ) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Lanza las extracciones de {campo: texto_ocr} a la vez y entrega (campo, json)
+    a medida que terminan. Al vencer deadline_seg se cancelan las pendientes y
+    se entregan con missing_fields=["llm_timeout"]. Un fallo en un documento no
+    tumba a los demás (missing_fields=["llm_error"]). Campos sin estructurador se omiten.
+    Sin 'cliente' se crea uno (LLM_MAX_INFLIGHT en vuelo) y se cierra al terminar.
+    """
+    deadline = time.monotonic() + deadline_seg if deadline_seg else None
+    tareas = {c: t for c, t in textos.items() if c in llm_struct.PROMPTS_POR_CAMPO}
+    if not tareas:
+        return
+    propio = cliente is None
+    cliente = cliente or ClienteLLMAsync()
+    orden = {campo: i for i, campo in enumerate(tareas)}
+
+    async def _uno(campo: str) -> dict:
+        try:
+            return await estructurar(cliente, campo, tareas[campo], deadline)
+        except Exception as e:
+            return {"ok": False, "missing_fields": ["llm_error"], "error": f"{type(e).__name__}: {e}"}
+
+    pendientes = {asyncio.create_task(_uno(campo)): campo for campo in tareas}
+    try:
+        while pendientes:
+            restante = None if deadline is None else deadline - time.monotonic()
+            if restante is not None and restante <= 0:
+                break
+            hechas, _ = await asyncio.wait(pendientes, timeout=restante, return_when=asyncio.FIRST_COMPLETED)
+            for t in sorted(hechas, key=lambda t: orden[pendientes[t]]):
+                yield pendientes.pop(t), t.result()
+
+        if pendientes:  # deadline: lo que sigue en vuelo se cancela
+            for t in pendientes:
+                t.cancel()
+            await asyncio.gather(*pendientes, return_exceptions=True)
+            metricas.contar("llm_cancelados", len(pendientes))
+            for campo in sorted(pendientes.values(), key=orden.get):
+                yield campo, _vencido()
+            pendientes.clear()
+    finally:
+        # También si quien consume deja de iterar antes de tiempo
+        for t in pendientes:
+            t.cancel()
+        if pendientes:
+            await asyncio.gather(*pendientes, return_exceptions=True)
+        if propio:
+            await cliente.cerrar()
+
+async def estructurar_expediente(textos: Dict[str, str], deadline_seg: Optional[float] = None,
+                                 cliente: Optional[ClienteLLMAsync] = None) -> Dict[str, dict]:
+    """Como llm_struct.estructurar_expediente pero con await: {campo: json} en el orden de entrada."""
+    out = {campo: datos async for campo, datos in estructurar_expediente_stream(textos, deadline_seg, cliente)}
+    return {campo: out[campo] for campo in textos if campo in out}
@@ -0,0 +1,109 @@
+import os, random, threading, time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services import metricas
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "2"))     # peticiones simultáneas a Ollama
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))               # reintentos tras el primer intento
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))           # segundos por intento
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "10m")            # modelo cargado en Ollama entre llamadas
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+_REINTENTABLES = (429, 500, 502, 503, 504)
+
+class ErrorLLM(Exception):
+    """Fallo definitivo al hablar con el servidor LLM (tras reintentos o por deadline)."""
+
+class ClienteLLM:
+    """
+    Cliente HTTP compartido para /api/chat de Ollama:
+    - Session con pool de conexiones keep-alive (sin handshake TCP por llamada).
+    - Semáforo: como máximo `max_en_vuelo` peticiones simultáneas por proceso.
+    - Reintentos con backoff exponencial + jitter ante errores de red, 429 y 5xx.
+    - Deadline por llamada: ningún intento (ni la espera del semáforo) lo sobrepasa.
+    """
+
+    def __init__(self, url: str = OLLAMA_URL, max_en_vuelo: int = LLM_MAX_INFLIGHT,
+                 reintentos: int = LLM_RETRIES, timeout: float = LLM_TIMEOUT):
+        self.url = url
+        self.reintentos = max(0, reintentos)
+        self.timeout = timeout
+        self._sem = threading.BoundedSemaphore(max(1, max_en_vuelo))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_en_vuelo))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @staticmethod
+    def _restante(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+
+    @classmethod
+    def _pausa(cls, intento: int, deadline: Optional[float]) -> float:
+        """Backoff exponencial con 'full jitter', sin pasarse del deadline."""
+        pausa = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** intento)))
+        restante = cls._restante(deadline)
+        if restante is not None:
+            pausa = min(pausa, max(0.0, restante))
+        return pausa
+
+    def _espera(self, intento: int, deadline: Optional[float]) -> None:
+        time.sleep(self._pausa(intento, deadline))
+
+    def chat(self, payload: dict, deadline: Optional[float] = None) -> str:
+        """
+        POST a /api/chat y devuelve message.content.
+        deadline: instante time.monotonic() límite para toda la llamada (incluye reintentos).
+        """
+        payload = dict(payload)
+        payload.setdefault("keep_alive", LLM_KEEP_ALIVE)
+        ultimo: Optional[Exception] = None
+
+        for intento in range(self.reintentos + 1):
+            if intento:
+                self._espera(intento - 1, deadline)
+            restante = self._restante(deadline)
+            if restante is not None and restante <= 0:
+                break
+            if not self._sem.acquire(timeout=restante):
+                break
+            try:
+                restante = self._restante(deadline)  # la espera del semáforo también cuenta
+                timeout = self.timeout if restante is None else max(0.001, min(self.timeout, restante))
+                r = self.session.post(self.url, json=payload, timeout=(min(5.0, timeout), timeout))
+                if r.status_code in _REINTENTABLES:
+                    metricas.contar("llm_llamadas", resultado=f"http_{r.status_code}")
+                    ultimo = ErrorLLM(f"HTTP {r.status_code}")
+                    continue
+                r.raise_for_status()
+                datos = r.json()
+                metricas.contar("llm_llamadas", resultado="ok")
+                metricas.contar("llm_tokens", datos.get("prompt_eval_count") or 0, tipo="prompt")
+                metricas.contar("llm_tokens", datos.get("eval_count") or 0, tipo="respuesta")
+                return datos["message"]["content"]
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metricas.contar("llm_llamadas", resultado="red")
+                ultimo = e
+            finally:
+                self._sem.release()
+
+        if ultimo is None:
+            raise ErrorLLM("deadline agotado")
+        raise ErrorLLM(f"sin respuesta tras {self.reintentos + 1} intento(s): {ultimo}")
+
+_CLIENTE: Optional[ClienteLLM] = None
+_CLIENTE_LOCK = threading.Lock()
+
+def cliente() -> ClienteLLM:
+    """Cliente único por proceso (comparte pool de conexiones y semáforo)."""
+    global _CLIENTE
+    if _CLIENTE is None:
+        with _CLIENTE_LOCK:
+            if _CLIENTE is None:
+                _CLIENTE = ClienteLLM()
+    return _CLIENTE
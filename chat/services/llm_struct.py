@@ -1,7 +1,23 @@
-import os, json, re, requests
+import os, json, re, time, hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from services import metricas
+from services.llm_client import LLM_MAX_INFLIGHT, cliente
+from services.reglas import extraer_por_reglas
+from services.contexto import MAX_CHARS_COMPLETO, seleccionar_contexto
+from services.cache import LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL, RUTA_CACHE_LLM, CacheDisco
 
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
 TEXT_MODEL = os.getenv("OLLAMA_TEXT_MODEL", "mistral:instruct")
+# Confianza mínima de las reglas (services/reglas.py) para no llamar al LLM
+REGLAS_MIN_CONFIANZA = float(os.getenv("REGLAS_MIN_CONFIANZA", "0.85"))
+
+# Cache de respuestas: mismo modelo + opciones + prompt => misma respuesta (temperature baja).
+# Las respuestas que no parsean a JSON se guardan aparte y se reintentan.
+_CACHE_LLM = (
+    CacheDisco(RUTA_CACHE_LLM, LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL)
+    if os.getenv("LLM_CACHE", "1") != "0" else None
+)
 
 _JSON_HINT = (
   "Responde EXCLUSIVAMENTE con JSON válido, sin explicaciones ni markdown, "
@@ -26,18 +42,57 @@ def _extract_json(text: str) -> dict:
                 pass
     return {"ok": False, "missing_fields": ["json_parse"], "raw": text}
 
-def _chat_json(prompt: str) -> dict:
-    """Envía prompt a Ollama y devuelve JSON parseado."""
-    payload = {
+def _clave_cache(payload: dict) -> str:
+    """sha256 de modelo + opciones + mensajes (el prompt completo)."""
+    base = json.dumps(
+        {"model": payload["model"], "options": payload.get("options"), "messages": payload["messages"]},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+def _payload(prompt: str) -> dict:
+    return {
         "model": TEXT_MODEL,
         "messages": [{"role": "user", "content": f"{prompt}\n\n{_JSON_HINT}"}],
         "stream": False,
         "options": {"temperature": 0.1},
     }
-    r = requests.post(OLLAMA_URL, json=payload, timeout=120)
-    r.raise_for_status()
-    content = r.json()["message"]["content"]
-    return _extract_json(content)
+
+def _de_cache(clave: str) -> Optional[dict]:
+    if _CACHE_LLM is None:
+        return None
+    try:
+        cacheado = _CACHE_LLM.obtener(clave)
+        metricas.contar("cache", cache="llm", resultado="acierto" if cacheado is not None else "fallo")
+        return cacheado
+    except Exception as e:
+        print("cache llm error:", e)
+        return None
+
+def _a_cache(clave: str, out: dict) -> None:
+    if _CACHE_LLM is None:
+        return
+    try:
+        if not isinstance(out, dict) or ("json_parse" in (out.get("missing_fields") or []) and "raw" in out):
+            _CACHE_LLM.registrar_falla(clave, out)
+        else:
+            _CACHE_LLM.guardar(clave, out)
+    except Exception as e:
+        print("cache llm error:", e)
+
+def _chat_json(prompt: str, deadline: Optional[float] = None) -> dict:
+    """Envía prompt a Ollama (cliente compartido, con reintentos) y devuelve JSON parseado."""
+    payload = _payload(prompt)
+    clave = _clave_cache(payload)
+    cacheado = _de_cache(clave)
+    if cacheado is not None:
+        return cacheado
+
+    with metricas.span("llm", modelo=TEXT_MODEL):
+        content = cliente().chat(payload, deadline=deadline)
+    out = _extract_json(content)
+    _a_cache(clave, out)
+    return out
 
 # =========================================================
 # PROMPTS
@@ -138,20 +193,101 @@ TEXTO_OCR:
 # FUNCIONES DE ESTRUCTURACIÓN
 # =========================================================
 
-def estructurar_cedula_desde_texto(texto_ocr: str) -> dict:
-    return _chat_json(PROMPT_CEDULA + "\n\"\"\"\n" + (texto_ocr[:12000]) + "\n\"\"\"\n")
+def _con_texto(prompt: str, texto_ocr: str) -> str:
+    return prompt + "\n\"\"\"\n" + (texto_ocr[:MAX_CHARS_COMPLETO]) + "\n\"\"\"\n"
+
+def _por_reglas(tipo: str, texto_ocr: str) -> Tuple[Optional[dict], bool]:
+    """
+    (resultado de las reglas, si alcanza para no llamar al LLM): todos los campos
+    encontrados (ok, sin missing_fields) y confianza >= REGLAS_MIN_CONFIANZA. La
+    confianza sola no basta: sin nombre en Contraloría (nombre_opcional) llega a 1.0.
+    """
+    with metricas.span("reglas", tipo=tipo):
+        reglas = extraer_por_reglas(tipo, texto_ocr)
+    suficiente = (bool(reglas) and reglas["ok"] and not reglas["missing_fields"]
+                  and reglas["confianza"] >= REGLAS_MIN_CONFIANZA)
+    metricas.contar("extracciones", tipo=tipo, metodo="reglas" if suficiente else "llm")
+    return reglas, suficiente
+
+def _marcar_llm(out: dict, reglas: Optional[dict], contexto: dict) -> dict:
+    out["metodo"] = "llm"
+    out["contexto"] = contexto  # tokens del OCR completo vs. enviados (services/contexto.py)
+    if reglas:
+        out["confianza_reglas"] = reglas["confianza"]
+    return out
 
-def estructurar_rut_desde_texto(texto_ocr: str) -> dict:
-    return _chat_json(PROMPT_RUT + "\n\"\"\"\n" + (texto_ocr[:12000]) + "\n\"\"\"\n")
+def _estructurar(tipo: str, prompt: str, texto_ocr: str, deadline: Optional[float]) -> dict:
+    """
+    Primero reglas deterministas; solo si fallan o su confianza es baja se llama al LLM,
+    con las ventanas del texto alrededor de las anclas del tipo (services/contexto.py).
+    El JSON indica el camino tomado en "metodo" ("reglas" | "llm").
+    """
+    reglas, suficiente = _por_reglas(tipo, texto_ocr)
+    if suficiente:
+        return reglas
+    texto, contexto = seleccionar_contexto(tipo, texto_ocr)
+    return _marcar_llm(_chat_json(_con_texto(prompt, texto), deadline), reglas, contexto)
 
-def estructurar_contraloria_desde_texto(texto_ocr: str) -> dict:
-    return _chat_json(PROMPT_CONTRALORIA + "\n\"\"\"\n" + (texto_ocr[:12000]) + "\n\"\"\"\n")
+def estructurar_cedula_desde_texto(texto_ocr: str, deadline: Optional[float] = None) -> dict:
+    # Sin reglas: la cédula se resuelve con la MRZ (pipeline) + LLM
+    return _estructurar("cedula", PROMPT_CEDULA, texto_ocr, deadline)
+
+def estructurar_rut_desde_texto(texto_ocr: str, deadline: Optional[float] = None) -> dict:
+    return _estructurar("rut", PROMPT_RUT, texto_ocr, deadline)
+
+def estructurar_contraloria_desde_texto(texto_ocr: str, deadline: Optional[float] = None) -> dict:
+    return _estructurar("contraloria", PROMPT_CONTRALORIA, texto_ocr, deadline)
+
+def estructurar_procuraduria_desde_texto(texto_ocr: str, deadline: Optional[float] = None) -> dict:
+    return _estructurar("procuraduria", PROMPT_PROCURADURIA, texto_ocr, deadline)
+
+def estructurar_policia_desde_texto(texto_ocr: str, deadline: Optional[float] = None) -> dict:
+    return _estructurar("policia", PROMPT_POLICIA, texto_ocr, deadline)
+
+def estructurar_rnmc_desde_texto(texto_ocr: str, deadline: Optional[float] = None) -> dict:
+    return _estructurar("rnmc", PROMPT_RNMC, texto_ocr, deadline)
+
+# Campo del formulario -> (tipo de reglas, prompt); lo usa también services/llm_async.py
+PROMPTS_POR_CAMPO = {
+    "cedula": ("cedula", PROMPT_CEDULA),
+    "rut": ("rut", PROMPT_RUT),
+    "antecedentes_contraloria": ("contraloria", PROMPT_CONTRALORIA),
+    "antecedentes_procuraduria": ("procuraduria", PROMPT_PROCURADURIA),
+    "antecedentes_policia": ("policia", PROMPT_POLICIA),
+    "antecedentes_rnmc": ("rnmc", PROMPT_RNMC),
+}
+
+# Campo del formulario -> estructurador
+ESTRUCTURADORES = {
+    "cedula": estructurar_cedula_desde_texto,
+    "rut": estructurar_rut_desde_texto,
+    "antecedentes_contraloria": estructurar_contraloria_desde_texto,
+    "antecedentes_procuraduria": estructurar_procuraduria_desde_texto,
+    "antecedentes_policia": estructurar_policia_desde_texto,
+    "antecedentes_rnmc": estructurar_rnmc_desde_texto,
+}
+
+# =========================================================
+# LOTE: todas las extracciones de un expediente en paralelo
+# =========================================================
 
-def estructurar_procuraduria_desde_texto(texto_ocr: str) -> dict:
-    return _chat_json(PROMPT_PROCURADURIA + "\n\"\"\"\n" + (texto_ocr[:12000]) + "\n\"\"\"\n")
+def estructurar_expediente(textos: Dict[str, str], deadline_seg: Optional[float] = None) -> Dict[str, dict]:
+    """
+    Recibe {campo: texto_ocr} y lanza las extracciones a la vez (el cliente limita
+    cuántas van en vuelo). Devuelve {campo: json} en el mismo orden de entrada;
+    un fallo en un documento no tumba a los demás. Campos sin estructurador se omiten.
+    Variante asyncio, con resultados parciales y cancelación: services/llm_async.py.
+    """
+    deadline = time.monotonic() + deadline_seg if deadline_seg else None
+    tareas = {c: t for c, t in textos.items() if c in ESTRUCTURADORES}
+    if not tareas:
+        return {}
 
-def estructurar_policia_desde_texto(texto_ocr: str) -> dict:
-    return _chat_json(PROMPT_POLICIA + "\n\"\"\"\n" + (texto_ocr[:12000]) + "\n\"\"\"\n")
+    def _uno(campo: str) -> dict:
+        try:
+            return ESTRUCTURADORES[campo](tareas[campo], deadline)
+        except Exception as e:
+            return {"ok": False, "missing_fields": ["llm_error"], "error": f"{type(e).__name__}: {e}"}
 
-def estructurar_rnmc_desde_texto(texto_ocr: str) -> dict:
-    return _chat_json(PROMPT_RNMC + "\n\"\"\"\n" + (texto_ocr[:12000]) + "\n\"\"\"\n")
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=min(len(tareas), max(1, LLM_MAX_INFLIGHT))) as ex:
+        return dict(zip(tareas, ex.map(_uno, tareas)))
@@ -0,0 +1,145 @@
+import os, time, threading
+from typing import Dict, Iterable, List, Optional
+
+from services.db import conectar, lectura, transaccion
+
+# =========================================================
+# Metadatos de usuario (email) para listados de Admin/Comité.
+# Antes: un uploads/meta/<id>.txt por usuario, leído en cada listado.
+# Ahora: una tabla SQLite cargada entera en memoria; cada escritura sube
+# un contador 'generacion' y los procesos recargan solo si cambió.
+# =========================================================
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # carpeta "chat"
+UPLOAD_ROOT = os.path.join(BASE_DIR, "uploads")
+META_DIR = os.path.join(UPLOAD_ROOT, "meta")  # formato viejo (.txt), solo para migrar
+DB_PATH = os.getenv("META_DB", os.path.join(UPLOAD_ROOT, "usuarios.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    user_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    actualizado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+_lock = threading.Lock()
+_listo = False
+_cache: Dict[str, str] = {}
+_generacion: Optional[int] = None
+
+def alias(user_id: str) -> str:
+    """Nombre a mostrar cuando no hay email guardado."""
+    return f"user_{user_id}"
+
+def _init() -> None:
+    """Crea el esquema; la primera vez importa los .txt de uploads/meta."""
+    global _listo
+    if _listo:
+        return
+    with _lock:
+        if _listo:
+            return
+        conn = conectar(DB_PATH)
+        try:
+            conn.executescript(_SCHEMA)
+            migrado = conn.execute("SELECT valor FROM meta WHERE clave = 'migrado_txt'").fetchone()
+        finally:
+            conn.close()
+        _listo = True
+    if not migrado:
+        migrar_txt()
+
+def _subir_generacion(conn) -> None:
+    conn.execute(
+        "INSERT INTO meta (clave, valor) VALUES ('generacion', 1) "
+        "ON CONFLICT(clave) DO UPDATE SET valor = valor + 1"
+    )
+
+def _cargar() -> Dict[str, str]:
+    """Devuelve la cache; la recarga completa si otro proceso/hilo escribió."""
+    global _cache, _generacion
+    _init()
+    with lectura(DB_PATH) as conn:
+        fila = conn.execute("SELECT valor FROM meta WHERE clave = 'generacion'").fetchone()
+        gen = fila[0] if fila else 0
+        with _lock:
+            if gen == _generacion:
+                return _cache
+        nuevo = {r["user_id"]: r["email"] for r in conn.execute("SELECT user_id, email FROM usuarios")}
+    with _lock:
+        _cache, _generacion = nuevo, gen
+        return _cache
+
+def _invalidar() -> None:
+    global _generacion
+    with _lock:
+        _generacion = None
+
+# -------------------- API -----------------------------------
+def generacion() -> int:
+    """Contador que cambia con cada escritura (para ETags de listados)."""
+    _init()
+    with lectura(DB_PATH) as conn:
+        fila = conn.execute("SELECT valor FROM meta WHERE clave = 'generacion'").fetchone()
+    return fila[0] if fila else 0
+
+def emails(user_ids: Iterable[str]) -> Dict[str, str]:
+    """Resuelve varios usuarios de una vez: {user_id: email o alias}."""
+    cache = _cargar()
+    return {str(u): cache.get(str(u)) or alias(u) for u in user_ids}
+
+def email(user_id: str) -> str:
+    return emails([user_id])[str(user_id)]
+
+def usuarios() -> List[str]:
+    """IDs con metadatos guardados."""
+    return list(_cargar().keys())
+
+def guardar_email(user_id: str, correo: str) -> None:
+    """Guarda el email; si no cambió no escribe (login/subidas lo llaman seguido)."""
+    uid, correo = str(user_id), correo or ""
+    if _cargar().get(uid) == correo:
+        return
+    with transaccion(DB_PATH) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO usuarios (user_id, email, actualizado) VALUES (?, ?, ?)",
+            (uid, correo, time.time()),
+        )
+        _subir_generacion(conn)
+    _invalidar()
+
+def migrar_txt(meta_dir: str = META_DIR) -> int:
+    """
+    Importa uploads/meta/<id>.txt (formato viejo). No pisa emails ya guardados
+    en la tabla. Devuelve cuántos archivos se leyeron.
+    """
+    filas = []
+    if os.path.isdir(meta_dir):
+        for fn in os.listdir(meta_dir):
+            if not fn.endswith(".txt"):
+                continue
+            p = os.path.join(meta_dir, fn)
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    correo = f.read().strip()
+            except Exception:
+                continue
+            filas.append((fn[:-4], correo, os.path.getmtime(p)))
+    with transaccion(DB_PATH) as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO usuarios (user_id, email, actualizado) VALUES (?, ?, ?)", filas
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('migrado_txt', 1)")
+        _subir_generacion(conn)
+    _invalidar()
+    return len(filas)
+
+if __name__ == "__main__":
+    # python -m services.meta_usuarios  -> importa uploads/meta/*.txt
+    _init()
+    print("archivos importados:", migrar_txt())
@@ -0,0 +1,183 @@
+import os, time, threading
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, List, Optional, Tuple
+
+# =========================================================
+# Métricas en proceso (sin dependencias): contadores, histogramas de
+# duración y spans por etapa. /metrics (routes/metricas.py) las expone en
+# formato texto de Prometheus.
+#
+#   with metricas.span("render", dpi=320):   # histograma etapa_segundos{etapa="render"}
+#       ...                                  # + entrada en la traza activa, si hay una
+#   metricas.contar("tesseract_llamadas", backend="pool")
+#
+# La traza es por petición/documento (ContextVar): ejecutor la propaga a los
+# hilos de páginas y el resultado de cada documento la lleva en "traza".
+# Los workers de la cola son otros procesos: al terminar cada expediente
+# devuelven exportar() y el proceso Flask lo suma con fusionar().
+# =========================================================
+
+PREFIJO = os.getenv("METRICAS_PREFIJO", "expedientes")
+TRAZA_ACTIVA = os.getenv("METRICAS_TRAZA", "1") != "0"
+TRAZA_MAX_SPANS = 200
+# Segundos: de una consulta al índice (ms) a una página OCR en CPU (decenas de s)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+AYUDA = {
+    "etapa_segundos": "Duración de cada etapa del pipeline y de la E/S de archivos",
+    "paginas_ocr": "Páginas enviadas a EasyOCR",
+    "paginas_texto_nativo": "Páginas resueltas con la capa de texto del PDF",
+    "easyocr_lotes": "Llamadas a EasyOCR (cada una con una o más imágenes)",
+    "tesseract_llamadas": "Lecturas de Tesseract para la MRZ",
+    "llm_llamadas": "Peticiones al LLM por resultado",
+    "llm_cancelados": "Extracciones LLM canceladas por deadline (services/llm_async.py)",
+    "llm_contexto_tokens": "Tokens estimados del texto OCR completo vs. enviados al LLM tras elegir contexto",
+    "llm_tokens": "Tokens informados por Ollama (prompt / respuesta)",
+    "cache": "Consultas a las caches en disco por resultado",
+    "extracciones": "Documentos estructurados por método (reglas / llm)",
+    "documentos": "Documentos procesados por campo y estado",
+}
+
+_lock = threading.Lock()
+_contadores: Dict[Tuple[str, tuple], float] = {}
+_histogramas: Dict[Tuple[str, tuple], list] = {}  # [cuenta por bucket..., +Inf, suma]
+
+def _clave(nombre: str, etiquetas: dict) -> Tuple[str, tuple]:
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+def contar(nombre: str, valor: float = 1, **etiquetas) -> None:
+    clave = _clave(nombre, etiquetas)
+    with _lock:
+        _contadores[clave] = _contadores.get(clave, 0) + valor
+
+def observar(nombre: str, segundos: float, **etiquetas) -> None:
+    clave = _clave(nombre, etiquetas)
+    with _lock:
+        h = _histogramas.get(clave)
+        if h is None:
+            h = _histogramas[clave] = [0] * (len(BUCKETS) + 2)
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-1] += segundos
+
+# -------------------- Spans y trazas -------------------------
+_TRAZA: ContextVar[Optional[dict]] = ContextVar("metricas_traza", default=None)
+
+@contextmanager
+def span(etapa: str, **atributos):
+    """
+    Mide el bloque: histograma etapa_segundos{etapa} y, si hay traza activa, un
+    span {etapa, inicio_ms, ms, **atributos}. El dict que se entrega permite
+    agregar atributos dentro del bloque (p.ej. intentos).
+    """
+    datos = dict(atributos)
+    t0 = time.perf_counter()
+    try:
+        yield datos
+    except BaseException as e:
+        datos["error"] = type(e).__name__
+        raise
+    finally:
+        seg = time.perf_counter() - t0
+        observar("etapa_segundos", seg, etapa=etapa)
+        traza = _TRAZA.get()
+        if traza is not None and len(traza["spans"]) < TRAZA_MAX_SPANS:
+            traza["spans"].append({
+                "etapa": etapa,
+                "inicio_ms": round((t0 - traza["t0"]) * 1000, 1),
+                "ms": round(seg * 1000, 1),
+                **datos,
+            })
+
+@contextmanager
+def traza():
+    """Abre una traza para el bloque y entrega su lista de spans (vacía si METRICAS_TRAZA=0)."""
+    if not TRAZA_ACTIVA:
+        yield []
+        return
+    t = {"t0": time.perf_counter(), "spans": []}
+    token = _TRAZA.set(t)
+    try:
+        yield t["spans"]
+    finally:
+        _TRAZA.reset(token)
+
+def en_contexto(fn: Callable) -> Callable:
+    """fn ligada a una copia del contexto actual (para pasarla a otro hilo con la traza)."""
+    ctx = copy_context()  # se copia aquí, en el hilo que encola, no en el que ejecuta
+    # Un Context no puede correr en dos hilos a la vez: cada llamada usa su propia copia
+    return lambda *a, **kw: ctx.copy().run(fn, *a, **kw)
+
+# -------------------- Entre procesos --------------------------
+def exportar(reiniciar: bool = False) -> dict:
+    """Foto serializable de contadores e histogramas (y los pone en cero si reiniciar)."""
+    with _lock:
+        foto = {
+            "contadores": [(n, list(e), v) for (n, e), v in _contadores.items()],
+            "histogramas": [(n, list(e), list(h)) for (n, e), h in _histogramas.items()],
+        }
+        if reiniciar:
+            _contadores.clear()
+            _histogramas.clear()
+    return foto
+
+def fusionar(foto: Optional[dict]) -> None:
+    """Suma a este proceso lo exportado por otro (worker de la cola)."""
+    if not foto:
+        return
+    with _lock:
+        for nombre, etiquetas, valor in foto.get("contadores", ()):
+            clave = (nombre, tuple(tuple(x) for x in etiquetas))
+            _contadores[clave] = _contadores.get(clave, 0) + valor
+        for nombre, etiquetas, h in foto.get("histogramas", ()):
+            clave = (nombre, tuple(tuple(x) for x in etiquetas))
+            actual = _histogramas.setdefault(clave, [0] * (len(BUCKETS) + 2))
+            for i, v in enumerate(h):
+                actual[i] += v
+
+# -------------------- Formato Prometheus ----------------------
+def _numero(v: float) -> str:
+    """Enteros exactos (sin notación científica) y flotantes con toda su precisión."""
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def _etiquetas(pares, extra: Optional[tuple] = None) -> str:
+    pares = list(pares) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pares) + "}"
+
+def texto_prometheus() -> str:
+    """Exposición en formato texto 0.0.4 de Prometheus."""
+    foto = exportar()
+    lineas: List[str] = []
+    vistos = set()
+
+    def _cabecera(nombre: str, tipo: str, completo: str) -> None:
+        if completo not in vistos:
+            vistos.add(completo)
+            lineas.append(f"# HELP {completo} {AYUDA.get(nombre, nombre)}")
+            lineas.append(f"# TYPE {completo} {tipo}")
+
+    for nombre, etiquetas, valor in sorted(foto["contadores"]):
+        completo = f"{PREFIJO}_{nombre}_total"
+        _cabecera(nombre, "counter", completo)
+        lineas.append(f"{completo}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+    for nombre, etiquetas, h in sorted(foto["histogramas"]):
+        completo = f"{PREFIJO}_{nombre}"
+        _cabecera(nombre, "histogram", completo)
+        acumulado = 0
+        for limite, n in zip(BUCKETS, h):
+            acumulado += n
+            lineas.append(f"{completo}_bucket{_etiquetas(etiquetas, ('le', _numero(limite)))} {acumulado}")
+        acumulado += h[len(BUCKETS)]
+        lineas.append(f"{completo}_bucket{_etiquetas(etiquetas, ('le', '+Inf'))} {acumulado}")
+        lineas.append(f"{completo}_sum{_etiquetas(etiquetas)} {_numero(h[-1])}")
+        lineas.append(f"{completo}_count{_etiquetas(etiquetas)} {acumulado}")
+    return "\n".join(lineas) + "\n"
@@ -1,142 +1,510 @@
+import os
 import re
+import threading
+import time
+from typing import Optional
 import fitz  # PyMuPDF
 import numpy as np
 import cv2
-import easyocr
 import pytesseract
 
+from services.cache import OCR_CACHE_MAX_BYTES, RUTA_CACHE_OCR, CacheDisco, cache_por_archivo
+from services.ocr_lotes import LoteadorOCR
+from services import ejecutor, metricas, preprocesado, tesseract_pool
+
 # === Ruta de Tesseract (si tu venv no hereda PATH) ===
 # Si ya está en PATH, comenta esta línea.
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
-# === Inicializa OCR general (ES + EN) una sola vez ===
+# === OCR general (ES + EN): se carga en el primer uso, no al importar ===
+# easyocr importa PyTorch y carga los pesos del detector/reconocedor (segundos y
+# cientos de MB): solo los procesos que hacen OCR deben pagar ese costo.
 # Cambia a gpu=True si ya instalaste PyTorch con CUDA.
-_READER = easyocr.Reader(['es', 'en'], gpu=False)
+_READER = None
+_READER_LOCK = threading.Lock()
+
+def _get_reader():
+    global _READER
+    if _READER is None:
+        with _READER_LOCK:
+            if _READER is None:
+                import easyocr
+                _READER = easyocr.Reader(['es', 'en'], gpu=False)
+    return _READER
+
+def calentar() -> None:
+    """
+    Precarga explícita (opcional) de los modelos: EasyOCR y un motor Tesseract.
+    La usan los workers OCR al arrancar para que el primer documento no pague la carga.
+    """
+    _get_reader()
+    if _TESS_POOL is not None:
+        with _TESS_POOL.motor():
+            pass
+
+# === Cache de resultados OCR por contenido (sha256 del archivo) ===
+# Subir la versión al cambiar preprocesado, DPI, idiomas o parámetros de Tesseract:
+# así nunca se sirve un resultado calculado con otro pipeline. El perfil de
+# preprocesado (services/preprocesado.py) va aparte, en la clave de cada llamada
+# y ya resuelto (None y el perfil por defecto explícito comparten entrada).
+# Límites del DPI adaptativo (ver _dpi_pagina): forman parte de la versión.
+OCR_DPI_MIN = int(os.getenv("OCR_DPI_MIN", "200"))
+OCR_DPI_MAX = int(os.getenv("OCR_DPI_MAX", "400"))
+OCR_MAX_PIXELES = int(float(os.getenv("OCR_MAX_MPX", "40")) * 1_000_000)
+ALTURA_TEXTO_REF_PT = 6.0   # alto típico de un carácter de letra de 10-11 pt
+OCR_PIPELINE_VERSION = (
+    f"6|easyocr=es,en|dpi=320/340@{ALTURA_TEXTO_REF_PT}pt[{OCR_DPI_MIN}-{OCR_DPI_MAX}]|mrz=td1"
+)
+_CACHE_OCR = (
+    CacheDisco(RUTA_CACHE_OCR, OCR_CACHE_MAX_BYTES)
+    if os.getenv("OCR_CACHE", "1") != "0" else None
+)
 
 # -----------------------------------------------------
 # Preprocesado y OCR general (EasyOCR)
 # -----------------------------------------------------
-def _preprocess_bgr(bgr):
-    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
-    gray = cv2.bilateralFilter(gray, 9, 75, 75)
-    _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    return th
+def _preprocess_bgr(bgr, perfil: Optional[str] = None):
+    """BGR -> binarizada según el perfil (None = preprocesado.PERFIL_DEFECTO)."""
+    return preprocesado.aplicar(bgr, perfil, "texto")
+
+# -----------------------------------------------------
+# Micro-batching de EasyOCR (páginas de varios documentos/hilos)
+# -----------------------------------------------------
+OCR_BATCH_MAX = int(os.getenv("OCR_BATCH_MAX", "4"))           # imágenes por lote
+OCR_BATCH_WAIT_MS = float(os.getenv("OCR_BATCH_WAIT_MS", "25"))  # espera máx. para llenar un lote
+OCR_BATCH_RECOG = int(os.getenv("OCR_BATCH_RECOG", "16"))      # recortes por lote del reconocedor
 
-def _ocr_easy_ndarray(img_bgr) -> str:
-    img = _preprocess_bgr(img_bgr)
-    lines = _READER.readtext(img, detail=0, paragraph=True)
-    return "\n".join(lines).strip()
+def _grupo_tamano(img):
+    """Agrupa imágenes de tamaño parecido (cubetas de 128 px) para rellenar poco."""
+    return (img.shape[0] // 128, img.shape[1] // 128)
+
+def _readtext_lote(imgs: list) -> list:
+    """
+    Corre EasyOCR sobre varias imágenes binarizadas en una sola pasada por grupo.
+    readtext_batched exige el mismo tamaño: se rellena con blanco (255) a la derecha/abajo,
+    sin reescalar, para no alterar la altura del texto.
+    """
+    resultados = [None] * len(imgs)
+    grupos = {}
+    for i, img in enumerate(imgs):
+        grupos.setdefault(_grupo_tamano(img), []).append(i)
+
+    for idxs in grupos.values():
+        if len(idxs) == 1:
+            i = idxs[0]
+            resultados[i] = _get_reader().readtext(imgs[i], detail=0, paragraph=True, batch_size=OCR_BATCH_RECOG)
+            metricas.contar("easyocr_lotes")
+            continue
+        h = max(imgs[i].shape[0] for i in idxs)
+        w = max(imgs[i].shape[1] for i in idxs)
+        rellenas = [
+            cv2.copyMakeBorder(imgs[i], 0, h - imgs[i].shape[0], 0, w - imgs[i].shape[1],
+                               cv2.BORDER_CONSTANT, value=255)
+            for i in idxs
+        ]
+        salida = _get_reader().readtext_batched(rellenas, detail=0, paragraph=True, batch_size=OCR_BATCH_RECOG)
+        metricas.contar("easyocr_lotes")
+        for i, lines in zip(idxs, salida):
+            resultados[i] = lines
+    return ["\n".join(lines).strip() for lines in resultados]
+
+_LOTEADOR = LoteadorOCR(_readtext_lote, max_lote=OCR_BATCH_MAX, max_espera_ms=OCR_BATCH_WAIT_MS)
+
+def _ocr_easy_ndarrays(imgs_bgr: list, perfil: Optional[str] = None) -> list:
+    """OCR de varias imágenes BGR; se agrupan con las de otros llamadores concurrentes."""
+    if not imgs_bgr:
+        return []
+    with metricas.span("preprocesado", perfil=perfil or preprocesado.PERFIL_DEFECTO):
+        prep = [_preprocess_bgr(img, perfil) for img in imgs_bgr]
+    metricas.contar("paginas_ocr", len(prep))
+    with metricas.span("easyocr", imagenes=len(prep)):  # incluye la espera del lote
+        if OCR_BATCH_MAX <= 1:
+            return [_readtext_lote([img])[0] for img in prep]
+        return _LOTEADOR.reconocer(prep)
+
+def _ocr_easy_ndarray(img_bgr, perfil: Optional[str] = None) -> str:
+    return _ocr_easy_ndarrays([img_bgr], perfil)[0]
 
 # -----------------------------------------------------
 # Conversión PDF -> imágenes (numpy)
 # -----------------------------------------------------
-def _pdf_to_png_ndarrays(pdf_path: str, dpi: int = 320, max_pages: int = 3):
-    arrs = []
-    with fitz.open(pdf_path) as doc:
-        n = min(max_pages, doc.page_count)
-        for i in range(n):
-            pix = doc[i].get_pixmap(dpi=dpi)
-            png_bytes = pix.tobytes("png")
-            arr = cv2.imdecode(np.frombuffer(png_bytes, np.uint8), cv2.IMREAD_COLOR)
-            if arr is not None:
-                arrs.append(arr)
-    return arrs
+# El pixmap se lee tal cual desde su buffer de muestras (sin codificar a PNG y
+# decodificar de vuelta): una sola copia, la conversión RGB -> BGR de OpenCV.
+# El DPI se elige por página: a la altura de texto de referencia se usa el DPI
+# base (320 OCR / 340 MRZ); letra más chica sube el DPI y letra grande lo baja,
+# siempre dentro de [OCR_DPI_MIN, OCR_DPI_MAX] y de OCR_MAX_MPX megapíxeles.
+_DPI_SONDEO = 72            # sondeo barato: 1 px = 1 pt
+
+def _altura_texto_pt(page):
+    """
+    Alto mediano de los caracteres de la página en puntos; None si no se puede estimar.
+    Con capa de texto se usa el alto de los spans; en páginas escaneadas se
+    rasteriza a 72 DPI en grises y se mide la mediana de los componentes conexos.
+    """
+    try:
+        alturas = [
+            span["size"] * 0.6  # alto de la x aproximado a partir del cuerpo de letra
+            for bloque in page.get_text("dict")["blocks"] if bloque.get("type") == 0
+            for linea in bloque["lines"] for span in linea["spans"]
+            if span["text"].strip()
+        ]
+    except Exception:
+        alturas = []
+    if len(alturas) >= 5:
+        return float(np.median(alturas))
+
+    pix = page.get_pixmap(dpi=_DPI_SONDEO, colorspace=fitz.csGRAY, alpha=False)
+    gray = _muestras(pix)
+    _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    n, _, stats, _ = cv2.connectedComponentsWithStats(th, connectivity=8)
+    if n <= 1:
+        return None
+    alto, ancho = stats[1:, cv2.CC_STAT_HEIGHT], stats[1:, cv2.CC_STAT_WIDTH]
+    # Fuera: ruido de 1 px, líneas de tablas y fotos/sellos
+    letras = alto[(alto >= 2) & (alto <= 40) & (ancho <= 3 * alto + 2)]
+    if len(letras) < 20:
+        return None
+    return float(np.median(letras))
+
+def _dpi_pagina(page, dpi_base: int) -> int:
+    """DPI de render para la página según su tamaño y el alto estimado del texto."""
+    alto_pt = _altura_texto_pt(page)
+    dpi = dpi_base if not alto_pt else dpi_base * ALTURA_TEXTO_REF_PT / alto_pt
+    dpi = min(max(dpi, OCR_DPI_MIN), OCR_DPI_MAX)
+    area_pulg2 = (page.rect.width / 72) * (page.rect.height / 72)
+    if area_pulg2 > 0:
+        dpi = min(dpi, (OCR_MAX_PIXELES / area_pulg2) ** 0.5)
+    return max(int(dpi), 1)
+
+def _muestras(pix):
+    """Vista numpy (alto, ancho[, canales]) sobre las muestras del pixmap, sin copiar."""
+    buf = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+    arr = np.frombuffer(buf, dtype=np.uint8).reshape(pix.h, pix.stride)
+    arr = arr[:, : pix.w * pix.n].reshape(pix.h, pix.w, pix.n)
+    return arr[:, :, 0] if pix.n == 1 else arr
+
+def _page_to_ndarray(page, dpi: int):
+    """Página como imagen BGR a 'dpi'. El array resultante es independiente del pixmap."""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    return cv2.cvtColor(_muestras(pix), cv2.COLOR_RGB2BGR)
+
+# PyMuPDF no es thread-safe: abrir/renderizar va serializado (igual retiene el GIL);
+# el preprocesado y el OCR de cada página sí corren en paralelo (ejecutor.paginas).
+# El lock es el mismo que usan las vistas previas (services/previews.py).
+_FITZ_LOCK = ejecutor.FITZ_LOCK
+
+def _rasterizar(pdf_path: str, i: int, dpi_base: int, nativo: bool = False):
+    """
+    (texto_nativo, BGR | None) de la página i. Con nativo=True, si la página trae
+    texto embebido suficiente se devuelve ese texto y no se rasteriza.
+    """
+    with _FITZ_LOCK, fitz.open(pdf_path) as doc:
+        page = doc[i]
+        if nativo:
+            with metricas.span("texto_nativo", pagina=i + 1):
+                texto = _texto_nativo_pagina(page)
+            if texto:
+                metricas.contar("paginas_texto_nativo")
+                return texto, None
+        with metricas.span("render", pagina=i + 1) as s:
+            s["dpi"] = _dpi_pagina(page, dpi_base)
+            return "", _page_to_ndarray(page, s["dpi"])
+
+def _num_paginas(pdf_path: str, max_pages: int) -> int:
+    with _FITZ_LOCK, fitz.open(pdf_path) as doc:
+        return min(max_pages, doc.page_count)
+
+# -----------------------------------------------------
+# Capa de texto nativa (PDF generados digitalmente)
+# -----------------------------------------------------
+# Certificados de Procuraduría, Contraloría, Policía, RNMC y el RUT de la DIAN
+# casi siempre traen texto embebido: leerlo cuesta milisegundos frente a
+# segundos de rasterizar a 320 DPI + EasyOCR. Solo se usa OCR en páginas
+# escaneadas (sin texto) o con muy poco texto aprovechable.
+MIN_CHARS_TEXTO_NATIVO = int(os.getenv("PDF_MIN_CHARS_TEXTO", "80"))
+
+def _texto_nativo_pagina(page) -> str:
+    """Texto embebido de la página si es suficiente; '' si hay que hacer OCR."""
+    try:
+        texto = page.get_text("text", sort=True).strip()
+    except Exception:
+        return ""
+    utiles = sum(1 for ch in texto if ch.isalnum())
+    return texto if utiles >= MIN_CHARS_TEXTO_NATIVO else ""
 
 # -----------------------------------------------------
 # OCR general (imagen o PDF)
 # -----------------------------------------------------
-def ocr_imagen_path(path: str) -> str:
+def ocr_imagen_path(path: str, perfil: Optional[str] = None) -> str:
     bgr = cv2.imread(path)
     if bgr is None:
         return ""
-    return _ocr_easy_ndarray(bgr)
+    return _ocr_easy_ndarray(bgr, perfil)
 
-def ocr_pdf_path(pdf_path: str) -> str:
-    arrs = _pdf_to_png_ndarrays(pdf_path, dpi=320, max_pages=3)
-    texts = [_ocr_easy_ndarray(arr) for arr in arrs]
-    return "\n".join(texts).strip()
-
-def extraer_texto_documento(path: str) -> str:
+def ocr_pdf_path_detalle(pdf_path: str, max_pages: int = 3, perfil: Optional[str] = None) -> dict:
+    """
+    Texto del PDF página a página: capa de texto nativa si existe, si no OCR (~320 DPI).
+    Devuelve {"texto": str, "paginas": [{"pagina", "metodo", "caracteres"}]}
+    con metodo = "texto_nativo" | "ocr".
+    """
+    def _pagina(i):
+        texto, arr = _rasterizar(pdf_path, i, 320, nativo=True)
+        if texto:
+            return texto, "texto_nativo"
+        # Las páginas escaneadas de todos los hilos se juntan en el loteador de EasyOCR
+        return (_ocr_easy_ndarray(arr, perfil) if arr is not None else ""), "ocr"
+
+    res = ejecutor.paginas(_pagina, range(_num_paginas(pdf_path, max_pages)))
+    textos = [texto for texto, _ in res]
+    paginas = [
+        {"pagina": i + 1, "metodo": metodo, "caracteres": len(texto)}
+        for i, (texto, metodo) in enumerate(res)
+    ]
+    return {"texto": "\n".join(textos).strip(), "paginas": paginas}
+
+def ocr_pdf_path(pdf_path: str, perfil: Optional[str] = None) -> str:
+    return ocr_pdf_path_detalle(pdf_path, perfil=perfil)["texto"]
+
+def extraer_texto_documento_detalle(path: str, perfil: Optional[str] = None) -> dict:
+    """Como extraer_texto_documento, pero informa el método usado en cada página."""
+    return _extraer_texto_detalle(path, perfil or preprocesado.PERFIL_DEFECTO)
+
+@cache_por_archivo(_CACHE_OCR, "texto", f"{OCR_PIPELINE_VERSION}|nativo>={MIN_CHARS_TEXTO_NATIVO}")
+def _extraer_texto_detalle(path: str, perfil: str) -> dict:
     ext = path.rsplit(".", 1)[-1].lower()
-    return ocr_pdf_path(path) if ext == "pdf" else ocr_imagen_path(path)
+    if ext == "pdf":
+        return ocr_pdf_path_detalle(path, perfil=perfil)
+    texto = ocr_imagen_path(path, perfil)
+    return {"texto": texto, "paginas": [{"pagina": 1, "metodo": "ocr", "caracteres": len(texto)}]}
+
+def extraer_texto_documento(path: str, perfil: Optional[str] = None) -> str:
+    return extraer_texto_documento_detalle(path, perfil)["texto"]
 
 # =====================================================
 #               OCR especializado MRZ (Tesseract)
 # =====================================================
-def _tesseract_mrz(img_gray) -> str:
+# Backend de Tesseract para la MRZ:
+#   auto       -> pool de motores en proceso (tesserocr) si está instalado; si no, subproceso
+#   pool       -> siempre tesserocr
+#   subproceso -> siempre pytesseract (un proceso 'tesseract' por llamada)
+TESS_BACKEND = os.getenv("TESS_BACKEND", "auto").lower()
+_TESS_POOL = None
+if TESS_BACKEND in ("auto", "pool") and tesseract_pool.tesserocr is not None:
+    _TESS_POOL = tesseract_pool.PoolTesseract()
+
+def _tess_subproceso(img_gray, psm: int) -> str:
+    base = f'-c tessedit_char_whitelist={tesseract_pool.MRZ_WHITELIST}'
+    return pytesseract.image_to_string(img_gray, lang="eng", config=f'--oem 3 --psm {psm} {base}')
+
+def _tess_texto(img_gray, psm: int) -> str:
+    """Una lectura Tesseract: pool en proceso si existe, con pytesseract como respaldo."""
+    t0 = time.perf_counter()
+    backend = "subproceso"
+    try:
+        if _TESS_POOL is not None:
+            try:
+                backend = "pool"
+                return _TESS_POOL.leer(img_gray, psm)
+            except Exception as e:
+                if TESS_BACKEND == "pool":
+                    raise
+                print("tesseract pool error, usando subproceso:", e)
+                backend = "subproceso"
+        return _tess_subproceso(img_gray, psm)
+    finally:
+        # Sin span: son hasta 20+ por cédula; en la traza va el total ("mrz", intentos)
+        metricas.observar("etapa_segundos", time.perf_counter() - t0, etapa="tesseract")
+        metricas.contar("tesseract_llamadas", backend=backend)
+
+def _tesseract_mrz(img_gray, psms=(7, 6)) -> str:
     """
     OCR para MRZ probando dos modos (línea/bloque) con whitelist.
     Importante: NO transformar O->0 aquí para no romper 'COL'.
     """
-    base = '-c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ<0123456789'
-    txt = pytesseract.image_to_string(img_gray, lang="eng", config=f'--oem 3 --psm 7 {base}')
-    if len(txt.strip()) < 10:
-        txt = pytesseract.image_to_string(img_gray, lang="eng", config=f'--oem 3 --psm 6 {base}')
+    txt = _tess_texto(img_gray, psms[0])
+    if len(txt.strip()) < 10 and len(psms) > 1:
+        txt = _tess_texto(img_gray, psms[1])
     return txt.replace('|', 'I').upper()
 
-def _enhance_for_mrz(g):
-    g = cv2.equalizeHist(g)
-    _, th = cv2.threshold(g, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    k = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-    return cv2.morphologyEx(th, cv2.MORPH_CLOSE, k, iterations=1)
+def _enhance_for_mrz(g, perfil: Optional[str] = None):
+    return preprocesado.aplicar(g, perfil, "mrz")
 
-def ocr_mrz_from_bgr(bgr) -> str:
-    """
-    Busca la MRZ en imágenes de anverso+reverso (dos caras apiladas).
-    Explora la MITAD INFERIOR y varias bandas; prueba rotaciones y reescalado.
-    """
-    h, w = bgr.shape[:2]
-    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+# ---- ICAO 9303 (TD1, 3 x 30): dígitos de control ----
+_MRZ_VALOR = {**{str(d): d for d in range(10)}, **{chr(65 + i): 10 + i for i in range(26)}, "<": 0}
+# Confusiones típicas de OCR dentro de campos que SOLO pueden ser numéricos
+_A_DIGITO = str.maketrans({"O": "0", "Q": "0", "D": "0", "I": "1", "L": "1",
+                           "Z": "2", "S": "5", "G": "6", "B": "8"})
 
-    def _score(t: str) -> int:
-        s = t.count('<')
-        if 'COL' in t or 'C0L' in t:
-            s += 5
-        return s
+def _digito_control(campo: str) -> int:
+    pesos = (7, 3, 1)
+    return sum(_MRZ_VALOR.get(c, 0) * pesos[i % 3] for i, c in enumerate(campo)) % 10
 
-    candidates = []
+def _control_ok(campo: str, control: str) -> bool:
+    control = control.translate(_A_DIGITO)
+    if control == "<":
+        control = "0"
+    return control.isdigit() and _digito_control(campo) == int(control)
 
-    # Trabaja sobre la MITAD INFERIOR (donde suele estar el reverso y la MRZ)
-    half = gray[int(h * 0.50):h, 0:w]
-    hh, ww = half.shape[:2]
+def _lineas_mrz(txt: str) -> list:
+    """Líneas candidatas limpias (solo A-Z, 0-9, '<') de al menos 20 caracteres."""
+    out = []
+    for ln in (txt or "").upper().splitlines():
+        ln = re.sub(r"[^A-Z0-9<]", "", ln.replace(" ", ""))
+        if len(ln) >= 20:
+            out.append(ln[:30].ljust(30, "<"))
+    return out
 
-    # Toma bandas del fondo de esa mitad
+def _verificar_td1(l1: str, l2: str) -> tuple:
+    """
+    Comprueba los 4 dígitos de control de un TD1 (número de documento, nacimiento,
+    vencimiento y compuesto). Devuelve (aciertos, l1, l2) con los campos numéricos
+    de la línea 2 ya corregidos (O->0, I->1, ...).
+    """
+    l2 = l2[0:7].translate(_A_DIGITO) + l2[7] + l2[8:15].translate(_A_DIGITO) + l2[15:]
+    aciertos = 0
+    aciertos += _control_ok(l1[5:14], l1[14])
+    aciertos += _control_ok(l2[0:6], l2[6])
+    aciertos += _control_ok(l2[8:14], l2[14])
+    aciertos += _control_ok(l1[5:30] + l2[0:7] + l2[8:15] + l2[18:29], l2[29])
+    return aciertos, l1, l2
+
+def validar_mrz_td1(txt: str) -> tuple:
+    """
+    Busca el mejor bloque TD1 dentro del texto OCR.
+    Devuelve (aciertos 0..4, mrz_normalizada | None). aciertos == 4 => MRZ verificada.
+    """
+    lineas = _lineas_mrz(txt)
+    mejor = (0, None)
+    for i in range(len(lineas) - 1):
+        aciertos, l1, l2 = _verificar_td1(lineas[i], lineas[i + 1])
+        if aciertos > mejor[0]:
+            nombres = lineas[i + 2] if i + 2 < len(lineas) else ""
+            mejor = (aciertos, "\n".join(x for x in (l1, l2, nombres) if x))
+    return mejor
+
+def _puntaje_mrz(txt: str) -> tuple:
+    """Orden de candidatos: primero dígitos de control válidos; '<' solo desempata."""
+    return (validar_mrz_td1(txt)[0], (txt or "").count("<"))
+
+# ---- Localización de la banda MRZ (morfología) ----
+def _regiones_mrz(gray, ancho_trabajo: int = 900) -> list:
+    """
+    Detecta bandas candidatas a MRZ: texto denso, horizontal y muy ancho.
+    Black-hat (texto oscuro sobre fondo claro) + gradiente en X + cierres
+    morfológicos que funden los caracteres de cada línea en un bloque.
+    Devuelve cajas (x, y, w, h) en la resolución original, de más a menos probable.
+    """
+    h, w = gray.shape[:2]
+    escala = min(1.0, ancho_trabajo / float(w))
+    small = cv2.resize(gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA) if escala < 1 else gray
+    sh, sw = small.shape[:2]
+
+    rect = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    cuadrado = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 21))
+    small = cv2.GaussianBlur(small, (3, 3), 0)
+    blackhat = cv2.morphologyEx(small, cv2.MORPH_BLACKHAT, rect)
+    grad = np.absolute(cv2.Sobel(blackhat, cv2.CV_32F, 1, 0, ksize=-1))
+    grad = cv2.normalize(grad, None, 0, 255, cv2.NORM_MINMAX).astype("uint8")
+    grad = cv2.morphologyEx(grad, cv2.MORPH_CLOSE, rect)
+    _, th = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    th = cv2.morphologyEx(th, cv2.MORPH_CLOSE, cuadrado)
+    th = cv2.erode(th, None, iterations=2)
+
+    contornos = cv2.findContours(th, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    cands = []
+    for c in contornos:
+        x, y, cw, ch = cv2.boundingRect(c)
+        cobertura = cw / float(sw)
+        if cw / float(max(ch, 1)) < 4 or cobertura < 0.4:
+            continue
+        # Más ancha y más abajo => más probable (la MRZ va al pie del reverso)
+        prob = cobertura + 0.5 * (y + ch) / float(sh)
+        px, py = int(cw * 0.03), int(ch * 0.25)
+        x0, y0 = max(0, x - px), max(0, y - py)
+        x1, y1 = min(sw, x + cw + px), min(sh, y + ch + py)
+        cands.append((prob, (int(x0 / escala), int(y0 / escala),
+                             int((x1 - x0) / escala), int((y1 - y0) / escala))))
+    cands.sort(key=lambda t: t[0], reverse=True)
+    return [caja for _, caja in cands]
+
+def _candidatos_mrz(gray, perfil: Optional[str] = None):
+    """
+    Recortes a probar, en orden de probabilidad (generador: se corta al validar):
+      1) bandas detectadas: tal cual, girada 180° y ampliada si es pequeña;
+      2) si no hay bandas horizontales, se busca con la imagen girada 90°/270°;
+      3) respaldo: bandas fijas al pie de la mitad inferior (método anterior).
+    """
+    detectadas = False
+    for k in (0, 1, 3):
+        img = gray if k == 0 else np.ascontiguousarray(np.rot90(gray, k))
+        for (x, y, w, h) in _regiones_mrz(img)[:3]:
+            detectadas = True
+            roi = _enhance_for_mrz(img[y:y + h, x:x + w], perfil)
+            yield roi, (6, 7)
+            yield np.ascontiguousarray(np.rot90(roi, 2)), (6, 7)
+            if h < 120:
+                yield cv2.resize(roi, None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC), (6, 7)
+        if detectadas:
+            return
+
+    h, w = gray.shape[:2]
+    half = gray[int(h * 0.50):h, 0:w]
+    hh = half.shape[0]
     for frac_top in (0.55, 0.65, 0.72, 0.78):  # relativo a la mitad-inferior
-        y0 = int(hh * frac_top)
-        roi = half[y0:hh, 0:ww]
-
-        roi_enh = _enhance_for_mrz(roi)
-        candidates.append(_tesseract_mrz(roi_enh))
-
-        # Rotaciones 90/180/270 sobre esa ROI mejorada
-        for k in (1, 2, 3):
-            rot = np.rot90(roi_enh, k)
-            candidates.append(_tesseract_mrz(rot))
-
-        # Reescalado por si está pequeña la MRZ
-        roi_big = cv2.resize(roi_enh, None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC)
-        candidates.append(_tesseract_mrz(roi_big))
-
-    return max(candidates, key=_score) if candidates else ""
+        roi = _enhance_for_mrz(half[int(hh * frac_top):hh, :], perfil)
+        yield roi, (7, 6)
+        yield cv2.resize(roi, None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC), (7, 6)
+
+def _mejor_mrz(textos) -> str:
+    """Mejor candidato; si valida los 4 dígitos de control devuelve la MRZ normalizada."""
+    textos = [t for t in textos if t]
+    if not textos:
+        return ""
+    mejor = max(textos, key=_puntaje_mrz)
+    aciertos, normalizada = validar_mrz_td1(mejor)
+    return normalizada if aciertos == 4 else mejor
 
-def extraer_mrz_texto(path: str) -> str:
+def ocr_mrz_from_bgr(bgr, perfil: Optional[str] = None) -> str:
+    """
+    Localiza la MRZ (anverso+reverso apilados o solo reverso) y la lee con Tesseract.
+    Prueba candidatos de más a menos probable y se detiene en cuanto los dígitos
+    de control TD1 validan; si ninguno valida, devuelve el de mejor puntaje.
     """
-    Recorre hasta 3 páginas del PDF y devuelve el mejor candidato (más '<').
-    Para imágenes, hace una sola pasada.
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+    textos = []
+    with metricas.span("mrz", perfil=perfil or preprocesado.PERFIL_DEFECTO) as s:
+        for roi, psms in _candidatos_mrz(gray, perfil):
+            txt = _tesseract_mrz(roi, psms)
+            aciertos, normalizada = validar_mrz_td1(txt)
+            s["intentos"], s["verificada"] = len(textos) + 1, aciertos == 4
+            if aciertos == 4:
+                return normalizada
+            textos.append(txt)
+        return _mejor_mrz(textos)
+
+@cache_por_archivo(_CACHE_OCR, "mrz", OCR_PIPELINE_VERSION)
+def extraer_mrz_texto(path: str, perfil: Optional[str] = None) -> str:
+    """
+    Lee hasta 3 páginas del PDF en paralelo y se queda con la primera (en orden de
+    página) cuya MRZ verifica; las páginas que aún no empezaron se cancelan.
+    Si ninguna valida, devuelve el mejor candidato. Para imágenes, una sola pasada.
     """
     ext = path.rsplit(".", 1)[-1].lower()
     if ext == "pdf":
-        texts = []
-        arrs = _pdf_to_png_ndarrays(path, dpi=340, max_pages=3)
-        for arr in arrs:
-            if arr is not None:
-                texts.append(ocr_mrz_from_bgr(arr) or "")
-        return max(texts, key=lambda t: t.count('<')) if texts else ""
+        def _pagina(i):
+            _, arr = _rasterizar(path, i, 340)
+            return (ocr_mrz_from_bgr(arr, perfil) or "") if arr is not None else ""
+
+        texts = ejecutor.paginas(_pagina, range(_num_paginas(path, 3)),
+                                 hasta=lambda txt: validar_mrz_td1(txt)[0] == 4)
+        if texts and validar_mrz_td1(texts[-1])[0] == 4:
+            return texts[-1]
+        return _mejor_mrz(texts)
     else:
         bgr = cv2.imread(path)
         if bgr is None:
             return ""
-        return ocr_mrz_from_bgr(bgr) or ""
+        return ocr_mrz_from_bgr(bgr, perfil) or ""
 
 # -----------------------------------------------------
 # Helpers MRZ: validación, fallback y parsing
@@ -188,22 +556,37 @@ def mrz_desde_texto_ocr(ocr_text: str) -> str:
     return "\n".join(mrz_lines)
 
 # ---- Parsing de campos desde MRZ ----
-_DIGITS = re.compile(r'\d{6,12}')
-_COL_ID = re.compile(r'C[O0]L(\d{6,12})')  # acepta COL y C0L
-
-def parse_nuip_from_mrz(mrz_text: str) -> str | None:
-    """NUIP desde MRZ: prioriza COL/C0L+digits; si no, el número más largo (6–12 dígitos)."""
-    if not mrz_text:
+def _fecha_mrz(yymmdd: str, futura: bool) -> str | None:
+    """YYMMDD -> 'YYYY-MM-DD'. Vencimientos siempre 20xx; nacimientos en el pasado."""
+    if not yymmdd.isdigit():
+        return None
+    yy, mm, dd = int(yymmdd[0:2]), int(yymmdd[2:4]), int(yymmdd[4:6])
+    if not (1 <= mm <= 12 and 1 <= dd <= 31):
         return None
-    t = mrz_text.upper().replace('|', 'I')
-    m = _COL_ID.search(t)
-    if m:
-        return m.group(1)
-    nums = _DIGITS.findall(t)
-    if not nums:
+    year = 2000 + yy
+    if not futura and year > time.localtime().tm_year:
+        year -= 100
+    return f"{year:04d}-{mm:02d}-{dd:02d}"
+
+def campos_mrz_td1(txt: str) -> dict | None:
+    """
+    Número de documento, nacimiento y vencimiento leídos de sus posiciones fijas
+    TD1 (y los nombres de la tercera línea), solo si los 4 dígitos de control
+    verifican; si no, None (nada de heurísticas sobre una MRZ dudosa).
+    """
+    aciertos, mrz = validar_mrz_td1(txt)
+    if aciertos != 4:
         return None
-    nums.sort(key=len, reverse=True)
-    return nums[0]
+    l1, l2, *resto = mrz.splitlines()
+    apellidos, nombres = parse_names_from_mrz(resto[0]) if resto else (None, None)
+    return {
+        "nuip": canonicalizar_nuip(l1[5:14]),
+        "fecha_nacimiento": _fecha_mrz(l2[0:6], futura=False),
+        "fecha_vencimiento": _fecha_mrz(l2[8:14], futura=True),
+        "apellidos": apellidos,
+        "nombres": nombres,
+        "mrz": mrz,
+    }
 
 def canonicalizar_nuip(nuip: str | None) -> str:
     """Normaliza NUIP dejando solo dígitos (quita puntos/ruidos)."""
@@ -246,28 +629,3 @@ def parse_names_from_mrz(mrz_text: str):
     apellidos = _title_case_es(_clean(raw_apellidos))
     nombres = _title_case_es(_clean(raw_nombres))
     return (apellidos or None), (nombres or None)
-
-def parse_birth_from_mrz(mrz_text: str) -> str | None:
-    """
-    Busca patrones YYMMDD en MRZ. Valida mes/día y mapea año a 19xx/20xx:
-    >=30 -> 1900s; <30 -> 2000s. Devuelve 'YYYY-MM-DD'.
-    """
-    if not mrz_text:
-        return None
-    t = mrz_text.upper().replace('|', 'I')
-    cand = re.findall(r'\b(\d{6})\b', t)
-
-    def _valid_iso(yyMMdd: str) -> str | None:
-        yy = int(yyMMdd[0:2])
-        mm = int(yyMMdd[2:4])
-        dd = int(yyMMdd[4:6])
-        if not (1 <= mm <= 12 and 1 <= dd <= 31):
-            return None
-        year = 1900 + yy if yy >= 30 else 2000 + yy
-        return f"{year:04d}-{mm:02d}-{dd:02d}"
-
-    for c in cand:
-        iso = _valid_iso(c)
-        if iso:
-            return iso
-    return None
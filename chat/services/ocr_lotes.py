@@ -0,0 +1,62 @@
+import queue, threading, time
+from concurrent.futures import Future
+from typing import Callable, List
+
+class LoteadorOCR:
+    """
+    Micro-batching para un modelo compartido (EasyOCR).
+    Los llamadores (páginas de varios documentos, varios hilos) envían imágenes
+    con `enviar()` y reciben un Future. Un hilo de fondo junta hasta `max_lote`
+    imágenes o espera como máximo `max_espera_ms` desde la primera, llama una vez
+    a `reconocer_lote(imagenes) -> resultados` y reparte cada resultado a su Future.
+    """
+
+    def __init__(self, reconocer_lote: Callable[[list], list], max_lote: int = 4, max_espera_ms: float = 25):
+        self.reconocer_lote = reconocer_lote
+        self.max_lote = max(1, max_lote)
+        self.max_espera = max(0.0, max_espera_ms) / 1000.0
+        self._cola: "queue.Queue[tuple]" = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def enviar(self, img) -> Future:
+        fut: Future = Future()
+        self._asegurar_hilo()
+        self._cola.put((img, fut))
+        return fut
+
+    def reconocer(self, imgs: List) -> List:
+        """Envía todas las imágenes y espera sus resultados (mismo orden)."""
+        futs = [self.enviar(img) for img in imgs]
+        return [f.result() for f in futs]
+
+    def _asegurar_hilo(self) -> None:
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="ocr-lotes", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.max_espera
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            imgs = [img for img, _ in lote]
+            try:
+                resultados = list(self.reconocer_lote(imgs))
+                if len(resultados) != len(lote):
+                    raise RuntimeError(f"reconocer_lote devolvió {len(resultados)} resultados para {len(lote)} imágenes")
+            except Exception as e:
+                for _, fut in lote:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(lote, resultados):
+                fut.set_result(res)
@@ -0,0 +1,53 @@
+from services import ocr_ai, llm_struct, preprocesado
+
+# Campos que el LLM estructura (los demás, como cámara y cartas, solo guardan el texto OCR)
+ESTRUCTURADORES = llm_struct.ESTRUCTURADORES
+
+MAX_TEXTO_RESULTADO = 5000  # texto OCR que se guarda junto al resultado
+
+def _procesar_cedula(ruta: str, texto: str, perfil: str) -> dict:
+    """
+    Cédula: LLM sobre el texto OCR. Si la MRZ verifica sus 4 dígitos de control
+    ICAO, los campos leídos de sus posiciones fijas TD1 tienen prioridad; una MRZ
+    sin verificar no sobreescribe nada de lo que devolvió el LLM.
+    """
+    datos = llm_struct.estructurar_cedula_desde_texto(texto)
+    mrz = ocr_ai.extraer_mrz_texto(ruta, perfil)
+    campos = ocr_ai.campos_mrz_td1(mrz)
+    if campos is None:
+        respaldo = ocr_ai.mrz_desde_texto_ocr(texto)
+        campos = ocr_ai.campos_mrz_td1(respaldo)
+        if campos is not None or not ocr_ai._is_valid_mrz(mrz):
+            mrz = respaldo
+    if ocr_ai._is_valid_mrz(mrz):
+        datos["mrz_detectada"] = True
+    if campos is not None:
+        mrz = campos.pop("mrz")
+        datos.update({k: v for k, v in campos.items() if v})
+    datos["mrz"] = mrz
+    datos["mrz_verificada"] = campos is not None  # dígitos de control ICAO
+    return datos
+
+def procesar_documento(campo: str, ruta: str) -> dict:
+    """
+    OCR + estructuración de un documento del expediente.
+    Devuelve un dict serializable a JSON: {"campo", "datos", "texto", "paginas", "perfil"}
+    donde "paginas" indica si cada página salió del texto nativo del PDF o de OCR y
+    "perfil" el preprocesado usado para este tipo de documento.
+    """
+    perfil = preprocesado.perfil_para(campo)
+    detalle = ocr_ai.extraer_texto_documento_detalle(ruta, perfil)
+    texto = detalle["texto"]
+    if campo == "cedula":
+        datos = _procesar_cedula(ruta, texto, perfil)
+    elif campo in ESTRUCTURADORES:
+        datos = ESTRUCTURADORES[campo](texto)
+    else:
+        datos = {}
+    return {
+        "campo": campo,
+        "datos": datos,
+        "texto": texto[:MAX_TEXTO_RESULTADO],
+        "paginas": detalle["paginas"],
+        "perfil": perfil,
+    }
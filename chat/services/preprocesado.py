@@ -0,0 +1,121 @@
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+
+# =========================================================
+# Perfiles de preprocesado antes del OCR.
+# Un perfil es una lista de pasos (nombre, parámetros) para el texto general
+# (EasyOCR, entra BGR y sale binarizado) y otra para los recortes MRZ
+# (Tesseract, entra y sale en grises). Los pasos se registran por nombre con
+# @paso, así un perfil nuevo es solo configuración.
+#
+#   rapido     -> Gaussiano 3x3 + Otsu; MRZ solo Otsu
+#   balanceado -> bilateral sobre la imagen reducida a la mitad + Otsu
+#   preciso    -> bilateral(9, 75, 75) a resolución completa + Otsu (pipeline anterior)
+#
+# El perfil se elige por campo del expediente (PERFIL_POR_CAMPO, OCR_PERFILES)
+# y forma parte de la clave de la cache OCR.
+# Comparar tiempo vs. aciertos por perfil: python -m bench.bench_perfiles
+# =========================================================
+
+Pasos = List[Tuple[str, dict]]
+
+_PASOS: Dict[str, Callable] = {}
+
+def paso(nombre: str) -> Callable:
+    """Registra f(img, **params) -> img como paso de preprocesado."""
+    def deco(fn):
+        _PASOS[nombre] = fn
+        return fn
+    return deco
+
+def _reducido(fn, img, escala: float):
+    """Aplica fn sobre la imagen reducida y vuelve al tamaño original (no cambia la altura del texto)."""
+    if escala >= 1:
+        return fn(img)
+    h, w = img.shape[:2]
+    chica = cv2.resize(img, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    return cv2.resize(fn(chica), (w, h), interpolation=cv2.INTER_LINEAR)
+
+@paso("gris")
+def _gris(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+@paso("gauss")
+def _gauss(img, k: int = 3):
+    return cv2.GaussianBlur(img, (k, k), 0)
+
+@paso("mediana")
+def _mediana(img, k: int = 3, escala: float = 1.0):
+    return _reducido(lambda g: cv2.medianBlur(g, k), img, escala)
+
+@paso("bilateral")
+def _bilateral(img, d: int = 9, sigma_color: float = 75, sigma_espacio: float = 75, escala: float = 1.0):
+    return _reducido(lambda g: cv2.bilateralFilter(g, d, sigma_color, sigma_espacio), img, escala)
+
+@paso("ecualizar")
+def _ecualizar(img):
+    return cv2.equalizeHist(img)
+
+@paso("otsu")
+def _otsu(img):
+    _, th = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return th
+
+@paso("cierre")
+def _cierre(img, k: int = 3):
+    ker = cv2.getStructuringElement(cv2.MORPH_RECT, (k, k))
+    return cv2.morphologyEx(img, cv2.MORPH_CLOSE, ker, iterations=1)
+
+PERFILES: Dict[str, Dict[str, Pasos]] = {
+    "rapido": {
+        "texto": [("gris", {}), ("gauss", {"k": 3}), ("otsu", {})],
+        "mrz": [("otsu", {})],
+    },
+    "balanceado": {
+        "texto": [("gris", {}), ("bilateral", {"d": 5, "sigma_color": 50, "sigma_espacio": 50, "escala": 0.5}),
+                  ("otsu", {})],
+        "mrz": [("ecualizar", {}), ("otsu", {})],
+    },
+    "preciso": {
+        "texto": [("gris", {}), ("bilateral", {"d": 9, "sigma_color": 75, "sigma_espacio": 75}), ("otsu", {})],
+        "mrz": [("ecualizar", {}), ("otsu", {}), ("cierre", {"k": 3})],
+    },
+}
+
+def _validar(nombre: str) -> str:
+    if nombre not in PERFILES:
+        raise ValueError(f"perfil de preprocesado desconocido: {nombre!r} (opciones: {', '.join(PERFILES)})")
+    return nombre
+
+# Perfil para campos sin entrada propia
+PERFIL_DEFECTO = _validar(os.getenv("OCR_PERFIL", "balanceado"))
+
+# Por campo del expediente. Cédula: fotos de celular con ruido, vale la pena el bilateral
+# completo. Cartas y cámara de comercio solo guardan el texto: basta con el rápido.
+PERFIL_POR_CAMPO: Dict[str, str] = {
+    "cedula": "preciso",
+    "carta_intencion": "rapido",
+    "carta_aceptacion": "rapido",
+    "camara_comercio": "rapido",
+}
+
+def _desde_env(valor: str) -> Dict[str, str]:
+    """OCR_PERFILES="cedula=preciso,rut=rapido" -> {"cedula": "preciso", "rut": "rapido"}"""
+    out = {}
+    for par in filter(None, (p.strip() for p in valor.split(","))):
+        campo, _, nombre = par.partition("=")
+        out[campo.strip()] = _validar(nombre.strip())
+    return out
+
+PERFIL_POR_CAMPO.update(_desde_env(os.getenv("OCR_PERFILES", "")))
+
+def perfil_para(campo: Optional[str]) -> str:
+    return PERFIL_POR_CAMPO.get(campo or "", PERFIL_DEFECTO)
+
+def aplicar(img, perfil: Optional[str] = None, etapa: str = "texto"):
+    """Corre los pasos de 'etapa' ('texto' | 'mrz') del perfil sobre img."""
+    for nombre, params in PERFILES[_validar(perfil or PERFIL_DEFECTO)][etapa]:
+        img = _PASOS[nombre](img, **params)
+    return img
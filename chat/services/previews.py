@@ -0,0 +1,154 @@
+import os, time, uuid, threading
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+from services.cache import CACHE_DIR
+from services.db import conectar, lectura, transaccion
+from services.ejecutor import FITZ_LOCK
+
+# =========================================================
+# Miniaturas y vistas previas de baja resolución (JPEG) de PDFs e imágenes.
+# Se renderizan con PyMuPDF a demanda y se guardan en disco con clave
+# (sha256, ancho, página): el contenido nunca cambia para una clave, así que
+# se pueden servir con cache HTTP larga. Acotadas por tamaño con LRU.
+# =========================================================
+
+PREVIEW_DIR = os.getenv("PREVIEW_DIR", os.path.join(CACHE_DIR, "previews"))
+RUTA_DB = os.path.join(PREVIEW_DIR, "previews.sqlite3")
+PREVIEW_CACHE_MAX_BYTES = int(os.getenv("PREVIEW_CACHE_MAX_MB", "256")) * 1024 * 1024
+PREVIEW_CALIDAD = int(os.getenv("PREVIEW_CALIDAD", "75"))  # calidad JPEG
+ANCHO_MINIATURA = 240
+ANCHO_PAGINA = 900
+ANCHO_MIN, ANCHO_MAX = 64, 1600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS previews (
+    clave TEXT PRIMARY KEY,
+    tam INTEGER NOT NULL,
+    accedido REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS previews_accedido ON previews (accedido);
+CREATE TABLE IF NOT EXISTS stats (
+    nombre TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+_lock = threading.Lock()
+_listo = False
+
+def _init() -> None:
+    global _listo
+    with _lock:
+        if _listo:
+            return
+        os.makedirs(PREVIEW_DIR, exist_ok=True)
+        conn = conectar(RUTA_DB)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        _listo = True
+
+def _contar(conn, nombre: str, n: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO stats (nombre, valor) VALUES (?, ?) "
+        "ON CONFLICT(nombre) DO UPDATE SET valor = valor + excluded.valor",
+        (nombre, n),
+    )
+
+def _ruta(clave: str) -> str:
+    return os.path.join(PREVIEW_DIR, clave[:2], clave + ".jpg")
+
+def ajustar_ancho(ancho: Optional[int]) -> int:
+    return min(max(int(ancho or ANCHO_MINIATURA), ANCHO_MIN), ANCHO_MAX)
+
+def renderizar(ruta: str, pagina: int, ancho: int) -> bytes:
+    """JPEG de una página escalada a 'ancho' px. IndexError si la página no existe."""
+    # PDFs e imágenes (PNG/JPEG se abren como documento de 1 página)
+    with FITZ_LOCK, fitz.open(ruta) as doc:
+        if not 0 <= pagina < doc.page_count:
+            raise IndexError(f"página {pagina} fuera de rango (0..{doc.page_count - 1})")
+        page = doc[pagina]
+        zoom = ancho / max(page.rect.width, 1)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return pix.tobytes("jpeg", jpg_quality=PREVIEW_CALIDAD)
+
+def _leer(ruta: str) -> Optional[bytes]:
+    try:
+        with open(ruta, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def obtener(ruta: str, sha256: str, pagina: int = 0, ancho: int = ANCHO_MINIATURA) -> bytes:
+    """
+    JPEG de (sha256, ancho, página), desde la cache o renderizado si falta.
+    Devuelve los bytes y no la ruta: otra petición puede expulsar el archivo
+    antes de que se envíe. Al superar PREVIEW_CACHE_MAX_MB expulsa las vistas
+    menos usadas.
+    """
+    _init()
+    ancho = ajustar_ancho(ancho)
+    clave = f"{sha256}_{ancho}_{pagina}"
+    destino = _ruta(clave)
+    ahora = time.time()
+
+    with transaccion(RUTA_DB) as conn:
+        fila = conn.execute("SELECT 1 FROM previews WHERE clave = ?", (clave,)).fetchone()
+        # Dentro de la transacción: nadie puede expulsarla mientras se lee
+        datos = _leer(destino) if fila is not None else None
+        if datos is not None:
+            conn.execute("UPDATE previews SET accedido = ? WHERE clave = ?", (ahora, clave))
+            _contar(conn, "aciertos")
+            return datos
+
+    datos = renderizar(ruta, pagina, ancho)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+    os.replace(tmp, destino)
+
+    expulsadas = []
+    with transaccion(RUTA_DB) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO previews (clave, tam, accedido) VALUES (?, ?, ?)",
+            (clave, len(datos), ahora),
+        )
+        _contar(conn, "fallos")
+        total = conn.execute("SELECT COALESCE(SUM(tam), 0) FROM previews").fetchone()[0]
+        while total > PREVIEW_CACHE_MAX_BYTES:
+            vieja = conn.execute(
+                "SELECT clave, tam FROM previews WHERE clave != ? ORDER BY accedido LIMIT 1", (clave,)
+            ).fetchone()
+            if vieja is None:
+                break
+            conn.execute("DELETE FROM previews WHERE clave = ?", (vieja["clave"],))
+            total -= vieja["tam"]
+            expulsadas.append(vieja["clave"])
+        if expulsadas:
+            _contar(conn, "expulsiones", len(expulsadas))
+    for vieja in expulsadas:  # después del COMMIT: un archivo sin fila solo ocupa espacio
+        try:
+            os.remove(_ruta(vieja))
+        except FileNotFoundError:
+            pass
+    return datos
+
+def estadisticas() -> Optional[dict]:
+    """Entradas, bytes y aciertos/fallos/expulsiones de la cache de vistas previas."""
+    if not os.path.exists(RUTA_DB):
+        return None
+    with lectura(RUTA_DB) as conn:
+        n, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(tam), 0) FROM previews").fetchone()
+        stats = {f["nombre"]: f["valor"] for f in conn.execute("SELECT nombre, valor FROM stats")}
+    return {
+        "entradas": n,
+        "bytes": total,
+        "max_bytes": PREVIEW_CACHE_MAX_BYTES,
+        "aciertos": stats.get("aciertos", 0),
+        "fallos": stats.get("fallos", 0),
+        "expulsiones": stats.get("expulsiones", 0),
+    }
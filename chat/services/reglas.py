@@ -0,0 +1,173 @@
+import re
+import unicodedata
+from typing import Optional
+
+# =========================================================
+# Extracción determinista (regex) para certificados de texto fijo.
+# Devuelve el mismo JSON que los PROMPT_* de llm_struct más:
+#   "metodo": "reglas", "confianza": 0..1
+# llm_struct solo llama al LLM si la confianza no alcanza el umbral.
+# =========================================================
+
+def _sin_acentos(s: str) -> str:
+    return "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+
+# ---- Cédula / NIT ----
+_RE_CEDULA = [
+    re.compile(r"C[EÉ]DULA\s+DE\s+CIUDADAN[IÍ]A\s*(?:N[UÚ]MERO|NO\.?|N[°º]\.?|NRO\.?)?\s*:?\s*(\d[\d.,\s]{4,14}\d)"),
+    re.compile(r"\bC\.?\s?C\.?\s*(?:NO\.?|N[°º]\.?|NRO\.?)?\s*:?\s*(\d[\d.,\s]{4,14}\d)"),
+    re.compile(r"N[UÚ]MERO\s+DE\s+IDENTIFICACI[OÓ]N\s*:?\s*(\d[\d.,\s]{4,14}\d)"),
+    re.compile(r"(?:NO\.?|N[UÚ]MERO)\s+(?:DE\s+)?DOCUMENTO\s*:?\s*(\d[\d.,\s]{4,14}\d)"),
+]
+_RE_NIT = [
+    # El NIT va sin espacios: lo que sigue tras un espacio es el DV
+    re.compile(r"IDENTIFICACI[OÓ]N\s+TRIBUTARIA.{0,40}?(\d[\d.]{5,14}\d)", re.DOTALL),
+    re.compile(r"\bNIT\b\s*:?\s*(\d[\d.]{5,14}\d)"),
+]
+
+def _solo_digitos(s: str) -> str:
+    return re.sub(r"\D", "", s or "")
+
+def _buscar_cedula(t: str, patrones) -> str:
+    for rx in patrones:
+        m = rx.search(t)
+        if m:
+            num = _solo_digitos(m.group(1))
+            if 6 <= len(num) <= 10:
+                return num
+    return ""
+
+# ---- Nombre ----
+_NOMBRE = r"([A-ZÁÉÍÓÚÑÜ]+(?:[ ]+[A-ZÁÉÍÓÚÑÜ]+){1,5})"
+_RE_NOMBRE = [
+    re.compile(r"APELLIDOS\s+Y\s+NOMBRES\s*:?\s*" + _NOMBRE),
+    re.compile(r"NOMBRES?\s+Y\s+APELLIDOS\s*:?\s*" + _NOMBRE),
+    re.compile(r"(?:SE[ÑN]OR(?:\(A\)|A)?|CIUDADANO(?:\(A\))?)\s+" + _NOMBRE + r"\s*,?\s+IDENTIFICAD"),
+    re.compile(r"\bNOMBRES?\s*:\s*" + _NOMBRE),
+]
+# Palabras que indican que el "nombre" capturado es en realidad texto del formulario
+_NO_NOMBRE = {"IDENTIFICADO", "IDENTIFICADA", "CEDULA", "CÉDULA", "NUMERO", "NÚMERO", "CERTIFICA",
+              "DOCUMENTO", "TIPO", "APELLIDO", "NOMBRE", "CON"}
+
+def _limpiar_nombre(n: str) -> str:
+    palabras = []
+    for p in n.split():
+        if p in _NO_NOMBRE:
+            break
+        palabras.append(p)
+    return " ".join(palabras) if len(palabras) >= 2 else ""
+
+def _buscar_nombre(t: str) -> str:
+    lineas = [ln.strip() for ln in t.splitlines()]
+    for rx in _RE_NOMBRE:
+        for ln in lineas:
+            m = rx.search(ln)
+            if m:
+                nombre = _limpiar_nombre(m.group(1))
+                if nombre:
+                    return nombre
+    return ""
+
+def _nombre_rut(t: str) -> str:
+    """RUT (formulario DIAN): los valores van en la línea siguiente a 'Primer apellido ... Otros nombres'."""
+    lineas = [ln.strip() for ln in t.splitlines() if ln.strip()]
+    for i, ln in enumerate(lineas):
+        if "PRIMER APELLIDO" in ln:
+            for sig in lineas[i + 1:i + 4]:
+                if re.fullmatch(r"[A-ZÁÉÍÓÚÑÜ]+(?:\s+[A-ZÁÉÍÓÚÑÜ]+){1,5}", sig):
+                    nombre = _limpiar_nombre(sig)
+                    if nombre:
+                        return nombre
+    return ""
+
+# ---- Configuración por tipo ----
+# booleano: (clave JSON, regex "NO reportado" -> False, regex "reportado" -> True)
+TIPOS = {
+    "rut": {
+        "encabezado": r"REGISTRO UNICO TRIBUTARIO|IDENTIFICACION TRIBUTARIA|\bDIAN\b",
+        "cedula": _RE_NIT + _RE_CEDULA,
+        "booleano": None,
+    },
+    "contraloria": {
+        "encabezado": r"CONTRALORIA GENERAL",
+        "cedula": _RE_CEDULA,
+        "booleano": ("responsabilidad_fiscal",
+                     r"NO\s+SE\s+ENCUENTRA\s+REPORTAD[OA]",
+                     r"SE\s+ENCUENTRA\s+REPORTAD[OA]\s+COMO\s+RESPONSABLE"),
+        "nombre_opcional": True,  # el certificado SIBOR suele traer solo el número
+    },
+    "procuraduria": {
+        "encabezado": r"PROCURADURIA GENERAL",
+        "cedula": _RE_CEDULA,
+        "booleano": ("antecedentes_disciplinarios",
+                     r"NO\s+REGISTRA\s+(?:SANCIONES|ANTECEDENTES)",
+                     r"(?<!NO\s)REGISTRA\s+LAS\s+SIGUIENTES\s+ANOTACIONES|SANCIONES\s+(?:Y|E)\s+INHABILIDADES\s+VIGENTES\s*:"),
+    },
+    "policia": {
+        "encabezado": r"POLICIA NACIONAL",
+        "cedula": _RE_CEDULA,
+        "booleano": ("antecedentes_judiciales",
+                     r"NO\s+TIENE\s+ASUNTOS\s+PENDIENTES|NO\s+REGISTRA\s+ANTECEDENTES",
+                     r"(?<!NO\s)TIENE\s+ASUNTOS\s+PENDIENTES|(?<!NO\s)REGISTRA\s+ANTECEDENTES"),
+    },
+    "rnmc": {
+        "encabezado": r"MEDIDAS CORRECTIVAS",
+        "cedula": _RE_CEDULA,
+        "booleano": ("medidas_correctivas",
+                     r"NO\s+TIENE\s+MEDIDAS\s+CORRECTIVAS|NO\s+SE\s+ENCUENTRA\s+VINCULAD[OA]",
+                     r"(?<!NO\s)TIENE\s+MEDIDAS\s+CORRECTIVAS\s+PENDIENTES"),
+    },
+}
+
+# Peso de cada evidencia en la confianza
+_PESOS = {"encabezado": 0.15, "cedula": 0.35, "nombre": 0.25, "booleano": 0.25}
+
+def _booleano(n: str, negativo: str, positivo: str) -> Optional[bool]:
+    if re.search(negativo, n):
+        return False
+    if re.search(positivo, n):
+        return True
+    return None
+
+def extraer_por_reglas(tipo: str, texto_ocr: str) -> Optional[dict]:
+    """
+    Extrae nombre, cédula y el booleano del tipo de certificado sin LLM.
+    Devuelve None si el tipo no tiene reglas. 'confianza' es la fracción (ponderada)
+    de evidencias encontradas: encabezado del emisor, cédula, nombre y frase de estado.
+    """
+    cfg = TIPOS.get(tipo)
+    if cfg is None:
+        return None
+    t = (texto_ocr or "").upper()
+    n = _sin_acentos(t)
+
+    cedula = _buscar_cedula(t, cfg["cedula"])
+    nombre = _nombre_rut(t) if tipo == "rut" else ""
+    nombre = nombre or _buscar_nombre(t)
+    encabezado = bool(re.search(cfg["encabezado"], n))
+
+    out = {"ok": bool(nombre and cedula), "missing_fields": [], "nombre": nombre, "cedula": cedula}
+    if not nombre:
+        out["missing_fields"].append("nombre")
+    if not cedula:
+        out["missing_fields"].append("cedula")
+
+    pesos = dict(_PESOS)
+    encontrados = {"encabezado": encabezado, "cedula": bool(cedula), "nombre": bool(nombre)}
+    if cfg["booleano"]:
+        clave, negativo, positivo = cfg["booleano"]
+        valor = _booleano(n, negativo, positivo)
+        out[clave] = valor
+        encontrados["booleano"] = valor is not None
+        if valor is None:
+            out["missing_fields"].append(clave)
+    else:
+        pesos.pop("booleano")
+    if cfg.get("nombre_opcional") and not nombre:
+        pesos.pop("nombre")
+        encontrados.pop("nombre")
+
+    total = sum(pesos.values())
+    out["confianza"] = round(sum(pesos[k] for k, v in encontrados.items() if v) / total, 2)
+    out["metodo"] = "reglas"
+    return out
@@ -0,0 +1,167 @@
+import os, time, uuid, hashlib
+from typing import Dict, Optional, Tuple
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from services import blobs, indice
+from services.blobs import LARGO_MAGIA as _LARGO_MAGIA, tipo_por_magia
+
+# =========================================================
+# Subidas en una sola pasada.
+# Werkzeug escribe cada archivo del multipart en el stream que devuelve
+# Request._get_file_stream; aquí ese stream es un ArchivoEntrante que:
+#   - escribe directo en UPLOAD_ROOT/.tmp (mismo disco que el destino),
+#   - calcula sha256 y tamaño mientras llegan los bytes,
+#   - corta con 413 apenas se pasa de SUBIDA_MAX_MB,
+#   - detecta el tipo real por magic bytes.
+# guardar() luego solo hace os.replace al almacén por hash (services/blobs.py);
+# si ese contenido ya existe, el temporal se descarta. Sin segunda copia ni
+# relectura para el hash.
+# =========================================================
+
+UPLOAD_ROOT = indice.UPLOAD_ROOT
+TMP_DIR = os.path.join(UPLOAD_ROOT, ".tmp")
+SUBIDA_MAX_BYTES = int(os.getenv("SUBIDA_MAX_MB", "25")) * 1024 * 1024
+SUBIDA_MAX_TOTAL_BYTES = int(os.getenv("SUBIDA_MAX_TOTAL_MB", "200")) * 1024 * 1024  # MAX_CONTENT_LENGTH
+
+class ArchivoEntrante:
+    """
+    Stream de destino para un archivo del multipart. Se comporta como el archivo
+    temporal que usaría Werkzeug (write/seek/read) y además acumula hash y tamaño.
+    Si nadie lo consume con guardar_blob(), close() borra el temporal.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        os.makedirs(TMP_DIR, exist_ok=True)
+        self.ruta = os.path.join(TMP_DIR, uuid.uuid4().hex)
+        self._f = open(self.ruta, "w+b")
+        self._hash = hashlib.sha256()
+        self._cabecera = b""
+        self.max_bytes = max_bytes or SUBIDA_MAX_BYTES
+        self.tam = 0
+        self.consumido = False
+
+    def write(self, datos: bytes) -> int:
+        self.tam += len(datos)
+        if self.tam > self.max_bytes:
+            self.close()
+            raise RequestEntityTooLarge(f"Archivo supera {self.max_bytes // (1024 * 1024)} MB")
+        if len(self._cabecera) < _LARGO_MAGIA:
+            self._cabecera += datos[:_LARGO_MAGIA - len(self._cabecera)]
+        self._hash.update(datos)
+        return self._f.write(datos)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def tipo(self) -> Optional[str]:
+        return tipo_por_magia(self._cabecera)
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+        if not self.consumido:
+            try:
+                os.remove(self.ruta)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, nombre):
+        # seek/read/tell/flush... los resuelve el archivo real
+        return getattr(self._f, nombre)
+
+class RequestSubidas(Request):
+    """Request de Flask cuyos archivos subidos van a ArchivoEntrante."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return ArchivoEntrante()
+
+def inspeccionar(storage) -> Tuple[str, int, Optional[str]]:
+    """
+    (sha256, tamaño, tipo) de un FileStorage. Si ya viene de ArchivoEntrante no
+    relee nada; otros streams (p.ej. BytesIO en tests) se vuelcan una vez a .tmp.
+    """
+    if not isinstance(storage.stream, ArchivoEntrante):
+        entrante = ArchivoEntrante()
+        try:
+            for bloque in iter(lambda: storage.stream.read(1024 * 1024), b""):
+                entrante.write(bloque)
+        except Exception:
+            entrante.close()
+            raise
+        storage.stream = entrante
+    e: ArchivoEntrante = storage.stream
+    return e.sha256, e.tam, e.tipo
+
+def guardar_blob(storage) -> str:
+    """
+    Pasa el temporal de la subida al almacén por hash (os.replace, sin copia).
+    Si ese contenido ya estaba guardado el temporal se descarta. Devuelve la ruta
+    relativa del blob.
+    """
+    sha, _, tipo = inspeccionar(storage)
+    entrante: ArchivoEntrante = storage.stream
+    entrante._f.close()
+    rel = blobs.guardar_desde(entrante.ruta, sha, tipo or "bin")
+    entrante.consumido = True
+    return rel
+
+class ArchivoRechazado(ValueError):
+    pass
+
+def guardar(storage, state: str, user_id: str, name: str) -> Dict:
+    """
+    Guarda una subida en el almacén por hash y la indexa como <state>/<user>/<name>
+    con el sha256 ya calculado. Rechaza (ArchivoRechazado) lo que no sea PDF/PNG/JPEG
+    por contenido. duplicateOf indica si el usuario ya tenía esos mismos bytes.
+    Si ya los tenía en el mismo estado y campo, no se indexa
+    otra fila: se devuelve esa entrada con reused=True (y jobs.encolar reutiliza
+    su resultado en vez de analizarla de nuevo).
+    """
+    sha, tam, tipo = inspeccionar(storage)
+    if tipo is None:
+        storage.stream.close()
+        raise ArchivoRechazado(f"{name}: tipo no permitido (solo PDF, PNG o JPEG)")
+    campo = indice.parse_field_from_name(name)
+    mismo = indice.buscar_por_hash(user_id, sha, state=state, campo=campo) if campo else None
+    if mismo:
+        storage.stream.close()  # el contenido ya está en el almacén: se descarta el temporal
+        return {
+            "name": mismo["name"],
+            "path": blobs.ruta_blob(mismo["blob"]),
+            "sha256": sha,
+            "size": tam,
+            "type": tipo,
+            "duplicateOf": f"{mismo['state']}/{mismo['user_id']}/{mismo['name']}",
+            "reused": True,
+        }
+    previo = indice.buscar_por_hash(user_id, sha)
+    rel = guardar_blob(storage)
+    indice.registrar(state, user_id, name, sha256=sha, size=tam, blob=rel)
+    return {
+        "name": name,
+        "path": blobs.ruta_blob(rel),
+        "sha256": sha,
+        "size": tam,
+        "type": tipo,
+        "duplicateOf": f"{previo['state']}/{previo['user_id']}/{previo['name']}" if previo else None,
+        "reused": False,
+    }
+
+def limpiar_temporales(max_edad_seg: float = 24 * 3600) -> int:
+    """Borra restos en .tmp de subidas interrumpidas (p.ej. caída del proceso)."""
+    if not os.path.isdir(TMP_DIR):
+        return 0
+    limite, n = time.time() - max_edad_seg, 0
+    for fn in os.listdir(TMP_DIR):
+        p = os.path.join(TMP_DIR, fn)
+        try:
+            if os.path.getmtime(p) < limite:
+                os.remove(p)
+                n += 1
+        except OSError:
+            pass
+    return n
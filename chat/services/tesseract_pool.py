@@ -0,0 +1,73 @@
+import os, queue, threading
+from contextlib import contextmanager
+
+# tesserocr es opcional: enlaza libtesseract en el mismo proceso (sin subprocess,
+# sin archivos temporales y sin recargar eng.traineddata en cada llamada).
+# Si no está instalado, ocr_ai sigue usando pytesseract.
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover
+    tesserocr = None
+
+MRZ_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ<0123456789"
+TESS_POOL_SIZE = int(os.getenv("TESS_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+
+class PoolTesseract:
+    """
+    N motores Tesseract "calientes" reutilizables entre llamadas e hilos.
+    El idioma, el OEM y la whitelist se fijan al crear cada motor; por llamada
+    solo se cambia el PSM. Los motores se crean a demanda hasta `tamano`.
+    """
+
+    def __init__(self, tamano: int = TESS_POOL_SIZE, lang: str = "eng", whitelist: str = MRZ_WHITELIST):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr no está instalado")
+        self.tamano = max(1, tamano)
+        self.lang = lang
+        self.whitelist = whitelist
+        self._libres: "queue.Queue" = queue.Queue()
+        self._creados = 0
+        self._lock = threading.Lock()
+
+    def _crear(self):
+        kwargs = {"lang": self.lang, "oem": tesserocr.OEM.DEFAULT}
+        tessdata = os.getenv("TESSDATA_PREFIX")
+        if tessdata:
+            kwargs["path"] = tessdata
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        api.SetVariable("tessedit_char_whitelist", self.whitelist)
+        return api
+
+    @contextmanager
+    def motor(self):
+        """Presta un motor del pool (bloquea si todos están ocupados)."""
+        api = None
+        with self._lock:
+            if self._libres.empty() and self._creados < self.tamano:
+                self._creados += 1
+                crear = True
+            else:
+                crear = False
+        if crear:
+            try:
+                api = self._crear()
+            except Exception:
+                with self._lock:
+                    self._creados -= 1
+                raise
+        else:
+            api = self._libres.get()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._libres.put(api)
+
+    def leer(self, img_gray, psm: int) -> str:
+        """OCR de una imagen numpy en escala de grises (uint8) con el PSM indicado."""
+        h, w = img_gray.shape[:2]
+        datos = img_gray.tobytes() if img_gray.flags["C_CONTIGUOUS"] else img_gray.copy().tobytes()
+        with self.motor() as api:
+            api.SetPageSegMode(psm)
+            api.SetImageBytes(datos, w, h, 1, w)
+            return api.GetUTF8Text()
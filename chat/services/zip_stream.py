@@ -0,0 +1,53 @@
+import io, os, time, zipfile
+from typing import Iterable, Iterator, Tuple
+
+# =========================================================
+# ZIP al vuelo: zipfile escribe sobre un stream NO seekable (usa data
+# descriptors), así cada bloque se entrega al cliente apenas se produce.
+# Sin armar el ZIP en memoria ni en un archivo temporal.
+# ZIP_STORED: PDF/JPEG ya vienen comprimidos, recomprimir solo gasta CPU.
+# =========================================================
+
+BLOQUE = 1024 * 1024
+
+class _Salida(io.RawIOBase):
+    """Destino write-only que acumula lo escrito hasta que el generador lo entrega."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._partes.append(bytes(b))
+        return len(b)
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+def zip_en_stream(archivos: Iterable[Tuple[str, str, float]]) -> Iterator[bytes]:
+    """
+    archivos: (nombre_en_zip, ruta_en_disco, mtime). Genera los bytes del ZIP
+    a medida que lee cada archivo en bloques de BLOQUE.
+    """
+    salida = _Salida()
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for nombre, ruta, mtime in archivos:
+            info = zipfile.ZipInfo(nombre, date_time=time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            zip64 = os.path.getsize(ruta) >= zipfile.ZIP64_LIMIT
+            with open(ruta, "rb") as src, zf.open(info, mode="w", force_zip64=zip64) as dst:
+                for bloque in iter(lambda: src.read(BLOQUE), b""):
+                    dst.write(bloque)
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+            datos = salida.vaciar()
+            if datos:
+                yield datos
+    datos = salida.vaciar()  # directorio central
+    if datos:
+        yield datos
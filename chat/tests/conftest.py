@@ -0,0 +1,4 @@
+import os, sys
+
+# Los módulos se importan como en la app: "from services import ..." desde la carpeta chat
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,84 @@
+import hashlib
+
+import pytest
+
+from services import blobs, indice
+
+@pytest.fixture
+def indice_tmp(tmp_path, monkeypatch):
+    """Índice y almacén de blobs vacíos en tmp_path (sin tocar uploads/ ni migrar nada)."""
+    monkeypatch.setattr(indice, "DB_PATH", str(tmp_path / "indice.sqlite3"))
+    monkeypatch.setattr(indice, "UPLOAD_ROOT", str(tmp_path / "uploads"))
+    monkeypatch.setattr(indice, "_listo", False)
+    monkeypatch.setattr(blobs, "BLOB_DIR", str(tmp_path / "blobs"))
+    return tmp_path
+
+def _subir(tmp_path, state, user_id, name, contenido: bytes) -> str:
+    tmp = tmp_path / "subida.tmp"
+    tmp.write_bytes(contenido)
+    sha = hashlib.sha256(contenido).hexdigest()
+    rel = blobs.guardar_desde(str(tmp), sha, "pdf")
+    indice.registrar(state, user_id, name, sha256=sha, size=len(contenido), blob=rel)
+    return rel
+
+@pytest.fixture
+def poblado(indice_tmp):
+    for u in range(7):
+        for campo in ("rut", "cedula", "antecedentes_policia"):
+            for state in ("pendientes", "revisados"):
+                _subir(indice_tmp, state, f"u{u}", f"{campo}__doc.pdf", f"%PDF-{u}-{campo}-{state}".encode())
+    return indice_tmp
+
+def _clave(fila):
+    return fila["state"], fila["user_id"], fila["name"]
+
+@pytest.mark.parametrize("orden", sorted(indice.ORDENES))
+@pytest.mark.parametrize("limite", [1, 4, 42, 100])
+def test_paginas_sin_saltos_ni_repetidos(poblado, orden, limite):
+    completo, siguiente = indice.consultar(orden=orden)
+    assert siguiente is None and len(completo) == 42
+
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        filas, cursor = indice.consultar(orden=orden, cursor=cursor, limite=limite)
+        assert len(filas) <= limite
+        vistos.extend(filas)
+        paginas += 1
+        if cursor is None:
+            break
+    assert [_clave(f) for f in vistos] == [_clave(f) for f in completo]
+    assert paginas == max(1, -(-42 // limite))
+
+def test_paginas_con_filtros(poblado):
+    vistos, cursor = [], None
+    while True:
+        filas, cursor = indice.consultar(states=["revisados"], field="rut", cursor=cursor, limite=2)
+        vistos.extend(filas)
+        if cursor is None:
+            break
+    assert [f["user_id"] for f in vistos] == [f"u{u}" for u in range(7)]
+    assert {(f["state"], f["field"]) for f in vistos} == {("revisados", "rut")}
+
+def test_orden_reciente_desc(poblado):
+    filas, _ = indice.consultar(orden="reciente")
+    mtimes = [f["mtime"] for f in filas]
+    assert mtimes == sorted(mtimes, reverse=True)
+
+def test_cursor_de_otro_orden(poblado):
+    _, cursor = indice.consultar(orden="usuario", limite=3)
+    with pytest.raises(indice.CursorInvalido):
+        indice.consultar(orden="tipo", cursor=cursor, limite=3)
+
+def test_cursor_corrupto(poblado):
+    with pytest.raises(indice.CursorInvalido):
+        indice.consultar(cursor="no-es-base64!!", limite=3)
+
+def test_orden_desconocido(indice_tmp):
+    with pytest.raises(ValueError):
+        indice.consultar(orden="tamano")
+
+def test_reemplazo_libera_blob_viejo(indice_tmp):
+    viejo = _subir(indice_tmp, "pendientes", "u1", "rut__a.pdf", b"%PDF-uno")
+    nuevo = _subir(indice_tmp, "pendientes", "u1", "rut__a.pdf", b"%PDF-dos")
+    assert not (indice_tmp / "blobs").joinpath(*viejo.split("/")).exists()
+    assert indice.obtener("pendientes", "u1", "rut__a.pdf")["blob"] == nuevo
@@ -0,0 +1,53 @@
+from services import ocr_ai
+
+def _td1(numero: str, nacimiento: str, vence: str, nombre: str) -> str:
+    dc = ocr_ai._digito_control
+    l1 = f"ICCOL{numero}{dc(numero)}".ljust(30, "<")
+    l2 = f"{nacimiento}{dc(nacimiento)}M{vence}{dc(vence)}COL".ljust(29, "<")
+    l2 += str(dc(l1[5:30] + l2[0:7] + l2[8:15] + l2[18:29]))
+    return "\n".join((l1, l2, nombre.ljust(30, "<")))
+
+MRZ = _td1("012345678", "850101", "300101", "PEREZ<GOMEZ<<JUAN<CARLOS")
+
+def test_digito_control_icao():
+    # Ejemplo del documento 9303 de la OACI
+    assert ocr_ai._digito_control("D23145890") == 7
+    assert ocr_ai._digito_control("740812") == 2
+
+def test_td1_valida():
+    aciertos, mrz = ocr_ai.validar_mrz_td1(MRZ)
+    assert aciertos == 4
+    assert mrz == MRZ
+
+def test_td1_entre_texto_ocr():
+    texto = "REPUBLICA DE COLOMBIA\n" + MRZ.replace("\n", " \n") + "\nFIRMA"
+    assert ocr_ai.validar_mrz_td1(texto)[0] == 4
+
+def test_td1_corrige_confusiones_en_linea_2():
+    l1, l2, l3 = MRZ.splitlines()
+    l2 = l2.replace("0", "O").replace("1", "I")  # confusiones típicas de OCR en los campos numéricos
+    aciertos, mrz = ocr_ai.validar_mrz_td1("\n".join((l1, l2, l3)))
+    assert aciertos == 4
+    assert mrz.splitlines()[1][:15] == MRZ.splitlines()[1][:15]
+
+def test_td1_digito_errado():
+    l1, l2, l3 = MRZ.splitlines()
+    l2 = l2[:3] + ("9" if l2[3] != "9" else "8") + l2[4:]  # fecha de nacimiento alterada
+    aciertos, _ = ocr_ai.validar_mrz_td1("\n".join((l1, l2, l3)))
+    assert aciertos < 4
+
+def test_td1_sin_mrz():
+    assert ocr_ai.validar_mrz_td1("") == (0, None)
+    assert ocr_ai.validar_mrz_td1("CEDULA DE CIUDADANIA") == (0, None)
+
+def test_campos_td1_verificada():
+    campos = ocr_ai.campos_mrz_td1(MRZ)
+    assert campos["nuip"] == "012345678"
+    assert campos["fecha_nacimiento"] == "1985-01-01"
+    assert campos["fecha_vencimiento"] == "2030-01-01"
+    assert (campos["apellidos"], campos["nombres"]) == ("Perez Gomez", "Juan Carlos")
+
+def test_campos_td1_sin_verificar():
+    l1, l2, l3 = MRZ.splitlines()
+    compuesto = str((int(l2[29]) + 1) % 10)  # solo falla el dígito de control compuesto
+    assert ocr_ai.campos_mrz_td1("\n".join((l1, l2[:29] + compuesto, l3))) is None
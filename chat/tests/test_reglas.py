@@ -0,0 +1,48 @@
+import pytest
+
+from services import reglas
+
+CEDULA = "CEDULA DE CIUDADANIA No. 1.020.304.050"
+NOMBRE = "APELLIDOS Y NOMBRES: PEREZ GOMEZ JUAN CARLOS"
+
+def _certificado(encabezado: str, estado: str) -> str:
+    return "\n".join((encabezado, NOMBRE, CEDULA, estado))
+
+@pytest.mark.parametrize("tipo, encabezado, estado, clave, esperado", [
+    ("policia", "POLICIA NACIONAL DE COLOMBIA", "NO TIENE ASUNTOS PENDIENTES CON LAS AUTORIDADES JUDICIALES",
+     "antecedentes_judiciales", False),
+    ("policia", "POLICIA NACIONAL DE COLOMBIA", "NO REGISTRA ANTECEDENTES",
+     "antecedentes_judiciales", False),
+    ("policia", "POLICIA NACIONAL DE COLOMBIA", "ACTUALMENTE TIENE ASUNTOS PENDIENTES CON LAS AUTORIDADES",
+     "antecedentes_judiciales", True),
+    ("policia", "POLICIA NACIONAL DE COLOMBIA", "REGISTRA ANTECEDENTES",
+     "antecedentes_judiciales", True),
+    ("procuraduria", "PROCURADURIA GENERAL DE LA NACION", "NO REGISTRA SANCIONES NI INHABILIDADES VIGENTES",
+     "antecedentes_disciplinarios", False),
+    ("procuraduria", "PROCURADURIA GENERAL DE LA NACION", "REGISTRA LAS SIGUIENTES ANOTACIONES",
+     "antecedentes_disciplinarios", True),
+    ("contraloria", "CONTRALORIA GENERAL DE LA REPUBLICA", "NO SE ENCUENTRA REPORTADO COMO RESPONSABLE FISCAL",
+     "responsabilidad_fiscal", False),
+    ("contraloria", "CONTRALORIA GENERAL DE LA REPUBLICA", "SE ENCUENTRA REPORTADO COMO RESPONSABLE FISCAL",
+     "responsabilidad_fiscal", True),
+    ("rnmc", "REGISTRO NACIONAL DE MEDIDAS CORRECTIVAS", "NO TIENE MEDIDAS CORRECTIVAS PENDIENTES POR CUMPLIR",
+     "medidas_correctivas", False),
+    ("rnmc", "REGISTRO NACIONAL DE MEDIDAS CORRECTIVAS", "TIENE MEDIDAS CORRECTIVAS PENDIENTES POR CUMPLIR",
+     "medidas_correctivas", True),
+])
+def test_booleano(tipo, encabezado, estado, clave, esperado):
+    r = reglas.extraer_por_reglas(tipo, _certificado(encabezado, estado))
+    assert r[clave] is esperado
+    assert r["ok"] and not r["missing_fields"]
+    assert r["cedula"] == "1020304050"
+    assert r["nombre"] == "PEREZ GOMEZ JUAN CARLOS"
+    assert r["confianza"] == 1.0
+
+def test_sin_frase_de_estado_queda_pendiente():
+    r = reglas.extraer_por_reglas("policia", _certificado("POLICIA NACIONAL DE COLOMBIA", ""))
+    assert r["antecedentes_judiciales"] is None
+    assert r["missing_fields"] == ["antecedentes_judiciales"]
+    assert r["confianza"] < 1.0
+
+def test_tipo_sin_reglas():
+    assert reglas.extraer_por_reglas("cedula", CEDULA) is None